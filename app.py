@@ -1,137 +1,156 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, abort
-import os
-import json
-import yaml
-from utils.config_manager import ConfigManager
+import asyncio
+from contextlib import asynccontextmanager
 
-app = Flask(__name__)
+from fastapi import FastAPI, Request
+from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.templating import Jinja2Templates
+from jinja2 import pass_context
+from markupsafe import Markup
 
-@app.route('/')
-def get_index():
+from config import BASE_DIR, DEBUG, SHARED_METRICS, BACKGROUND_SERVICES
+from utils.config_manager import ConfigManager
+from utils.access_control import AccessControl, AccessControlMiddleware
+from utils.executor import system_executor, slow_executor, BlockingCallTimeout, ExecutorBusy
+from utils.static_assets import PrecompressedStaticFiles, StaticManifest
+from utils.perf_metrics import PerfMiddleware, perf_recorder
+from utils.shared_metrics import shared_metrics
+from utils.wifi_scan import scan_executor
+from utils.bss_table import bss_monitor
+from utils.channel_planner import channel_planner
+from utils.firewall_counters import counter_collector
+from routers import dashboard, network, wifi, firewall, tunnel, routing, settings, module_manager, debug
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Общий сбор метрик, счетчики правил, наблюдение за WiFi сетями, подбор каналов и отмена ожидающих системных вызовов при остановке"""
+    loop = asyncio.get_running_loop()
+
+    def start_background_services():
+        # Правила, примененные до перезапуска, отслеживаются по текущей конфигурации
+        counter_collector.track_config_later(ConfigManager.get_firewall_config)
+        bss_monitor.start()
+        channel_planner.start()
+
+    # Профилирование запуска (ARMROUTER_NO_BACKGROUND) измеряет запуск без фоновых служб
+    if BACKGROUND_SERVICES and SHARED_METRICS:
+        # С несколькими рабочими процессами счетчики читает, эфир сканирует и каналы меняет только процесс-сборщик
+        shared_metrics.on_collector(lambda: loop.call_soon_threadsafe(start_background_services))
+        shared_metrics.start()
+    elif BACKGROUND_SERVICES:
+        start_background_services()
+    yield
+    shared_metrics.stop()
+    counter_collector.stop()
+    bss_monitor.stop()
+    channel_planner.stop()
+    system_executor.shutdown()
+    slow_executor.shutdown()
+    debug.profile_executor.shutdown()
+    scan_executor.shutdown()
+
+app = FastAPI(title="ArmRouter", lifespan=lifespan)
+
+# Задержки запросов по маршрутам (/api/debug/perf); запросы, отклоненные ограничением доступа, не учитываются
+app.add_middleware(PerfMiddleware, recorder=perf_recorder)
+
+# Ограничение доступа к веб-интерфейсу по разрешенным сетям из настроек доступа
+web_access = AccessControl(ConfigManager.get_access_settings, [ConfigManager.get_config_path("access")])
+app.add_middleware(AccessControlMiddleware, access_control=web_access)
+
+# Статика с заранее сжатыми вариантами; собранные файлы (tools/build_static.py) кешируются навсегда
+app.mount("/static", PrecompressedStaticFiles(directory=BASE_DIR / "static"), name="static")
+static_manifest = StaticManifest(BASE_DIR / "static" / "dist" / "manifest.json")
+templates = Jinja2Templates(directory=BASE_DIR / "templates")
+
+@pass_context
+def url_for(context, name: str, **path_params) -> str:
+    """Адрес маршрута для шаблонов; filename для статики, как в шаблонах страниц"""
+    if "filename" in path_params:
+        path_params["path"] = path_params.pop("filename")
+    if name == "static" and not DEBUG:
+        # Имя собранного файла с хешем, если статика собрана
+        path_params["path"] = static_manifest.resolve(path_params["path"])
+    return context["request"].app.url_path_for(name, **path_params)
+
+@pass_context
+def script_bundle(context, name: str, *files: str) -> Markup:
+    """Скрипты страницы: собранный бандл js/bundles/<name>.js или исходные файлы в режиме отладки и без сборки"""
+    bundle = f"js/bundles/{name}.js"
+    sources = [bundle] if not DEBUG and static_manifest.contains(bundle) else files
+    return Markup("\n".join(f'<script src="{url_for(context, "static", filename=source)}"></script>'
+                             for source in sources))
+
+templates.env.globals["url_for"] = url_for
+templates.env.globals["script_bundle"] = script_bundle
+
+@app.exception_handler(BlockingCallTimeout)
+async def blocking_call_timeout(request: Request, exc: BlockingCallTimeout):
+    """Системный вызов не уложился в таймаут"""
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.exception_handler(ExecutorBusy)
+async def executor_busy(request: Request, exc: ExecutorBusy):
+    """Слишком много одновременных системных вызовов"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+for module in (dashboard, network, wifi, firewall, tunnel, routing, settings, module_manager, debug):
+    app.include_router(module.router)
+
+@app.get('/')
+async def get_index(request: Request):
     """Главная страница"""
-    return render_template('index.html')
+    return templates.TemplateResponse(request, 'index.html')
 
-@app.route('/network')
-def get_network():
+@app.get('/network')
+async def get_network(request: Request):
     """Страница управления сетью"""
-    return render_template('network.html')
+    return templates.TemplateResponse(request, 'network.html')
 
-@app.route('/topology')
-def get_topology():
+@app.get('/topology')
+async def get_topology(request: Request):
     """Страница сетевой топологии"""
-    return render_template('topology.html')
+    return templates.TemplateResponse(request, 'topology.html')
 
-@app.route('/wifi')
-def get_wifi():
+@app.get('/wifi')
+async def get_wifi(request: Request):
     """Страница Wi-Fi настроек"""
-    return render_template('wifi.html')
+    return templates.TemplateResponse(request, 'wifi.html')
 
-@app.route('/firewall')
-def get_firewall():
+@app.get('/firewall')
+async def get_firewall(request: Request):
     """Страница межсетевого экрана"""
-    return render_template('firewall.html')
+    return templates.TemplateResponse(request, 'firewall.html')
 
-@app.route('/vpn')
-def get_vpn():
+@app.get('/vpn')
+async def get_vpn():
     """Перенаправление со старой страницы VPN на новую страницу Туннелей"""
-    return redirect(url_for('get_tunnels'))
+    return RedirectResponse(app.url_path_for('get_tunnels'))
 
-@app.route('/tunnels')
-def get_tunnels():
+@app.get('/tunnels')
+async def get_tunnels(request: Request):
     """Страница безопасных туннелей"""
-    return render_template('tunnels.html')
+    return templates.TemplateResponse(request, 'tunnels.html')
 
-@app.route('/routing')
-def get_routing():
+@app.get('/routing')
+async def get_routing(request: Request):
     """Страница маршрутизации"""
-    return render_template('routing.html')
+    return templates.TemplateResponse(request, 'routing.html')
 
-@app.route('/modules')
-def get_modules():
+@app.get('/modules')
+async def get_modules(request: Request):
     """Страница управления модулями"""
-    return render_template('modules.html')
+    return templates.TemplateResponse(request, 'modules.html')
 
-@app.route('/settings')
-def get_settings():
+@app.get('/settings')
+async def get_settings(request: Request):
     """Страница настроек"""
-    return render_template('settings.html')
-
-@app.route('/api/tunnel/config', methods=['GET'])
-def get_tunnel_config():
-    """API для получения конфигурации туннелей"""
-    try:
-        tunnel_config = ConfigManager.get_tunnel_config()
-        return jsonify({"tunnel": tunnel_config})
-    except Exception as e:
-        app.logger.error(f"Error getting tunnel config: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/api/tunnel/config', methods=['PUT'])
-def update_tunnel_config():
-    """API для обновления конфигурации туннелей"""
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        tunnel_config = data.get('tunnel', {})
-        updated_config = ConfigManager.update_tunnel_config(tunnel_config)
-        return jsonify({"success": True, "tunnel": updated_config})
-    except Exception as e:
-        app.logger.error(f"Error updating tunnel config: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/api/tunnel/restart', methods=['POST'])
-def restart_tunnel():
-    """API для перезапуска сервисов туннелей"""
-    try:
-        # Тут будет реальный код перезапуска служб туннелей в боевом окружении
-        # В демонстрационной версии просто возвращаем успешный результат
-        return jsonify({"success": True, "message": "Tunel services restarted successfully"})
-    except Exception as e:
-        app.logger.error(f"Error restarting tunnel services: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/api/firewall/config', methods=['GET'])
-def get_firewall_config():
-    """API для получения конфигурации межсетевого экрана"""
-    try:
-        firewall_config = ConfigManager.get_firewall_config()
-        return jsonify({"firewall": firewall_config})
-    except Exception as e:
-        app.logger.error(f"Error getting firewall config: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/api/firewall/config', methods=['PUT'])
-def update_firewall_config():
-    """API для обновления конфигурации межсетевого экрана"""
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        firewall_config = data.get('firewall', {})
-        updated_config = ConfigManager.update_firewall_config(firewall_config)
-        return jsonify({"success": True, "firewall": updated_config})
-    except Exception as e:
-        app.logger.error(f"Error updating firewall config: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/api/firewall/restart', methods=['POST'])
-def restart_firewall():
-    """API для перезапуска межсетевого экрана"""
-    try:
-        # Тут будет реальный код перезапуска служб межсетевого экрана в боевом окружении
-        # В демонстрационной версии просто возвращаем успешный результат
-        return jsonify({"success": True, "message": "Firewall restarted successfully"})
-    except Exception as e:
-        app.logger.error(f"Error restarting firewall: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/health')
-def health_check():
+    return templates.TemplateResponse(request, 'settings.html')
+
+@app.get('/health')
+async def health_check():
     """API для проверки работоспособности"""
-    return jsonify({"status": "ok"})
+    return {"status": "ok"}
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5000)
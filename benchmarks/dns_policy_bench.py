@@ -0,0 +1,127 @@
+"""
+Бенчмарк доменной маршрутизации: сопоставление имен с шаблонами и
+пропускная способность DNS-форвардера с локальной заглушкой upstream.
+
+Запуск из корня репозитория:
+    python -m benchmarks.dns_policy_bench --patterns 100000 --queries 20000
+"""
+import json
+import time
+import random
+import struct
+import asyncio
+import argparse
+
+from utils.dns_policy import DomainTrie, DNSMessage, DNSPolicy, DNSPolicyForwarder, NftSetUpdater
+
+
+class StubResolver(asyncio.DatagramProtocol):
+    """
+    Заглушка вышестоящего DNS-сервера: отвечает на любой запрос
+    одной A-записью со случайным адресом и TTL 300.
+    """
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        query_id, _, _ = struct.unpack("!HHH", data[:6])
+        _, offset = DNSMessage.read_name(data, 12)
+        question = data[12:offset + 4]
+        header = struct.pack("!HHHHHH", query_id, 0x8180, 1, 1, 0, 0)
+        answer = b"\xc0\x0c" + struct.pack("!HHIH", 1, 1, 300, 4) + random.getrandbits(32).to_bytes(4, "big")
+        self.transport.sendto(header + question + answer, addr)
+
+
+class DryRunSetUpdater(NftSetUpdater):
+    """
+    Обновление наборов без вызова nft: скрипт только формируется.
+    """
+
+    def flush(self) -> None:
+        self._flush_handle = None
+        _, expires = self.render_batch()
+        self.commit(expires)
+
+
+def build_query(name: str, query_id: int) -> bytes:
+    labels = b"".join(bytes([len(label)]) + label.encode() for label in name.split("."))
+    return struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + labels + b"\x00" + struct.pack("!HH", 1, 1)
+
+
+def bench_trie(patterns: int, lookups: int) -> dict:
+    names = [f"site{i}.example{i % 1000}.com" for i in range(patterns)]
+
+    started = time.perf_counter()
+    trie = DomainTrie()
+    for name in names:
+        trie.add(name, 0)
+    build_time = time.perf_counter() - started
+
+    queries = [f"cdn.{random.choice(names)}" if i % 2 else f"miss{i}.example.net" for i in range(lookups)]
+    started = time.perf_counter()
+    matched = sum(1 for query in queries if trie.match(query) is not None)
+    match_time = time.perf_counter() - started
+
+    return {
+        "patterns": patterns,
+        "build_seconds": round(build_time, 4),
+        "lookups": lookups,
+        "matched": matched,
+        "lookup_us": round(match_time / lookups * 1e6, 3)
+    }
+
+
+async def bench_forwarder(patterns: int, queries: int, unique: int) -> dict:
+    loop = asyncio.get_running_loop()
+    upstream, _ = await loop.create_datagram_endpoint(StubResolver, local_addr=("127.0.0.1", 0))
+    upstream_addr = upstream.get_extra_info("sockname")
+
+    tunnel_config = {
+        "tunnels": [{"name": "bench", "enabled": True, "priority": 1}],
+        "traffic_routing": {"domains": [f"example{i}.com" for i in range(patterns)]}
+    }
+    forwarder = DNSPolicyForwarder(DNSPolicy(tunnel_config), upstream=upstream_addr, set_updater=DryRunSetUpdater())
+    await forwarder.start("127.0.0.1", 0)
+
+    names = [f"host{i}.example{i % patterns}.com" for i in range(unique)]
+    started = time.perf_counter()
+    for batch_start in range(0, queries, 100):
+        batch = [
+            forwarder.resolve(build_query(random.choice(names), i & 0xFFFF))
+            for i in range(batch_start, min(batch_start + 100, queries))
+        ]
+        await asyncio.gather(*batch)
+    elapsed = time.perf_counter() - started
+
+    forwarder.stop()
+    upstream.close()
+
+    return {
+        "queries": queries,
+        "unique_names": unique,
+        "qps": round(queries / elapsed),
+        "cache_hits": forwarder.cache.hits,
+        "cache_misses": forwarder.cache.misses,
+        "matched": forwarder.stats["matched"],
+        "failures": forwarder.stats["failures"]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patterns", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--unique", type=int, default=2000)
+    args = parser.parse_args()
+
+    result = {
+        "trie": bench_trie(args.patterns, args.lookups),
+        "forwarder": asyncio.run(bench_forwarder(args.patterns, args.queries, args.unique))
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
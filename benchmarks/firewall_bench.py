@@ -0,0 +1,204 @@
+"""
+Бенчмарк конвейера межсетевого экрана на синтетических конфигурациях:
+загрузка YAML, проверка правил, оптимизация, формирование скрипта nft и
+(если разрешено создание сетевого пространства имен) применение скрипта.
+
+Для каждого этапа измеряется медианное время и пиковый объем выделенной
+памяти. Результат выводится в JSON, чтобы сравнивать прогоны между собой.
+
+Запуск из корня репозитория:
+    python -m benchmarks.firewall_bench --sizes 100,1000,10000,100000 --output firewall.json
+"""
+import json
+import time
+import logging
+import random
+import shutil
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tracemalloc
+
+import yaml
+
+from utils.firewall_compiler import FirewallCompiler
+from utils.firewall_optimizer import FirewallOptimizer
+
+
+def generate_config(size: int, seed: int) -> dict:
+    """
+    Сгенерировать конфигурацию с заданным числом правил.
+
+    Смесь похожа на реальные наборы: открытые порты, блок-листы подсетей,
+    правила пересылки и небольшая доля дубликатов для оптимизатора.
+    """
+    rng = random.Random(seed)
+    rules = []
+    for i in range(size):
+        kind = rng.random()
+        if kind < 0.5:
+            rule = {"name": f"Block {i}", "action": "DROP", "chain": "INPUT",
+                    "source": f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.0/24"}
+        elif kind < 0.75:
+            rule = {"name": f"Port {i}", "action": "ACCEPT", "chain": "INPUT", "protocol": rng.choice(["tcp", "udp"]),
+                    "destination_port": str(rng.randint(1024, 65535))}
+        elif kind < 0.9:
+            rule = {"name": f"Forward {i}", "action": rng.choice(["ACCEPT", "DROP"]), "chain": "FORWARD",
+                    "protocol": "tcp", "source": f"192.168.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                    "destination_port": str(rng.choice([22, 80, 443, 8080, 8443]))}
+        elif kind < 0.95:
+            rule = {"name": f"Log {i}", "action": "LOG", "chain": "INPUT", "protocol": "tcp",
+                    "destination_port": f"{rng.randint(1, 1000)}-{rng.randint(1001, 2000)}"}
+        elif rules:
+            rule = {**rng.choice(rules), "name": f"Duplicate {i}"}
+        else:
+            continue
+        rule["priority"] = rng.choice([10, 50, 100, 200])
+        rule["enabled"] = True
+        rules.append(rule)
+
+    return {
+        "enabled": True,
+        "default_policy": {"input": "DROP", "output": "ACCEPT", "forward": "DROP"},
+        "allow_ping": True,
+        "allow_established": True,
+        "allow_related": True,
+        "open_ports": [{"port": 22, "protocol": "tcp"}, {"port": 443, "protocol": "tcp"}],
+        "rules": rules,
+    }
+
+
+def netns_command() -> list:
+    """
+    Команда запуска nft в отдельном сетевом пространстве имен или пустой
+    список, если это невозможно (нет nft/unshare или нет прав).
+    """
+    if not shutil.which("nft") or not shutil.which("unshare"):
+        return []
+    command = ["unshare", "--net", "--user", "--map-root-user", "nft", "-f", "-"]
+    try:
+        result = subprocess.run(command, input="", stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    return command if result.returncode == 0 else []
+
+
+def measure(stage, repeat: int) -> dict:
+    """
+    Выполнить этап repeat раз и один раз под tracemalloc.
+
+    Returns:
+        Медианное и минимальное время, пиковая память и результат этапа
+    """
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = stage()
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(durations) * 1000, 3),
+        "min_ms": round(min(durations) * 1000, 3),
+        "peak_kb": round(peak / 1024, 1),
+        "result": result,
+    }
+
+
+def bench_size(size: int, repeat: int, seed: int, nft_command: list) -> dict:
+    text = yaml.dump(generate_config(size, seed), default_flow_style=False)
+
+    stages = {}
+    load = measure(lambda: yaml.safe_load(text), repeat)
+    config = load.pop("result")
+    stages["yaml_load"] = load
+
+    validate = measure(lambda: FirewallCompiler.normalize(config), repeat)
+    normalized = validate.pop("result")
+    stages["validate"] = validate
+
+    optimize = measure(lambda: FirewallOptimizer.optimize(dict(normalized)), repeat)
+    optimized = optimize.pop("result")
+    stages["optimize"] = optimize
+
+    render = measure(lambda: FirewallCompiler.render(FirewallCompiler.layout(optimized)), repeat)
+    script = render.pop("result")
+    stages["render"] = render
+
+    result = {
+        "rules": size,
+        "yaml_bytes": len(text),
+        "normalized_rules": len(normalized["rules"]),
+        "errors": len(normalized["errors"]),
+        "optimized_rules": optimized["optimization"]["after"],
+        "duplicates": len(optimized["optimization"]["duplicates"]),
+        "shadowed": len(optimized["optimization"]["shadowed"]),
+        "merged": len(optimized["optimization"]["merged"]),
+        "script_bytes": len(script),
+        "stages": stages,
+    }
+    result["total_ms"] = round(sum(stage["median_ms"] for stage in stages.values()), 3)
+
+    if nft_command:
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            applied = subprocess.run(nft_command, input=script, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     universal_newlines=True, timeout=600)
+            durations.append(time.perf_counter() - started)
+            if applied.returncode != 0:
+                stages["apply"] = {"error": applied.stderr.strip()[:500]}
+                break
+        else:
+            stages["apply"] = {
+                "median_ms": round(statistics.median(durations) * 1000, 3),
+                "min_ms": round(min(durations) * 1000, 3),
+                # Максимальный RSS среди всех завершенных дочерних процессов nft
+                "nft_maxrss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+            }
+    else:
+        stages["apply"] = {"skipped": "nft or network namespaces are not available"}
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-apply", action="store_true", help="Не применять скрипт даже при наличии nft")
+    parser.add_argument("--output", help="Файл для результата (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    # Предупреждения оптимизатора о конфликтующих синтетических правилах не нужны в выводе
+    logging.disable(logging.WARNING)
+    nft_command = [] if args.no_apply else netns_command()
+    result = {
+        "benchmark": "firewall",
+        "timestamp": round(time.time()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "apply": bool(nft_command),
+        "sizes": [bench_size(int(size), args.repeat, args.seed, nft_command) for size in args.sizes.split(",")],
+    }
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,9 +13,6 @@ DEFAULT_CONFIG_FILE = CONFIG_DIR / "default_config.yaml"
 # User configuration file
 USER_CONFIG_FILE = CONFIG_DIR / "user_config.yaml"
 
-# Ensure config directory exists
-CONFIG_DIR.mkdir(exist_ok=True)
-
 # YAML file extensions
 YAML_EXTENSIONS = ['.yaml', '.yml']
 
@@ -30,3 +27,15 @@ AVAILABLE_MODULES = {
     "routing": {"name": "Routing", "description": "Network routing configuration", "enabled": True, "core": False},
     "settings": {"name": "General Settings", "description": "System-wide settings", "enabled": True, "core": True},
 }
+
+# Debug mode: serve original static files instead of the built bundles
+DEBUG = os.environ.get("ARMROUTER_DEBUG", "").lower() in ("1", "true", "yes")
+
+# Number of web server workers (uvicorn and gunicorn read WEB_CONCURRENCY)
+WEB_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1") or 1)
+
+# Sample system metrics in one process and share them with all workers through shared memory
+SHARED_METRICS = WEB_WORKERS > 1 or os.environ.get("ARMROUTER_SHARED_METRICS", "").lower() in ("1", "true", "yes")
+
+# Start background services (shared metrics, WiFi monitor, channel planner); disabled for startup profiling
+BACKGROUND_SERVICES = os.environ.get("ARMROUTER_NO_BACKGROUND", "").lower() not in ("1", "true", "yes")
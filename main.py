@@ -1,4 +1,21 @@
-from app import app
+import sys
+import argparse
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ArmRouter web interface")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Measure cold start (imports and initialization) and exit; exit code 1 if over budget")
+    parser.add_argument("--startup-budget", type=float, default=None, help="Cold start budget in seconds")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from utils.startup_profiler import STARTUP_BUDGET, profile_startup, format_profile
+
+        profile = profile_startup(args.startup_budget or STARTUP_BUDGET)
+        print(format_profile(profile))
+        sys.exit(0 if profile["within_budget"] else 1)
+
+    import uvicorn
+    from app import app
+
+    uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -2,6 +2,9 @@ from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
 
 from utils.system_utils import SystemUtils
+from utils.executor import system_executor, BlockingCallTimeout, ExecutorBusy
+from utils.singleflight import request_coalescer
+from utils.shared_metrics import shared_metrics
 
 router = APIRouter(
     prefix="/api/dashboard",
@@ -14,7 +17,7 @@ async def get_system_info() -> Dict[str, Any]:
     """
     Get system information (hostname, platform, architecture, etc.)
     """
-    return SystemUtils.get_system_info()
+    return await system_executor.run(SystemUtils.get_system_info)
 
 @router.get("/statistics")
 async def get_statistics() -> Dict[str, Any]:
@@ -22,11 +25,26 @@ async def get_statistics() -> Dict[str, Any]:
     Get system statistics (CPU, memory, disk, network)
     """
     try:
-        return {
-            "cpu": SystemUtils.get_cpu_info(),
-            "memory": SystemUtils.get_memory_info(),
-            "disk": SystemUtils.get_disk_info(),
-            "uptime": SystemUtils.get_uptime()
-        }
+        # Sample published by the collector process when workers share metrics
+        statistics = shared_metrics.get("statistics")
+        if statistics is not None:
+            return statistics
+
+        # psutil sampling sleeps, so all readings are taken in one executor call,
+        # shared by concurrent requests and reused for a second
+        return await request_coalescer.run("dashboard-statistics", lambda: system_executor.run(_read_statistics),
+                                           ttl=1.0)
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting statistics: {str(e)}")
+
+def _read_statistics() -> Dict[str, Any]:
+    return {
+        "cpu": SystemUtils.get_cpu_info(),
+        "memory": SystemUtils.get_memory_info(),
+        "disk": SystemUtils.get_disk_info(),
+        "uptime": SystemUtils.get_uptime()
+    }
+
+shared_metrics.register("statistics", _read_statistics)
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Dict, Any
+
+from utils.executor import BlockingExecutor, BlockingCallTimeout, ExecutorBusy
+from utils.perf_metrics import perf_recorder, sample_stacks, MAX_PROFILE_SECONDS
+
+router = APIRouter(
+    prefix="/api/debug",
+    tags=["debug"],
+    responses={404: {"description": "Not found"}},
+)
+
+# One profiling session at a time; a concurrent request gets 503
+profile_executor = BlockingExecutor("profiler", max_workers=1, timeout=MAX_PROFILE_SECONDS + 5, max_pending=1)
+
+@router.get("/perf")
+async def get_perf() -> Dict[str, Any]:
+    """
+    Get per-route latency histograms (p50/p95/p99) and in-flight requests
+    """
+    return perf_recorder.snapshot()
+
+@router.delete("/perf")
+async def reset_perf() -> Dict[str, Any]:
+    """
+    Reset latency statistics
+    """
+    perf_recorder.reset()
+    return {"success": True}
+
+@router.get("/profile")
+async def get_profile(
+    seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS, description="Sampling duration"),
+    interval: float = Query(0.005, ge=0.001, le=1.0, description="Interval between samples")
+) -> PlainTextResponse:
+    """
+    Sample stacks of all threads and return them as collapsed stacks (flamegraph input)
+    """
+    try:
+        result = await profile_executor.run(sample_stacks, seconds, interval)
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error profiling process: {str(e)}")
+
+    return PlainTextResponse("\n".join(result["collapsed"]) + "\n", headers={"X-Profile-Samples": str(result["samples"])})
@@ -1,8 +1,15 @@
 from fastapi import APIRouter, HTTPException, Body
-from typing import Dict, Any
+from fastapi.responses import Response
+from typing import Dict, Any, List, Optional, Callable
 
-from utils.yaml_handler import YAMLHandler
-from config import DEFAULT_CONFIG_FILE, USER_CONFIG_FILE
+from utils.config_manager import ConfigManager
+from utils.firewall_compiler import FirewallCompiler, FirewallCompileError
+from utils.firewall_updater import firewall_updater
+from utils.firewall_simulator import FirewallSimulator
+from utils.firewall_counters import counter_collector
+from utils.firewall_rules import FirewallRuleStore, FirewallRuleIndex, FirewallRuleNotFound
+from utils.executor import system_executor, slow_executor, BlockingCallTimeout, ExecutorBusy
+from utils.json_response import response_cache
 
 router = APIRouter(
     prefix="/api/firewall",
@@ -10,54 +17,263 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# User rules with an in-memory index for paginated listing
+rule_store = FirewallRuleStore(
+    ConfigManager.get_firewall_config,
+    ConfigManager.update_firewall_config,
+    ConfigManager.get_config_path("firewall")
+)
+
 @router.get("/config")
-async def get_config() -> Dict[str, Any]:
+async def get_config(rules: bool = True) -> Response:
     """
     Get firewall configuration
     """
     try:
-        # Try to read from user config, fall back to default
-        try:
-            config = YAMLHandler.read_yaml(USER_CONFIG_FILE)
-            return {"firewall": config.get("firewall", {})}
-        except FileNotFoundError:
-            config = YAMLHandler.read_yaml(DEFAULT_CONFIG_FILE)
-            return {"firewall": config.get("firewall", {})}
+        # Encoded once per revision of firewall.yaml
+        return await _cached_response(("firewall-config", rules), ConfigManager.get_config_revision("firewall"),
+                                      lambda: _read_config(rules))
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading firewall configuration: {str(e)}")
 
+async def _cached_response(key: Any, revision: Any, producer: Callable[[], Any]) -> Response:
+    # Cache hits are served on the loop; a miss loads and encodes the rules in a worker thread
+    if response_cache.contains(key, revision):
+        return response_cache.response(key, revision, producer)
+    return await slow_executor.run(response_cache.response, key, revision, producer)
+
+async def _rule_index() -> FirewallRuleIndex:
+    # Rebuilding the index loads the whole firewall.yaml
+    return rule_store.current() or await slow_executor.run(rule_store.get_index)
+
+def _read_config(rules: bool) -> Dict[str, Any]:
+    firewall_config = ConfigManager.get_firewall_config()
+
+    # Without the rule list; rules are paged through /api/firewall/rules
+    if not rules:
+        rule_list = firewall_config.get("rules", []) or []
+        firewall_config = {key: value for key, value in firewall_config.items() if key != "rules"}
+        firewall_config["rules_count"] = len(rule_list)
+    return {"firewall": firewall_config}
+
 @router.put("/config")
 async def update_config(firewall_config: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
     """
     Update firewall configuration
     """
     try:
-        # Update the configuration
-        updated_config = YAMLHandler.update_yaml(
-            USER_CONFIG_FILE, 
-            {"firewall": firewall_config},
-            create_if_missing=True
-        )
-        
+        # Both {"firewall": {...}} and the bare configuration are accepted
+        if isinstance(firewall_config.get("firewall"), dict):
+            firewall_config = firewall_config["firewall"]
+
+        updated_config = await slow_executor.run(_update_config, firewall_config)
+
         return {
             "success": True,
             "message": "Firewall configuration updated successfully",
-            "config": updated_config.get("firewall", {})
+            "config": updated_config,
+            "firewall": updated_config
         }
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating firewall configuration: {str(e)}")
 
+def _update_config(firewall_config: Dict[str, Any]) -> Dict[str, Any]:
+    # Rules are edited one by one through /api/firewall/rules and kept when omitted
+    if "rules" not in firewall_config:
+        firewall_config["rules"] = ConfigManager.get_firewall_config().get("rules", [])
+    return ConfigManager.update_firewall_config(firewall_config)
+
+@router.get("/rules")
+async def list_rules(
+    sort: str = "priority",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    search: Optional[str] = None,
+    enabled: Optional[bool] = None,
+    chain: Optional[str] = None,
+    action: Optional[str] = None,
+    protocol: Optional[str] = None
+) -> Response:
+    """
+    List firewall rules with cursor pagination, sorting and filters
+    """
+    try:
+        index = await _rule_index()
+        key = ("firewall-rules", sort, order, cursor, limit, search, enabled, chain, action, protocol)
+        return response_cache.response(key, index.revision, lambda: index.query(
+            sort=sort, order=order, cursor=cursor, limit=limit, search=search,
+            enabled=enabled, chain=chain, action=action, protocol=protocol))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing firewall rules: {str(e)}")
+
+@router.post("/rules", status_code=201)
+async def create_rule(rule: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+    """
+    Add a firewall rule
+    """
+    try:
+        return {"success": True, "rule": await slow_executor.run(rule_store.create, rule)}
+    except (FirewallCompileError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating firewall rule: {str(e)}")
+
+@router.get("/rules/{rule_id}")
+async def get_rule(rule_id: str) -> Dict[str, Any]:
+    """
+    Get a firewall rule
+    """
+    try:
+        return {"rule": (await _rule_index()).get(rule_id)}
+    except FirewallRuleNotFound:
+        raise HTTPException(status_code=404, detail=f"Rule {rule_id} not found")
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading firewall rule: {str(e)}")
+
+@router.put("/rules/{rule_id}")
+async def replace_rule(rule_id: str, rule: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+    """
+    Replace a firewall rule
+    """
+    return await _update_rule(rule_id, rule, replace=True)
+
+@router.patch("/rules/{rule_id}")
+async def update_rule(rule_id: str, changes: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+    """
+    Update fields of a firewall rule
+    """
+    return await _update_rule(rule_id, changes, replace=False)
+
+async def _update_rule(rule_id: str, changes: Dict[str, Any], replace: bool) -> Dict[str, Any]:
+    try:
+        return {"success": True, "rule": await slow_executor.run(rule_store.update, rule_id, changes, replace=replace)}
+    except FirewallRuleNotFound:
+        raise HTTPException(status_code=404, detail=f"Rule {rule_id} not found")
+    except (FirewallCompileError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating firewall rule: {str(e)}")
+
+@router.delete("/rules/{rule_id}")
+async def delete_rule(rule_id: str) -> Dict[str, Any]:
+    """
+    Delete a firewall rule
+    """
+    try:
+        return {"success": True, "rule": await slow_executor.run(rule_store.delete, rule_id)}
+    except FirewallRuleNotFound:
+        raise HTTPException(status_code=404, detail=f"Rule {rule_id} not found")
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting firewall rule: {str(e)}")
+
+@router.get("/counters")
+async def get_counters(
+    sort: str = "packets",
+    order: str = "desc",
+    chain: Optional[str] = None,
+    unused: Optional[bool] = None,
+    search: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> Response:
+    """
+    Get per-rule hit counters and rates
+    """
+    try:
+        # The first request before a background sample reads the counters right away
+        if counter_collector.pending:
+            await system_executor.run(counter_collector.collect)
+        # Encoded once per counter sample
+        key = ("firewall-counters", sort, order, chain, unused, search, limit, offset)
+        return response_cache.response(key, counter_collector.revision, lambda: counter_collector.query(
+            sort=sort, order=order, chain=chain, unused=unused, search=search, limit=limit, offset=offset))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading firewall counters: {str(e)}")
+
+@router.get("/analyze")
+async def analyze_firewall() -> Dict[str, Any]:
+    """
+    Analyze firewall rules without applying them
+    """
+    try:
+        compiled = await slow_executor.run(_compile_current)
+        return {
+            "errors": compiled["errors"],
+            "optimization": compiled["optimization"],
+            "timings": compiled["timings"],
+        }
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing firewall rules: {str(e)}")
+
+def _compile_current() -> Dict[str, Any]:
+    return FirewallCompiler.compile(ConfigManager.get_firewall_config())
+
+@router.post("/simulate")
+async def simulate_firewall(request: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+    """
+    Evaluate test packets against the firewall configuration
+    """
+    # An unsaved configuration can be checked by passing it in "firewall"
+    firewall_config = request.get("firewall") or None
+    packets = request.get("packets", [request.get("packet") or {}])
+    if firewall_config is not None and not isinstance(firewall_config, dict):
+        raise HTTPException(status_code=400, detail="firewall must be an object")
+    if not isinstance(packets, list) or not all(isinstance(packet, dict) for packet in packets):
+        raise HTTPException(status_code=400, detail="packets must be a list of objects")
+
+    try:
+        return await slow_executor.run(_simulate, firewall_config, packets)
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error simulating firewall: {str(e)}")
+
+def _simulate(firewall_config: Optional[Dict[str, Any]], packets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    simulator = FirewallSimulator(firewall_config if firewall_config is not None else ConfigManager.get_firewall_config())
+    return {**simulator.evaluate_many(packets), "errors": simulator.errors}
+
 @router.post("/restart")
-async def restart_firewall() -> Dict[str, Any]:
+async def restart_firewall(full: bool = False) -> Dict[str, Any]:
     """
     Restart firewall service
     """
     try:
-        # This would actually call a system utility function
-        # For now, just return success
+        # Apply only the changed rules unless a full reload is requested
+        result = await slow_executor.run(_apply_current, full)
+        if not result["success"]:
+            raise HTTPException(status_code=500, detail=result)
+
         return {
-            "success": True,
+            **result,
             "message": "Firewall service restarted successfully"
         }
+    except (HTTPException, BlockingCallTimeout, ExecutorBusy):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error restarting firewall service: {str(e)}")
+
+def _apply_current(full: bool) -> Dict[str, Any]:
+    return firewall_updater.apply(ConfigManager.get_firewall_config(), force_full=full)
@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException, Body
 from typing import Dict, Any
 
 from utils.system_utils import SystemUtils
+from utils.executor import system_executor, slow_executor, BlockingCallTimeout, ExecutorBusy
+from utils.netlink_monitor import get_monitor
 from utils.yaml_handler import YAMLHandler
 from config import DEFAULT_CONFIG_FILE, USER_CONFIG_FILE
 
@@ -16,7 +18,18 @@ async def get_interfaces() -> Dict[str, Any]:
     """
     Get network interface information
     """
-    return SystemUtils.get_network_interfaces()
+    return await system_executor.run(SystemUtils.get_network_interfaces)
+
+@router.get("/links")
+async def get_links() -> Dict[str, Any]:
+    """
+    Get link state and addresses of all interfaces from the netlink monitor
+    """
+    monitor = get_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=503, detail="Netlink monitor is not available")
+
+    return monitor.get_links()
 
 @router.get("/config")
 async def get_config() -> Dict[str, Any]:
@@ -200,7 +213,7 @@ async def restart_network(interface_data: Dict[str, Any] = Body(None)) -> Dict[s
             # В идеале, надо реализовать этот метод в SystemUtils
             
             # Для демонстрации используем общий метод restart_network_service
-            result = SystemUtils.restart_network_service()
+            result = await slow_executor.run(SystemUtils.restart_network_service)
             
             if result:
                 return {
@@ -215,7 +228,7 @@ async def restart_network(interface_data: Dict[str, Any] = Body(None)) -> Dict[s
         else:
             # Перезапускаем всю сетевую службу
             logger.info("Restarting entire network service")
-            result = SystemUtils.restart_network_service()
+            result = await slow_executor.run(SystemUtils.restart_network_service)
             
             if result:
                 return {
@@ -227,6 +240,8 @@ async def restart_network(interface_data: Dict[str, Any] = Body(None)) -> Dict[s
                     "success": False,
                     "message": "Failed to restart network service"
                 }
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
     except Exception as e:
         logger.error(f"Error restarting network service: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error restarting network service: {str(e)}")
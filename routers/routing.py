@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException, Body
-from typing import Dict, Any, List
+from fastapi import APIRouter, HTTPException, Body, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
 
 from utils.system_utils import SystemUtils
+from utils.executor import system_executor, BlockingCallTimeout, ExecutorBusy
+from utils.singleflight import request_coalescer
+from utils.netlink_monitor import get_monitor, event_stream
 from utils.yaml_handler import YAMLHandler
 from config import DEFAULT_CONFIG_FILE, USER_CONFIG_FILE
 
@@ -17,10 +21,57 @@ async def get_routing_table() -> List[Dict[str, Any]]:
     Get routing table
     """
     try:
-        return SystemUtils.get_routing_table()
+        # Read from the in-memory table kept current by netlink events
+        monitor = get_monitor()
+        if monitor is not None:
+            return monitor.get_routing_table()
+        return await request_coalescer.run(
+            "routing-table", lambda: system_executor.run(SystemUtils.get_routing_table), ttl=2.0)
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting routing table: {str(e)}")
 
+@router.get("/routes")
+async def get_routes(
+    family: Optional[str] = Query(None, description="Address family: ipv4 or ipv6"),
+    table: Optional[int] = Query(None, description="Routing table id")
+) -> Dict[str, Any]:
+    """
+    Get all kernel routes (IPv4 and IPv6, every table) from the netlink monitor
+    """
+    monitor = get_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=503, detail="Netlink monitor is not available")
+
+    return {"revision": monitor.revision, "routes": monitor.get_routes(family, table)}
+
+@router.get("/changes")
+async def get_changes(since: int = Query(0, description="Last revision known to the client")) -> Dict[str, Any]:
+    """
+    Get route, link and address changes after the given revision
+    """
+    monitor = get_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=503, detail="Netlink monitor is not available")
+
+    return monitor.changes_since(since)
+
+@router.get("/events")
+async def get_events(since: Optional[int] = Query(None, description="Replay changes after this revision")):
+    """
+    Stream route, link and address changes as Server-Sent Events
+    """
+    monitor = get_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=503, detail="Netlink monitor is not available")
+
+    return StreamingResponse(
+        event_stream(monitor, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @router.get("/config")
 async def get_config() -> Dict[str, Any]:
     """
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Body
 from typing import Dict, Any
 
 from utils.system_utils import SystemUtils
+from utils.executor import system_executor, BlockingCallTimeout, ExecutorBusy
 from utils.yaml_handler import YAMLHandler
 from config import DEFAULT_CONFIG_FILE, USER_CONFIG_FILE
 
@@ -42,16 +43,18 @@ async def update_system_settings(system_settings: Dict[str, Any] = Body(...)) ->
         
         # Apply the settings
         if "hostname" in system_settings:
-            SystemUtils.set_hostname(system_settings["hostname"])
+            await system_executor.run(SystemUtils.set_hostname, system_settings["hostname"])
             
         if "timezone" in system_settings:
-            SystemUtils.set_timezone(system_settings["timezone"])
+            await system_executor.run(SystemUtils.set_timezone, system_settings["timezone"])
         
         return {
             "success": True,
             "message": "System settings updated successfully",
             "config": updated_config.get("system", {})
         }
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating system settings: {str(e)}")
 
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import Response
 from typing import Dict, Any
 
-from utils.yaml_handler import YAMLHandler
-from config import DEFAULT_CONFIG_FILE, USER_CONFIG_FILE
+from utils.config_manager import ConfigManager
+from utils.load_balancer import balancer_service
+from utils.executor import slow_executor, BlockingCallTimeout, ExecutorBusy
+from utils.json_response import response_cache
 
 router = APIRouter(
     prefix="/api/tunnel",
@@ -11,18 +14,14 @@ router = APIRouter(
 )
 
 @router.get("/config")
-async def get_config() -> Dict[str, Any]:
+async def get_config() -> Response:
     """
     Get tunnel configuration
     """
     try:
-        # Try to read from user config, fall back to default
-        try:
-            config = YAMLHandler.read_yaml(USER_CONFIG_FILE)
-            return {"tunnel": config.get("tunnel", {})}
-        except FileNotFoundError:
-            config = YAMLHandler.read_yaml(DEFAULT_CONFIG_FILE)
-            return {"tunnel": config.get("tunnel", {})}
+        # Encoded once per revision of tunnel.yaml
+        return response_cache.response("tunnel-config", ConfigManager.get_config_revision("tunnel"),
+                                       lambda: {"tunnel": ConfigManager.get_tunnel_config()})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading tunnel configuration: {str(e)}")
 
@@ -32,17 +31,20 @@ async def update_config(tunnel_config: Dict[str, Any] = Body(...)) -> Dict[str,
     Update tunnel configuration
     """
     try:
-        # Update the configuration
-        updated_config = YAMLHandler.update_yaml(
-            USER_CONFIG_FILE, 
-            {"tunnel": tunnel_config},
-            create_if_missing=True
-        )
-        
+        # Both {"tunnel": {...}} and the bare configuration are accepted
+        if isinstance(tunnel_config.get("tunnel"), dict):
+            tunnel_config = tunnel_config["tunnel"]
+
+        # Tunnels are edited on their own forms and kept when omitted
+        if "tunnels" not in tunnel_config:
+            tunnel_config["tunnels"] = ConfigManager.get_tunnel_config().get("tunnels", [])
+        updated_config = ConfigManager.update_tunnel_config(tunnel_config)
+
         return {
             "success": True,
             "message": "Tunnel configuration updated successfully",
-            "config": updated_config.get("tunnel", {})
+            "config": updated_config,
+            "tunnel": updated_config
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating tunnel configuration: {str(e)}")
@@ -53,11 +55,28 @@ async def restart_tunnel() -> Dict[str, Any]:
     Restart tunnel service
     """
     try:
-        # This would actually call a system utility function
-        # For now, just return success
+        # Apply per-tunnel routing tables and flow distribution
+        tunnel_config = ConfigManager.get_tunnel_config()
+        result = await slow_executor.run(balancer_service.reload, tunnel_config)
+        if not result["success"]:
+            raise HTTPException(status_code=500, detail=f"Error applying tunnel routing: {result.get('error', '')}")
+
         return {
             "success": True,
-            "message": "Tunnel service restarted successfully"
+            "message": "Tunnel service restarted successfully",
+            "balancer": result["weights"]
         }
+    except (HTTPException, BlockingCallTimeout, ExecutorBusy):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error restarting tunnel service: {str(e)}")
+
+@router.get("/balancer")
+async def get_balancer() -> Dict[str, Any]:
+    """
+    Get tunnel load balancer state (mode, algorithm, per-tunnel share and health)
+    """
+    try:
+        return balancer_service.status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting balancer status: {str(e)}")
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException, Body
-from typing import Dict, Any, List
+from fastapi import APIRouter, HTTPException, Body, Query
+from fastapi.responses import Response, StreamingResponse
+from typing import Dict, Any, Optional
 
-from utils.system_utils import SystemUtils
+from utils.executor import system_executor, BlockingCallTimeout, ExecutorBusy
+from utils.wifi_scan import wifi_scan_service
+from utils.bss_table import bss_table, bss_monitor
+from utils.channel_planner import channel_planner
+from utils.json_response import FastJSONResponse
 from utils.yaml_handler import YAMLHandler
 from config import DEFAULT_CONFIG_FILE, USER_CONFIG_FILE
 
@@ -108,12 +113,124 @@ async def update_config(wifi_config: Dict[str, Any] = Body(...)) -> Dict[str, An
         raise HTTPException(status_code=500, detail=f"Error updating WiFi configuration: {str(e)}")
 
 @router.get("/scan")
-async def scan_networks() -> List[Dict[str, Any]]:
+async def scan_networks(adapter: Optional[str] = None, force: bool = False) -> Response:
     """
-    Scan for available WiFi networks
+    Scan for available WiFi networks (waits for the scan; fresh cached results are returned at once)
     """
     try:
-        networks = SystemUtils.get_wifi_networks()
-        return networks
+        scan_adapter = await wifi_scan_service.resolve_adapter(adapter)
+        if scan_adapter is None:
+            return FastJSONResponse([])
+        # Network lists are encoded directly, without jsonable_encoder
+        return FastJSONResponse(await wifi_scan_service.scan(scan_adapter, force=force))
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error scanning WiFi networks: {str(e)}")
+
+@router.post("/scan", status_code=202)
+async def start_scan(request: Dict[str, Any] = Body(default={})) -> Dict[str, Any]:
+    """
+    Start a WiFi scan job; a scan already running on the adapter is joined instead
+    """
+    try:
+        scan_adapter = await wifi_scan_service.resolve_adapter(request.get("adapter"))
+        if scan_adapter is None:
+            raise HTTPException(status_code=404, detail="No WiFi adapters found")
+        return {"job": wifi_scan_service.start(scan_adapter, force=bool(request.get("force", False)))}
+    except (HTTPException, BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error starting WiFi scan: {str(e)}")
+
+@router.get("/survey")
+async def survey_networks(
+    adapters: Optional[str] = Query(None, description="Comma-separated adapters to scan (default: all)"),
+    force: bool = False
+) -> Response:
+    """
+    Scan several WiFi adapters concurrently and return networks merged by BSSID
+    """
+    try:
+        requested = [name.strip() for name in adapters.split(",") if name.strip()] if adapters else None
+        scan_adapters = await wifi_scan_service.resolve_adapters(requested)
+        return FastJSONResponse(await wifi_scan_service.survey(scan_adapters, force=force))
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error surveying WiFi networks: {str(e)}")
+
+@router.get("/bss")
+async def get_bss_table(since: int = Query(0, ge=0, description="Last revision known to the client")) -> Response:
+    """
+    Get neighbouring BSS entries changed after the given revision (all entries for 0)
+    """
+    return FastJSONResponse({**bss_table.changes_since(since), "monitoring": bss_monitor.running})
+
+@router.get("/recommend-channel")
+async def recommend_channel(
+    adapter: Optional[str] = Query(None, description="Access point adapter whose current channel is compared"),
+    band: Optional[str] = Query(None, pattern=r"^(2\.4|5|6)$", description="Band: 2.4, 5 or 6"),
+    width: Optional[int] = Query(None, description="Channel width in MHz: 20, 40, 80 or 160"),
+    dfs: Optional[bool] = Query(None, description="Include 5 GHz DFS channels"),
+    rescan: bool = Query(False, description="Rescan all adapters even if fresh results exist")
+) -> Response:
+    """
+    Score every allowed channel of the band from scan data and recommend the best one
+    """
+    if width is not None and width not in (20, 40, 80, 160):
+        raise HTTPException(status_code=400, detail="Width must be 20, 40, 80 or 160")
+    try:
+        # Scan results feed the BSS table the recommendation is computed from
+        scan_adapters = await wifi_scan_service.resolve_adapters()
+        survey = await wifi_scan_service.survey(scan_adapters, force=rescan)
+        result = await system_executor.run(channel_planner.recommend, adapter, band, width, dfs)
+    except (BlockingCallTimeout, ExecutorBusy):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error recommending WiFi channel: {str(e)}")
+
+    return FastJSONResponse({
+        **result,
+        "scan_errors": survey["errors"],
+        "auto_apply": {
+            "enabled": channel_planner.running,
+            "last_run": channel_planner.last_run,
+            "last_changes": channel_planner.last_changes,
+        },
+    })
+
+@router.get("/scan/results")
+async def get_scan_results(adapter: Optional[str] = None) -> Response:
+    """
+    Get the last scan results of an adapter without scanning
+    """
+    scan_adapter = await wifi_scan_service.resolve_adapter(adapter)
+    results = wifi_scan_service.get_results(scan_adapter) if scan_adapter else None
+    if results is None:
+        raise HTTPException(status_code=404, detail="No scan results")
+    return FastJSONResponse(results)
+
+@router.get("/scan/jobs/{job_id}")
+async def get_scan_job(job_id: str, wait: float = Query(0, ge=0, le=30, description="Seconds to wait for completion")) -> Response:
+    """
+    Get WiFi scan job status and, once done, the networks found
+    """
+    job = await wifi_scan_service.wait(job_id, wait) if wait else wifi_scan_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Scan job {job_id} not found")
+    return FastJSONResponse({"job": job})
+
+@router.get("/scan/jobs/{job_id}/events")
+async def stream_scan_job(job_id: str):
+    """
+    Stream WiFi scan job progress as Server-Sent Events
+    """
+    if wifi_scan_service.get_job(job_id, include_networks=False) is None:
+        raise HTTPException(status_code=404, detail=f"Scan job {job_id} not found")
+
+    return StreamingResponse(
+        wifi_scan_service.event_stream(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
@@ -15,7 +15,7 @@ function loadFirewallModule() {
     if (window.IconsLoader) window.IconsLoader.init();
     
     // Load firewall configuration
-    api.get('/api/firewall/config')
+    api.get('/api/firewall/config?rules=false')
         .then(data => {
             console.log('Получены данные брандмауэра:', data);
             // Create module content
@@ -24,6 +24,9 @@ function loadFirewallModule() {
             // Set up form submission handler
             setupFirewallForm();
             
+            // Highlight open ports whose rules have no hits
+            highlightUnusedRules();
+            
             // Initialize icons
             if (window.IconsLoader) window.IconsLoader.init();
         })
@@ -449,6 +452,46 @@ function createPortsTableRows(ports) {
     `).join('');
 }
 
+/**
+ * Highlight open port rows whose firewall rules have no hits.
+ * Counters are filtered on the server, so one request covers all rules.
+ */
+function highlightUnusedRules() {
+    api.get('/api/firewall/counters?chain=input')
+        .then(data => {
+            const unused = new Set();
+            const used = new Map();
+            (data.counters || []).forEach(counter => {
+                const ids = counter.merged && counter.merged.length ? counter.merged : [counter.id];
+                ids.forEach(id => {
+                    if (counter.packets === 0) {
+                        unused.add(id);
+                    } else if (ids.length === 1) {
+                        used.set(id, counter);
+                    }
+                });
+            });
+            
+            document.querySelectorAll('#ports-body tr[data-index]').forEach(row => {
+                const port = row.querySelector('input[name$=".port"]');
+                const protocol = row.querySelector('select[name$=".protocol"]');
+                if (!port || !protocol) return;
+                
+                const ruleId = `port-${protocol.value}-${port.value}`;
+                row.classList.toggle('rule-unused', unused.has(ruleId));
+                if (unused.has(ruleId)) {
+                    row.title = 'Правило не срабатывало с момента применения';
+                } else if (used.has(ruleId)) {
+                    const counter = used.get(ruleId);
+                    row.title = `Пакетов: ${counter.packets}, скорость: ${counter.pps} пакетов/с`;
+                }
+            });
+        })
+        .catch(error => {
+            console.error('Error loading firewall counters:', error);
+        });
+}
+
 /**
  * Set up firewall form handlers
  */
@@ -1197,13 +1240,16 @@ function showChainRules(chainName) {
                                     <th style="width: 15%">Действия</th>
                                 </tr>
                             </thead>
-                            <tbody>
+                            <tbody id="chain-rules-body">
                                 <tr>
-                                    <td colspan="5" class="empty-row">Нет правил в цепочке</td>
+                                    <td colspan="5" class="empty-row">Загрузка...</td>
                                 </tr>
                             </tbody>
                         </table>
                     </div>
+                    <button type="button" class="btn btn-outline btn-sm" id="load-more-rules-btn" style="display: none">
+                        Показать еще
+                    </button>
                 </div>
                 <div class="modal-footer">
                     <button type="button" class="btn btn-outline" id="add-rule-btn">
@@ -1238,19 +1284,108 @@ function showChainRules(chainName) {
     const addRuleBtn = modal.querySelector('#add-rule-btn');
     if (addRuleBtn) {
         addRuleBtn.addEventListener('click', () => {
-            showAddRuleDialog(chainName);
+            showAddRuleDialog(chainName, () => loadChainRules(modal, chainName));
         });
     }
     
-    // TODO: Fetch rules from the server
-    // This would be implemented in a real application
+    // Rules are loaded page by page, the full rule list is never requested
+    loadChainRules(modal, chainName);
+}
+
+/**
+ * Load a page of chain rules from the server
+ * @param {HTMLElement} modal - Chain rules modal
+ * @param {string} chainName - Name of the chain
+ * @param {string|null} cursor - Cursor of the next page, null to reload from the start
+ */
+function loadChainRules(modal, chainName, cursor = null) {
+    const tbody = modal.querySelector('#chain-rules-body');
+    const loadMoreBtn = modal.querySelector('#load-more-rules-btn');
+    const params = new URLSearchParams({ chain: chainName, sort: 'priority', limit: '50' });
+    if (cursor) params.set('cursor', cursor);
+    
+    api.get(`/api/firewall/rules?${params.toString()}`)
+        .then(data => {
+            if (!cursor) tbody.innerHTML = '';
+            
+            if (data.total === 0) {
+                tbody.innerHTML = '<tr><td colspan="5" class="empty-row">Нет правил в цепочке</td></tr>';
+            }
+            
+            const offset = tbody.querySelectorAll('tr[data-rule-id]').length;
+            tbody.insertAdjacentHTML('beforeend', (data.rules || []).map((rule, index) => createRuleRow(rule, offset + index)).join(''));
+            
+            tbody.querySelectorAll('.delete-rule-btn:not([data-bound])').forEach(button => {
+                button.setAttribute('data-bound', 'true');
+                button.addEventListener('click', () => {
+                    deleteRule(button.getAttribute('data-rule-id'), () => loadChainRules(modal, chainName));
+                });
+            });
+            
+            loadMoreBtn.style.display = data.next_cursor ? '' : 'none';
+            loadMoreBtn.onclick = () => loadChainRules(modal, chainName, data.next_cursor);
+            
+            if (window.IconsLoader) window.IconsLoader.init(tbody);
+        })
+        .catch(error => {
+            console.error('Error loading chain rules:', error);
+            tbody.innerHTML = '<tr><td colspan="5" class="empty-row">Ошибка загрузки правил</td></tr>';
+        });
+}
+
+/**
+ * Create a table row for a firewall rule
+ * @param {object} rule - Firewall rule
+ * @param {number} index - Row number
+ * @returns {string} - HTML content for the row
+ */
+function createRuleRow(rule, index) {
+    const conditions = [];
+    if (rule.source) conditions.push(`из ${rule.source}`);
+    if (rule.destination) conditions.push(`в ${rule.destination}`);
+    if (rule.destination_port) conditions.push(`порт ${rule.destination_port}`);
+    if (rule.in_interface) conditions.push(`интерфейс ${rule.in_interface}`);
+    
+    return `
+        <tr data-rule-id="${rule.id}" class="${rule.enabled === false ? 'text-muted' : ''}">
+            <td>${index + 1}</td>
+            <td>${rule.action || 'ACCEPT'}</td>
+            <td>${rule.name ? `<strong>${rule.name}</strong> ` : ''}${conditions.join(', ') || 'любой трафик'}</td>
+            <td>${(rule.protocol || 'all').toUpperCase()}</td>
+            <td>
+                <button type="button" class="btn btn-icon btn-sm btn-danger delete-rule-btn" data-rule-id="${rule.id}">
+                    <span data-icon="trash-2"></span>
+                </button>
+            </td>
+        </tr>
+    `;
+}
+
+/**
+ * Delete a firewall rule
+ * @param {string} ruleId - Rule identifier
+ * @param {Function} onDeleted - Callback after the rule is deleted
+ */
+function deleteRule(ruleId, onDeleted) {
+    if (!confirm('Удалить правило?')) return;
+    
+    api.delete(`/api/firewall/rules/${encodeURIComponent(ruleId)}`)
+        .then(() => {
+            showNotification('success', 'Правило удалено', 'Правило удалено из конфигурации');
+            if (onDeleted) onDeleted();
+        })
+        .catch(error => {
+            console.error('Error deleting rule:', error);
+            showNotification('error', 'Ошибка', `Не удалось удалить правило: ${error.message}`);
+        });
 }
 
 /**
  * Show dialog to add a new rule to a chain
  * @param {string} chainName - Name of the chain to add a rule to
+ * @param {Function} onAdded - Callback after the rule is saved
  */
-function showAddRuleDialog(chainName) {
+function showAddRuleDialog(chainName, onAdded) {
     // Create modal
     const modal = document.createElement('div');
     modal.className = 'modal';
@@ -1344,14 +1479,23 @@ function showAddRuleDialog(chainName) {
         const destinationPort = form.elements['destination_port'].value;
         const comment = form.elements['comment'].value;
         
-        // TODO: Save rule to the server
-        // This would be implemented in a real application
+        const rule = { chain: chainName, action: action, protocol: protocol };
+        if (source) rule.source = source;
+        if (destination) rule.destination = destination;
+        if (destinationPort) rule.destination_port = destinationPort;
+        if (comment) rule.name = comment;
         
-        // Close modal
-        closeModal(modal);
-        
-        // Show notification
-        showNotification('success', 'Правило добавлено', `Правило добавлено в цепочку "${chainName}"`);
+        // Only the new rule is sent to the server
+        api.post('/api/firewall/rules', rule)
+            .then(() => {
+                closeModal(modal);
+                showNotification('success', 'Правило добавлено', `Правило добавлено в цепочку "${chainName}"`);
+                if (onAdded) onAdded();
+            })
+            .catch(error => {
+                console.error('Error adding rule:', error);
+                showNotification('error', 'Ошибка', `Не удалось добавить правило: ${error.message}`);
+            });
     });
 }
 
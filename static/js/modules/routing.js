@@ -26,6 +26,9 @@ function loadRoutingModule() {
         // Set up form submission handler
         setupRoutingForm();
         
+        // Subscribe to route change events
+        subscribeRoutingEvents();
+        
         // Initialize feather icons
         feather.replace();
     })
@@ -353,6 +356,54 @@ function refreshRoutingTable() {
         });
 }
 
+/**
+ * Subscribe to route change events pushed by the server.
+ * The table is reloaded from the server-side in-memory snapshot only when
+ * a route actually changes, instead of polling the kernel routing table.
+ */
+let routingEventSource = null;
+let routingRefreshTimer = null;
+
+function subscribeRoutingEvents() {
+    if (!window.EventSource || routingEventSource) {
+        return;
+    }
+    
+    routingEventSource = new EventSource('/api/routing/events');
+    routingEventSource.onmessage = (event) => {
+        const change = JSON.parse(event.data);
+        if (change.kind === 'route') {
+            scheduleRoutingRefresh();
+        }
+    };
+    // Dropped events are signalled by a named "reset" event, which never
+    // reaches onmessage: reload the whole table from the snapshot
+    routingEventSource.addEventListener('reset', scheduleRoutingRefresh);
+    routingEventSource.onerror = () => {
+        // Netlink monitor unavailable: fall back to the manual refresh button
+        if (routingEventSource.readyState === EventSource.CLOSED) {
+            routingEventSource = null;
+        }
+    };
+}
+
+/**
+ * Reload the routing table, coalescing bursts of changes into a single request
+ */
+function scheduleRoutingRefresh() {
+    clearTimeout(routingRefreshTimer);
+    routingRefreshTimer = setTimeout(() => {
+        if (!document.getElementById('routing-table-body')) {
+            return;
+        }
+        api.get('/routing/table')
+            .then(routes => {
+                document.getElementById('routing-table-body').innerHTML = createRoutingTableRows(routes);
+            })
+            .catch(error => console.error('Error refreshing routing table:', error));
+    }, 250);
+}
+
 /**
  * Save routing configuration
  * @param {HTMLFormElement} form - Routing configuration form
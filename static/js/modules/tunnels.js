@@ -447,7 +447,7 @@ function setupGeneralSettingsEvents(config) {
     const saveBtn = document.getElementById('save-general-settings-btn');
     if (saveBtn) {
         saveBtn.addEventListener('click', function() {
-            saveGeneralSettings();
+            saveGeneralSettings(config);
         });
     }
     
@@ -462,8 +462,9 @@ function setupGeneralSettingsEvents(config) {
 
 /**
  * Сохранить общие настройки туннелей
+ * @param {Object} config - Конфигурация туннелей
  */
-function saveGeneralSettings() {
+function saveGeneralSettings(config) {
     // Сбор данных формы
     const generalConfig = {
         enabled: document.querySelector('input[name="tunnel.enabled"]').checked,
@@ -477,7 +478,8 @@ function saveGeneralSettings() {
             generalConfig.backup_tunnel = document.querySelector('select[name="tunnel.backup_tunnel"]').value;
             break;
         case 'balanced':
-            // Добавить логику сбора данных о балансировке
+            generalConfig.balancing_method = document.querySelector('select[name="tunnel.balancing_method"]').value;
+            generalConfig.balanced_tunnels = config.tunnel.balanced_tunnels || [];
             break;
         case 'geo':
             // Добавить логику сбора данных о геомаршрутизации
@@ -493,7 +495,8 @@ function saveGeneralSettings() {
     // Отправка данных на сервер
     showNotification('Сохранение настроек...', 'info');
     
-    API.post('/api/tunnel/config', { tunnel: generalConfig })
+    // Конфигурация сохраняется целиком: остальные настройки и туннели не меняются
+    API.put('/api/tunnel/config', { tunnel: { ...config.tunnel, ...generalConfig } })
         .then(response => {
             console.log('Настройки туннелей сохранены:', response);
             showNotification('Настройки туннелей успешно сохранены', 'success');
@@ -510,7 +510,7 @@ function setupScanButtons() {
     if (refreshScanBtn) {
         refreshScanBtn.addEventListener('click', () => {
             if (scanningAdapter) {
-                scanWifiNetworks(scanningAdapter);
+                scanWifiNetworks(scanningAdapter, true);
             }
         });
     }
@@ -853,10 +853,12 @@ function updateAdapterTabBadge(adapterName, adapterConfig) {
 }
 
 /**
- * Scan for available WiFi networks using specified adapter
+ * Scan for available WiFi networks using specified adapter.
+ * The last results are shown at once while the scan job runs.
  * @param {string} adapterName - Name of adapter to use for scanning
+ * @param {boolean} [force=false] - Rescan even if recent results exist
  */
-function scanWifiNetworks(adapterName) {
+function scanWifiNetworks(adapterName, force = false) {
     // Show scan results section
     const scanResults = document.getElementById('wifi-scan-results');
     scanResults.style.display = '';
@@ -872,33 +874,75 @@ function scanWifiNetworks(adapterName) {
     container.innerHTML = '<div class="loading-spinner"><span data-icon="loader"></span> Сканирование...</div>';
     if (window.IconsLoader) window.IconsLoader.init(container);
     
-    // Make API call to scan networks
-    api.get(`/api/wifi/scan?adapter=${adapterName}`)
-        .then(networks => {
-            // Clear container
-            container.innerHTML = '';
-            
-            if (!networks || networks.length === 0) {
-                container.innerHTML = '<div class="empty-state">Не найдено WiFi сетей</div>';
-                return;
+    let scanFinished = false;
+    
+    // Last results of the adapter, if any, until the new scan completes
+    api.get(`/api/wifi/scan/results?adapter=${encodeURIComponent(adapterName)}`)
+        .then(results => {
+            if (!scanFinished && results.networks && results.networks.length > 0) {
+                renderScanResults(container, results.networks, true);
             }
-            
-            // Create HTML for networks list
-            container.innerHTML = createNetworkListHtml(networks);
-            
-            // Initialize icons
-            if (window.IconsLoader) window.IconsLoader.init(container);
-            
-            // Setup network selection
-            setupNetworkSelection();
+        })
+        .catch(() => {});
+    
+    // Start a scan job (joins a scan already running on the adapter) and wait for it
+    api.post('/api/wifi/scan', { adapter: adapterName, force: force })
+        .then(response => waitForScanJob(response.job))
+        .then(job => {
+            scanFinished = true;
+            renderScanResults(container, job.networks || [], false);
         })
         .catch(error => {
+            scanFinished = true;
             console.error('Ошибка сканирования WiFi сетей:', error);
             container.innerHTML = createErrorState('Ошибка сканирования WiFi сетей', error.message || '');
             if (window.IconsLoader) window.IconsLoader.init(container);
         });
 }
 
+/**
+ * Wait for a scan job to finish using long polling
+ * @param {object} job - Scan job returned by the API
+ * @returns {Promise<object>} - Finished job with networks
+ */
+function waitForScanJob(job) {
+    return api.get(`/api/wifi/scan/jobs/${job.id}?wait=10`)
+        .then(response => {
+            const current = response.job;
+            if (current.status === 'running') {
+                return waitForScanJob(current);
+            }
+            if (current.status === 'failed') {
+                throw new Error(current.error || 'Сканирование не удалось');
+            }
+            return current;
+        });
+}
+
+/**
+ * Render scan results into the container
+ * @param {HTMLElement} container - Results container
+ * @param {Array} networks - List of WiFi networks
+ * @param {boolean} pending - Results are from a previous scan and a new one is running
+ */
+function renderScanResults(container, networks, pending) {
+    if (!networks || networks.length === 0) {
+        container.innerHTML = '<div class="empty-state">Не найдено WiFi сетей</div>';
+        return;
+    }
+    
+    // Create HTML for networks list
+    container.innerHTML = (pending
+        ? '<div class="loading-spinner"><span data-icon="loader"></span> Обновление результатов...</div>'
+        : '') + createNetworkListHtml(networks);
+    
+    // Initialize icons
+    if (window.IconsLoader) window.IconsLoader.init(container);
+    
+    // Setup network selection
+    setupNetworkSelection();
+}
+
 /**
  * Create HTML for network list
  * @param {Array} networks - List of WiFi networks
@@ -910,7 +954,8 @@ function createNetworkListHtml(networks) {
     networks.forEach(network => {
         const ssid = network.ssid || 'Скрытая сеть';
         const signalClass = getSignalClass(network.signal_strength || network.signal || 0);
-        const security = network.security || (network.encryption === 'none' ? 'Открытая' : 'Защищенная');
+        const security = network.security === 'Open' ? 'Открытая'
+            : network.security || (network.encryption === 'none' ? 'Открытая' : 'Защищенная');
         const frequency = network.frequency || '';
         const channel = network.channel ? `(Канал ${network.channel})` : '';
         
@@ -1009,6 +1054,8 @@ function selectWifiNetwork(network) {
         // Map security type to encryption value
         const securityMap = {
             'WPA2': 'wpa2',
+            'WPA2/WPA3': 'wpa2',
+            'WPA/WPA2': 'wpa2',
             'WPA': 'wpa',
             'WEP': 'wep',
             'Open': 'none',
@@ -0,0 +1,6 @@
+from utils.startup_profiler import profile_startup, format_profile
+
+
+def test_startup_within_budget():
+    profile = profile_startup()
+    assert profile["within_budget"], format_profile(profile)
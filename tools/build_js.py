@@ -0,0 +1,297 @@
+"""
+Сборка JavaScript страниц в бандлы: скрипты, подключенные на странице через
+script_bundle('имя', 'файл1.js', 'файл2.js', ...), объединяются в один файл
+js/bundles/<имя>.js и минифицируются. Файлы static/js, не подключенные ни
+одной страницей, в бандлы не попадают и перечисляются в отчете.
+
+Минификация выполняется модулем rjsmin, если он установлен, иначе
+встроенным консервативным минификатором (удаление комментариев и лишних
+пробелов без переименования). Node.js не требуется.
+
+Бандлы собираются вместе с остальной статикой:
+    python -m tools.build_static
+Отчет о размерах без записи файлов:
+    python -m tools.build_js
+"""
+import re
+import gzip
+import argparse
+from typing import Dict, Any, List, Tuple
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+from config import BASE_DIR
+
+STATIC_DIR = BASE_DIR / "static"
+TEMPLATES_DIR = BASE_DIR / "templates"
+BUNDLE_DIR = "js/bundles"
+
+# Вызов script_bundle('имя', 'файл', ...) в шаблоне
+BUNDLE_CALL = re.compile(r"script_bundle\(\s*'([\w-]+)'((?:\s*,\s*'[^']+')+)\s*\)")
+STATIC_REFERENCE = re.compile(r"filename\s*=\s*'(js/[^']+)'")
+
+# Символы и ключевые слова, после которых / начинает регулярное выражение, а не деление
+REGEX_PREFIX_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_PREFIX_WORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void",
+                      "throw", "instanceof", "yield", "await"}
+
+# Перевод строки после этих символов не может завершить выражение (ASI)
+NEWLINE_DROP_AFTER = set("{;,([")
+NEWLINE_DROP_BEFORE = set(")]},;")
+
+
+def _word_char(char: str) -> bool:
+    return char.isalnum() or char in "_$\\" or ord(char) > 127
+
+
+def _skip_string(source: str, start: int) -> int:
+    """Позиция после строкового литерала, начинающегося в start."""
+    quote = source[start]
+    i = start + 1
+    while i < len(source):
+        if source[i] == "\\":
+            i += 2
+            continue
+        if source[i] == quote or source[i] == "\n":
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_template(source: str, start: int) -> int:
+    """Позиция после шаблонной строки, включая выражения ${...}."""
+    i = start + 1
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "`":
+            return i + 1
+        if char == "$" and source.startswith("${", i):
+            i = _skip_expression(source, i + 2)
+            continue
+        i += 1
+    return i
+
+
+def _skip_expression(source: str, start: int) -> int:
+    """Позиция после выражения ${...} до парной закрывающей скобки."""
+    depth = 1
+    i = start
+    while i < len(source):
+        char = source[i]
+        if char in "'\"":
+            i = _skip_string(source, i)
+            continue
+        if char == "`":
+            i = _skip_template(source, i)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _skip_regex(source: str, start: int) -> int:
+    """Позиция после литерала регулярного выражения и его флагов."""
+    i = start + 1
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "\n":
+            return i
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            while i < len(source) and _word_char(source[i]):
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def minify(source: str) -> str:
+    """
+    Минифицировать JavaScript.
+
+    Без rjsmin удаляются комментарии (кроме /*! ... */), пробелы сжимаются
+    до одного там, где они разделяют слова, а переводы строк сохраняются
+    везде, где от них может зависеть автоматическая вставка точки с запятой.
+    Строки, шаблонные строки и регулярные выражения копируются как есть.
+
+    Args:
+        source: Исходный код
+
+    Returns:
+        Минифицированный код
+    """
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+
+    out: List[str] = []
+    i = 0
+    length = len(source)
+    last = ""
+    last_word = ""
+    pending = ""
+
+    def emit(text: str) -> None:
+        nonlocal last, pending
+        if pending and out:
+            first = text[0]
+            if pending == "\n" and last not in NEWLINE_DROP_AFTER and first not in NEWLINE_DROP_BEFORE:
+                out.append("\n")
+            elif (_word_char(last) and _word_char(first)) or (last in "+-" and first in "+-") \
+                    or (last == "/" and first in "/*"):
+                out.append(" ")
+        pending = ""
+        out.append(text)
+        last = text[-1]
+
+    while i < length:
+        char = source[i]
+
+        if char in " \t\r\n\f\v﻿":
+            if char == "\n" or pending == "\n":
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i += 1
+            continue
+
+        if source.startswith("//", i):
+            end = source.find("\n", i)
+            i = length if end < 0 else end
+            continue
+
+        if source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = length if end < 0 else end + 2
+            if source.startswith("/*!", i):
+                emit(source[i:end])
+                pending = "\n"
+            elif "\n" in source[i:end]:
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i = end
+            continue
+
+        if char in "'\"":
+            end = _skip_string(source, i)
+        elif char == "`":
+            end = _skip_template(source, i)
+        elif char == "/" and (not last or last in REGEX_PREFIX_CHARS
+                              or (_word_char(last) and last_word in REGEX_PREFIX_WORDS)):
+            end = _skip_regex(source, i)
+        elif _word_char(char):
+            end = i + 1
+            while end < length and _word_char(source[end]):
+                end += 1
+            emit(source[i:end])
+            last_word = source[i:end]
+            i = end
+            continue
+        else:
+            end = i + 1
+
+        emit(source[i:end])
+        last_word = ""
+        i = end
+
+    return "".join(out).strip() + "\n"
+
+
+def find_bundles() -> Tuple[Dict[str, List[str]], set]:
+    """
+    Найти описания бандлов и прямые ссылки на скрипты в шаблонах.
+
+    Returns:
+        Кортеж ({имя бандла: список файлов}, множество файлов, подключенных без бандла)
+    """
+    bundles: Dict[str, List[str]] = {}
+    direct = set()
+    for template in sorted(TEMPLATES_DIR.glob("*.html")):
+        text = template.read_text(encoding="utf-8")
+        for name, files in BUNDLE_CALL.findall(text):
+            files = re.findall(r"'([^']+)'", files)
+            if name in bundles and bundles[name] != files:
+                raise ValueError(f"Bundle {name} is defined differently in {template.name}")
+            bundles[name] = files
+        direct.update(STATIC_REFERENCE.findall(text))
+    return bundles, direct
+
+
+def build_bundles(minified: bool = True) -> Tuple[Dict[str, bytes], Dict[str, Any]]:
+    """
+    Собрать бандлы всех страниц.
+
+    Args:
+        minified: Минифицировать бандлы
+
+    Returns:
+        Кортеж ({путь бандла относительно static/: содержимое}, отчет о размерах)
+    """
+    bundles, direct = find_bundles()
+    assets: Dict[str, bytes] = {}
+    report: Dict[str, Any] = {"bundles": [], "minifier": "rjsmin" if rjsmin else "builtin"}
+
+    used = set(direct)
+    for name, files in sorted(bundles.items()):
+        sources = []
+        for path in files:
+            sources.append((STATIC_DIR / path).read_text(encoding="utf-8"))
+            used.add(path)
+        # Скрипты разделяются ';', чтобы незавершенная инструкция одного файла не склеилась со следующим
+        joined = "\n;\n".join(sources)
+        data = (minify(joined) if minified else joined).encode("utf-8")
+        assets[f"{BUNDLE_DIR}/{name}.js"] = data
+        report["bundles"].append({
+            "name": name,
+            "files": files,
+            "source_bytes": len(joined.encode("utf-8")),
+            "bytes": len(data),
+            "gzip_bytes": len(gzip.compress(data, compresslevel=9, mtime=0)),
+        })
+
+    all_scripts = {str(path.relative_to(STATIC_DIR)).replace("\\", "/") for path in (STATIC_DIR / "js").rglob("*")
+                   if path.is_file() and not str(path.relative_to(STATIC_DIR)).startswith(BUNDLE_DIR)}
+    report["unused"] = sorted(all_scripts - used)
+    return assets, report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"Бандлы JavaScript (минификатор {report['minifier']}):"]
+    for bundle in report["bundles"]:
+        lines.append(f"  {bundle['name']:<12} файлов {len(bundle['files'])}: {bundle['source_bytes']} -> "
+                     f"{bundle['bytes']} байт, gzip {bundle['gzip_bytes']} байт")
+    if report["unused"]:
+        lines.append("Не подключены ни одной страницей: " + ", ".join(report["unused"]))
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-minify", action="store_true", help="Только объединить файлы")
+    args = parser.parse_args()
+
+    _, report = build_bundles(minified=not args.no_minify)
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Сборка статических файлов веб-интерфейса: копии с хешем содержимого в
+имени и заранее сжатые варианты .gz и .br (если установлен модуль brotli).
+
+Результат записывается в static/dist/, соответствие исходных и
+собранных имен - в static/dist/manifest.json. Шаблоны получают
+собранные имена автоматически через url_for('static', filename=...).
+Скрипты страниц предварительно объединяются в бандлы (tools/build_js.py).
+Файлы прежних сборок остаются до запуска с --clean.
+
+Запуск из корня репозитория:
+    python -m tools.build_static
+"""
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from config import BASE_DIR
+from tools import build_js
+
+STATIC_DIR = BASE_DIR / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Расширения файлов, которые собираются, и из них - сжимаемые
+ASSET_EXTENSIONS = (".js", ".css", ".svg", ".png", ".ico", ".woff2")
+COMPRESSIBLE_EXTENSIONS = (".js", ".css", ".svg")
+
+# Файлы меньше этого размера не сжимаются: выигрыш меньше накладных расходов
+MIN_COMPRESS_SIZE = 256
+
+HASH_LENGTH = 10
+
+
+def hashed_name(path: str, data: bytes) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def compress(data: bytes) -> dict:
+    """
+    Сжать содержимое файла всеми доступными способами.
+
+    Returns:
+        Словарь {суффикс файла: сжатые данные}; варианты не меньше исходного отбрасываются
+    """
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return {suffix: packed for suffix, packed in variants.items() if len(packed) < len(data)}
+
+
+def collect_assets() -> list:
+    """Исходные файлы static/ (без static/dist) в виде путей относительно static/."""
+    assets = []
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [name for name in dirs if os.path.join(root, name) != str(DIST_DIR)]
+        for name in files:
+            if name.endswith(ASSET_EXTENSIONS):
+                assets.append(os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, "/"))
+    return sorted(assets)
+
+
+def write_file(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def build(assets: dict = None) -> dict:
+    """
+    Собрать статические файлы в static/dist.
+
+    Args:
+        assets: Дополнительные собранные файлы {имя: содержимое}, например бандлы
+
+    Returns:
+        Манифест {исходное имя: имя в static/ с хешем}
+    """
+    # Старые файлы не удаляются: уже открытые страницы могут ссылаться на них
+    sources = {}
+    for path in collect_assets():
+        with open(STATIC_DIR / path, "rb") as file:
+            sources[path] = file.read()
+    sources.update(assets or {})
+
+    manifest = {}
+    stats = {"files": 0, "bytes": 0, "gzip_bytes": 0, "brotli_bytes": 0}
+    for path, data in sorted(sources.items()):
+        target = hashed_name(path, data)
+        target_path = str(DIST_DIR / target)
+        write_file(target_path, data)
+        if path.endswith(COMPRESSIBLE_EXTENSIONS) and len(data) >= MIN_COMPRESS_SIZE:
+            for suffix, packed in compress(data).items():
+                write_file(target_path + suffix, packed)
+                stats["gzip_bytes" if suffix == ".gz" else "brotli_bytes"] += len(packed)
+        manifest[path] = f"dist/{target}"
+        stats["files"] += 1
+        stats["bytes"] += len(data)
+
+    # Манифест записывается последним и атомарно: сервер не увидит частичную сборку
+    manifest_path = DIST_DIR / MANIFEST_NAME
+    with open(f"{manifest_path}.tmp", "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    return {"manifest": manifest, "stats": stats}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clean", action="store_true", help="Удалить static/dist и не собирать заново")
+    parser.add_argument("--no-bundle", action="store_true", help="Не собирать бандлы JavaScript")
+    args = parser.parse_args()
+
+    if args.clean:
+        shutil.rmtree(DIST_DIR, ignore_errors=True)
+        return
+
+    bundles = {}
+    if not args.no_bundle:
+        bundles, report = build_js.build_bundles()
+        print(build_js.format_report(report))
+
+    result = build(bundles)
+    stats = result["stats"]
+    print(f"Собрано файлов: {stats['files']}, {stats['bytes']} байт, "
+          f"gzip {stats['gzip_bytes']} байт" + (f", brotli {stats['brotli_bytes']} байт" if brotli else
+                                                 " (brotli не установлен, .br не создаются)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import os
+import time
+import logging
+import ipaddress
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Адреса, с которых доступ разрешен всегда, чтобы не потерять управление устройством:
+# локальные и link-local IPv6 (доступны только из подключенного сегмента)
+ALWAYS_ALLOWED = ("127.0.0.0/8", "::1/128", "fe80::/10")
+
+# Размер кеша последних решений по адресам клиентов
+VERDICT_CACHE_SIZE = 4096
+
+# Как часто проверять изменение файлов конфигурации, секунд
+REVISION_CHECK_INTERVAL = 1.0
+
+
+class PrefixTrie:
+    """
+    Двоичное префиксное дерево сетей одного семейства адресов.
+
+    Сети перед вставкой объединяются (collapse_addresses), а поиск
+    завершается на первом узле-сети, поэтому проверка адреса занимает
+    не более длины префикса шагов при любом количестве сетей.
+    """
+
+    def __init__(self, max_bits: int):
+        self.max_bits = max_bits
+        # Узел - список [потомок по биту 0, потомок по биту 1, признак конца сети]
+        self.root: List[Any] = [None, None, False]
+
+    def add(self, network: Union[ipaddress.IPv4Network, ipaddress.IPv6Network]) -> None:
+        node = self.root
+        value = int(network.network_address)
+        for depth in range(network.prefixlen):
+            if node[2]:
+                return
+            bit = (value >> (self.max_bits - 1 - depth)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, False]
+            node = node[bit]
+        node[2] = True
+        node[0] = node[1] = None
+
+    def contains(self, address: int) -> bool:
+        node = self.root
+        shift = self.max_bits - 1
+        while node is not None:
+            if node[2]:
+                return True
+            node = node[(address >> shift) & 1]
+            shift -= 1
+        return False
+
+
+class AccessPolicy:
+    """
+    Скомпилированная политика доступа к веб-интерфейсу.
+
+    Ограничение включается только явно (access.ip_restrictions.enabled);
+    разрешенные сети - ip_restrictions.allowed_ips и access.allowed_networks
+    (если не включен allow_remote_admin). Пустой набор списков означает
+    отсутствие ограничений.
+    """
+
+    def __init__(self, access_config: Dict[str, Any], revision: Any = None):
+        self.revision = revision
+        self.errors: List[str] = []
+        entries = AccessPolicy.collect_entries(access_config or {})
+        self.enabled = bool(entries)
+        self.count = len(entries)
+
+        networks = {4: [], 6: []}
+        for entry in list(entries) + (list(ALWAYS_ALLOWED) if entries else []):
+            try:
+                network = ipaddress.ip_network(str(entry).strip(), strict=False)
+            except ValueError:
+                self.errors.append(f"Invalid network: {entry}")
+                continue
+            networks[network.version].append(network)
+
+        self.tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+        for version, items in networks.items():
+            for network in ipaddress.collapse_addresses(items):
+                self.tries[version].add(network)
+
+        self._cache: "OrderedDict[str, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def collect_entries(access_config: Dict[str, Any]) -> List[str]:
+        """
+        Собрать разрешенные адреса и сети из настроек доступа.
+
+        Args:
+            access_config: Секция access конфигурации
+
+        Returns:
+            Список адресов и сетей
+        """
+        restrictions = access_config.get("ip_restrictions", {}) or {}
+        if not restrictions.get("enabled", False):
+            return []
+
+        entries: List[str] = list(restrictions.get("allowed_ips", []) or [])
+        if not access_config.get("allow_remote_admin", False):
+            entries.extend(access_config.get("allowed_networks", []) or [])
+        return [entry for entry in entries if entry]
+
+    def allows(self, address: Optional[str]) -> bool:
+        """
+        Проверить, разрешен ли доступ с адреса клиента.
+
+        Args:
+            address: IP-адрес клиента
+
+        Returns:
+            True, если доступ разрешен
+        """
+        if not self.enabled:
+            return True
+        if not address:
+            return False
+
+        with self._lock:
+            verdict = self._cache.get(address)
+            if verdict is not None:
+                self._cache.move_to_end(address)
+                return verdict
+
+        try:
+            parsed = ipaddress.ip_address(address.split("%", 1)[0])
+            # Адрес IPv4, принятый сокетом IPv6 (::ffff:a.b.c.d)
+            if parsed.version == 6 and parsed.ipv4_mapped is not None:
+                parsed = parsed.ipv4_mapped
+            verdict = self.tries[parsed.version].contains(int(parsed))
+        except ValueError:
+            verdict = False
+
+        with self._lock:
+            self._cache[address] = verdict
+            if len(self._cache) > VERDICT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return verdict
+
+
+class AccessControl:
+    """
+    Проверка доступа с перекомпиляцией политики при изменении конфигурации.
+
+    Ревизия конфигурации - время изменения файлов настроек; файлы
+    проверяются не чаще раза в REVISION_CHECK_INTERVAL секунд.
+    """
+
+    def __init__(self, loader: Callable[[], Dict[str, Any]], paths: List[str]):
+        self.loader = loader
+        self.paths = [str(path) for path in paths]
+        self.policy: Optional[AccessPolicy] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def revision(self) -> Tuple:
+        """
+        Получить ревизию конфигурации по времени изменения файлов.
+
+        Returns:
+            Кортеж времен изменения (None для отсутствующих файлов)
+        """
+        result = []
+        for path in self.paths:
+            try:
+                result.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                result.append(None)
+        return tuple(result)
+
+    def get_policy(self) -> AccessPolicy:
+        """
+        Получить актуальную политику доступа, перекомпилировав ее при необходимости.
+
+        Returns:
+            Скомпилированная политика
+        """
+        now = time.monotonic()
+        policy = self.policy
+        if policy is not None and now - self._checked_at < REVISION_CHECK_INTERVAL:
+            return policy
+
+        with self._lock:
+            self._checked_at = now
+            revision = self.revision()
+            if self.policy is None or self.policy.revision != revision:
+                self.policy = AccessPolicy(self.loader(), revision)
+                for error in self.policy.errors:
+                    logger.warning(f"Ограничение доступа: {error}")
+                logger.info(f"Политика доступа обновлена: разрешенных записей {self.policy.count}")
+            return self.policy
+
+    def allows(self, address: Optional[str]) -> bool:
+        """
+        Проверить, разрешен ли доступ с адреса клиента.
+
+        Args:
+            address: IP-адрес клиента
+
+        Returns:
+            True, если доступ разрешен
+        """
+        return self.get_policy().allows(address)
+
+
+class AccessControlMiddleware:
+    """
+    ASGI-промежуточный слой, отклоняющий запросы с неразрешенных адресов
+    до маршрутизации и разбора тела запроса.
+    """
+
+    def __init__(self, app, access_control: AccessControl):
+        self.app = app
+        self.access_control = access_control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            client = scope.get("client")
+            if not self.access_control.allows(client[0] if client else None):
+                if scope["type"] == "websocket":
+                    await send({"type": "websocket.close", "code": 1008})
+                    return
+                body = b'{"detail":"Access denied"}'
+                await send({
+                    "type": "http.response.start",
+                    "status": 403,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,281 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from utils.nl80211 import nl80211_scanner, Nl80211Error
+from utils.system_utils import SystemUtils
+from utils.config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# Коэффициент сглаживания уровня сигнала (доля нового наблюдения)
+SIGNAL_ALPHA = 0.3
+
+# Изменение сглаженного сигнала в процентах, после которого запись считается измененной
+SIGNAL_CHANGE_THRESHOLD = 4.0
+
+# Число хранимых смен канала одной BSS
+CHANNEL_HISTORY_SIZE = 10
+
+# Настройки фонового наблюдения по умолчанию (секция monitor конфигурации WiFi)
+DEFAULT_MONITOR_CONFIG = {
+    "enabled": False,
+    "interval": 30,
+    "scan_interval": 300,
+    "expire_after": 900,
+    "adapters": [],
+}
+
+# Поля записи сети, изменение которых меняет ревизию записи
+_TRACKED_FIELDS = ("ssid", "band", "channel", "frequency", "width", "center_frequency", "security", "encryption",
+                   "standards", "country")
+
+
+class BssTable:
+    """
+    Таблица соседних BSS по BSSID с инкрементальными изменениями.
+
+    Каждое наблюдение обновляет время последнего появления и
+    экспоненциально сглаженный (EWMA) уровень сигнала по каждому
+    адаптеру. Ревизия записи меняется при появлении BSS, смене канала,
+    SSID или шифрования и при изменении сглаженного сигнала больше
+    SIGNAL_CHANGE_THRESHOLD, поэтому повторные наблюдения без изменений
+    не попадают в инкрементальные ответы. Записи, не наблюдавшиеся
+    expire_after секунд, удаляются; удаления хранятся для клиентов с
+    отставшей ревизией.
+    """
+
+    def __init__(self, expire_after: float = DEFAULT_MONITOR_CONFIG["expire_after"], history_size: int = 4096):
+        self.expire_after = expire_after
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.revision = 0
+        self._removed: deque = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    def update(self, adapter: str, networks: List[Dict[str, Any]], observed_at: Optional[float] = None) -> int:
+        """
+        Добавить результаты сканирования адаптера.
+
+        Args:
+            adapter: Имя адаптера
+            networks: Список сетей в формате SystemUtils.get_wifi_networks
+            observed_at: Время сканирования (по умолчанию текущее)
+
+        Returns:
+            Число измененных записей
+        """
+        observed_at = observed_at or time.time()
+        changed = 0
+        with self._lock:
+            for network in networks:
+                bssid = str(network.get("bssid", "")).lower()
+                if bssid and self._observe(bssid, adapter, network, observed_at):
+                    changed += 1
+            changed += self._expire(observed_at)
+        return changed
+
+    def _observe(self, bssid: str, adapter: str, network: Dict[str, Any], observed_at: float) -> bool:
+        # Возраст записи в кеше ядра: повторный дамп без нового сканирования не является новым наблюдением
+        seen_at = observed_at - (network.get("age_ms") or 0) / 1000
+        signal, signal_dbm = float(network.get("signal", 0)), network.get("signal_dbm")
+
+        entry = self.entries.get(bssid)
+        if entry is None:
+            self.revision += 1
+            self.entries[bssid] = {
+                "bssid": bssid,
+                **{field: network.get(field) for field in _TRACKED_FIELDS},
+                "first_seen": seen_at,
+                "last_seen": seen_at,
+                "signal": signal,
+                "signal_dbm": signal_dbm,
+                "observations": 1,
+                "channel_history": [{"channel": network.get("channel"), "since": seen_at}],
+                "radios": {adapter: {"signal": signal, "signal_dbm": signal_dbm, "last_seen": seen_at}},
+                "revision": self.revision,
+            }
+            return True
+
+        radio = entry["radios"].get(adapter)
+        if radio is not None and seen_at <= radio["last_seen"]:
+            return False
+
+        if radio is None:
+            radio = entry["radios"][adapter] = {"signal": signal, "signal_dbm": signal_dbm, "last_seen": seen_at}
+        else:
+            radio["signal"] += SIGNAL_ALPHA * (signal - radio["signal"])
+            if signal_dbm is not None:
+                previous = radio["signal_dbm"]
+                radio["signal_dbm"] = signal_dbm if previous is None else previous + SIGNAL_ALPHA * (signal_dbm - previous)
+            radio["last_seen"] = seen_at
+
+        entry["observations"] += 1
+        entry["last_seen"] = max(entry["last_seen"], seen_at)
+        strongest = max(entry["radios"].values(), key=lambda item: item["signal"])
+
+        # Сигнал записи меняется только вместе с ревизией, иначе медленный дрейф не дошел бы до клиентов
+        modified = abs(strongest["signal"] - entry["signal"]) >= SIGNAL_CHANGE_THRESHOLD
+        for field in _TRACKED_FIELDS:
+            # Записи запасного разбора iw содержат не все поля: отсутствующее поле не считается изменением
+            if network.get(field) is not None and network[field] != entry[field]:
+                entry[field] = network[field]
+                modified = True
+        if network.get("channel") and network["channel"] != entry["channel_history"][-1]["channel"]:
+            entry["channel_history"].append({"channel": network["channel"], "since": seen_at})
+            del entry["channel_history"][:-CHANNEL_HISTORY_SIZE]
+
+        if modified:
+            self.revision += 1
+            entry["revision"] = self.revision
+            entry["signal"], entry["signal_dbm"] = strongest["signal"], strongest["signal_dbm"]
+        return modified
+
+    def _expire(self, now: float) -> int:
+        stale = [bssid for bssid, entry in self.entries.items() if now - entry["last_seen"] > self.expire_after]
+        for bssid in stale:
+            del self.entries[bssid]
+            self.revision += 1
+            self._removed.append({"bssid": bssid, "revision": self.revision})
+        return len(stale)
+
+    def expire(self) -> int:
+        """
+        Удалить записи, не наблюдавшиеся expire_after секунд.
+
+        Returns:
+            Число удаленных записей
+        """
+        with self._lock:
+            return self._expire(time.time())
+
+    @staticmethod
+    def _export(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **entry,
+            "signal": round(entry["signal"], 1),
+            "signal_dbm": round(entry["signal_dbm"], 1) if entry["signal_dbm"] is not None else None,
+            "channel_history": list(entry["channel_history"]),
+            "radios": {adapter: {**radio, "signal": round(radio["signal"], 1),
+                                 "signal_dbm": round(radio["signal_dbm"], 1) if radio["signal_dbm"] is not None else None}
+                       for adapter, radio in entry["radios"].items()},
+        }
+
+    def changes_since(self, revision: int = 0) -> Dict[str, Any]:
+        """
+        Получить записи, измененные после указанной ревизии.
+
+        Args:
+            revision: Последняя известная клиенту ревизия (0 - вся таблица)
+
+        Returns:
+            Словарь с текущей ревизией, измененными записями (по убыванию
+            сигнала) и BSSID удаленных записей. Если удаления после ревизии
+            уже не хранятся или ревизия неизвестна, возвращается вся таблица
+            с флагом reset
+        """
+        with self._lock:
+            oldest = self._removed[0]["revision"] if len(self._removed) == self._removed.maxlen else 0
+            # Ревизия больше текущей остается у клиента после перезапуска сервера
+            reset = 0 < revision < oldest or revision > self.revision
+            if reset or revision <= 0:
+                revision = 0
+            entries = [BssTable._export(entry) for entry in self.entries.values() if entry["revision"] > revision]
+            removed = [item["bssid"] for item in self._removed if item["revision"] > revision] if revision else []
+            current = self.revision
+
+        entries.sort(key=lambda entry: entry["signal"], reverse=True)
+        return {"revision": current, "reset": reset, "count": len(self.entries), "entries": entries,
+                "removed": removed}
+
+
+class BssMonitor:
+    """
+    Фоновое наблюдение за соседними сетями для таблицы BSS.
+
+    Каждые interval секунд читает кеш сканирования ядра через nl80211 без
+    запуска сканирования (пассивно: туда попадают и сканирования
+    wpa_supplicant и hostapd), а каждые scan_interval секунд запускает
+    активное сканирование. Без nl80211 используется обычное сканирование
+    с интервалом scan_interval. Настройки читаются из секции monitor
+    конфигурации WiFi.
+    """
+
+    def __init__(self, table: BssTable):
+        self.table = table
+        self.config = dict(DEFAULT_MONITOR_CONFIG)
+        self.last_scan: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        Прочитать настройки и запустить поток наблюдения, если оно включено.
+
+        Returns:
+            True, если наблюдение запущено
+        """
+        if self.running:
+            return True
+        self.config = {**DEFAULT_MONITOR_CONFIG, **(ConfigManager.get_wifi_config().get("monitor") or {})}
+        if not self.config["enabled"]:
+            return False
+        self.table.expire_after = float(self.config["expire_after"])
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="bss-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"Запущено фоновое наблюдение за WiFi сетями с интервалом {self.config['interval']} с")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _adapters(self) -> List[str]:
+        adapters = SystemUtils.get_wifi_adapters()
+        selected = self.config.get("adapters") or []
+        return [adapter for adapter in adapters if adapter in selected] if selected else adapters
+
+    def poll(self, adapter: str) -> int:
+        """
+        Обновить таблицу по одному адаптеру: пассивно или активным сканированием, если пора.
+
+        Args:
+            adapter: Имя адаптера
+
+        Returns:
+            Число измененных записей
+        """
+        now = time.time()
+        active = now - self.last_scan.get(adapter, 0) >= float(self.config["scan_interval"])
+        try:
+            networks = nl80211_scanner.scan(adapter) if active else nl80211_scanner.results(adapter)
+        except Nl80211Error as e:
+            if not active:
+                return 0
+            logger.debug(f"nl80211 недоступен для {adapter} ({str(e)}), используется обычное сканирование")
+            networks = SystemUtils.get_wifi_networks(adapter)
+        if active:
+            self.last_scan[adapter] = now
+        return self.table.update(adapter, networks)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            for adapter in self._adapters():
+                if self._stop.is_set():
+                    break
+                try:
+                    self.poll(adapter)
+                except Exception as e:
+                    logger.error(f"Ошибка наблюдения за WiFi сетями на {adapter}: {str(e)}")
+            self.table.expire()
+            self._stop.wait(float(self.config["interval"]))
+
+
+# Общая таблица соседних сетей и фоновое наблюдение за ней
+bss_table = BssTable()
+bss_monitor = BssMonitor(bss_table)
@@ -0,0 +1,542 @@
+import os
+import re
+import copy
+import math
+import time
+import asyncio
+import bisect
+import logging
+import subprocess
+from collections import Counter
+from itertools import accumulate
+from typing import Dict, Any, List, Optional, Iterable, Tuple, FrozenSet
+
+from utils.nl80211 import frequency_band, channel_to_frequency
+from utils.system_utils import COMMAND_TIMEOUT
+from utils.config_manager import ConfigManager
+from utils.executor import system_executor
+from utils.bss_table import bss_table
+from utils.wifi_scan import wifi_scan_service
+
+logger = logging.getLogger(__name__)
+
+# Основные 20-МГц каналы по диапазонам; разрешенные каналы сужаются регуляторным доменом
+CHANNELS = {
+    "2.4": list(range(1, 14)),
+    "5": list(range(36, 65, 4)) + list(range(100, 145, 4)) + list(range(149, 166, 4)),
+    "6": list(range(1, 234, 4)),
+}
+DFS_CHANNELS = frozenset(range(52, 145, 4))
+# Предпочтительные каналы 6 ГГц (PSC), на которых клиенты ищут точки доступа
+PSC_CHANNELS = frozenset(range(5, 234, 16))
+
+# Страны, где в 2.4 ГГц разрешены только каналы 1-11 (правила FCC и совместимые)
+FCC_24GHZ_COUNTRIES = frozenset(("US", "CA", "MX", "TW", "PR", "GU"))
+
+# Флаги правил регуляторного домена, запрещающие точке доступа излучать первой
+NO_IR_FLAGS = frozenset(("NO-IR", "PASSIVE-SCAN"))
+
+# Время хранения прочитанного регуляторного домена, секунд
+REGDOMAIN_TTL = 300
+
+# Начала непрерывных участков 5 ГГц, от которых отсчитываются объединенные каналы
+_SEGMENTS_5GHZ = (36, 100, 149)
+
+# Границы диапазонов для массивов полос, МГц; совпадают с границами 20-МГц каналов
+BAND_EDGES = {"2.4": (2392, 2502), "5": (4900, 5935), "6": (5925, 7135)}
+
+# Ширина канала точки доступа по умолчанию и наибольшая планируемая ширина, МГц
+DEFAULT_WIDTH = {"2.4": 20, "5": 80, "6": 80}
+MAX_WIDTH = {"2.4": 20, "5": 160, "6": 160}
+
+# Ширина полосы в массивах помех, МГц
+SLOT_MHZ = 5
+
+# Уровень, относительно которого считается мощность помех, dBm
+NOISE_FLOOR_DBM = -95.0
+
+# Веса составляющих оценки канала (меньше - лучше)
+INTERFERENCE_WEIGHT = 1.0
+OVERLAP_WEIGHT = 2.0
+# Частично перекрывающиеся сети 2.4 ГГц мешают сильнее сетей на том же канале:
+# с ними нельзя разделить эфир через CSMA, их сигнал - шум в полосе канала
+PARTIAL_OVERLAP_WEIGHT = 10.0
+OCCUPANCY_WEIGHT = 5.0
+DFS_PENALTY = 3.0
+NON_PSC_PENALTY = 2.0
+
+# Настройки автоматической смены канала по умолчанию (секция channel_planner конфигурации WiFi)
+DEFAULT_PLANNER_CONFIG = {
+    "auto_apply": False,
+    "interval": 86400,
+    "adapters": [],
+    "width": None,
+    "include_dfs": False,
+    "min_improvement": 10.0,
+    "country": "",
+}
+
+
+def channel_band(channel: int) -> str:
+    """
+    Определить диапазон по номеру канала из конфигурации точки доступа.
+
+    Номера каналов 5 и 6 ГГц пересекаются; номер из списка 5 ГГц
+    относится к 5 ГГц.
+    """
+    if channel <= 14:
+        return "2.4"
+    return "5" if channel in CHANNELS["5"] else "6"
+
+
+def parse_regulatory_domain(output: str) -> Dict[str, Any]:
+    """
+    Разобрать вывод iw reg get.
+
+    Используется глобальный домен; домены адаптеров (phy#N) пропускаются.
+
+    Args:
+        output: Вывод iw reg get
+
+    Returns:
+        Словарь с кодом страны и правилами (нижняя граница, верхняя граница
+        в МГц, флаги) или пустой словарь, если домен не найден
+    """
+    country, rules = None, []
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("phy#"):
+            break
+        match = re.match(r"country (\S+?):", line)
+        if match:
+            country = match.group(1)
+            continue
+        match = re.match(r"\((\d+) - (\d+) @ \d+\)(.*)", line)
+        if match and country:
+            # Скобки после полосы - мощность и время CAC, остальное - флаги
+            flags = re.sub(r"\([^)]*\)", "", match.group(3)).split(",")
+            rules.append((int(match.group(1)), int(match.group(2)),
+                          frozenset(flag.strip() for flag in flags if flag.strip())))
+    return {"country": country, "rules": rules} if country else {}
+
+
+def read_regulatory_domain() -> Dict[str, Any]:
+    """
+    Прочитать регуляторный домен ядра через iw reg get.
+
+    Returns:
+        Результат parse_regulatory_domain или пустой словарь, если iw недоступен
+    """
+    try:
+        output = subprocess.check_output(["iw", "reg", "get"], universal_newlines=True, stderr=subprocess.DEVNULL,
+                                         timeout=COMMAND_TIMEOUT)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"Не удалось прочитать регуляторный домен: {str(e)}")
+        return {}
+    return parse_regulatory_domain(output)
+
+
+def regulatory_channels(band: str, regdomain: Dict[str, Any],
+                        country: Optional[str] = None) -> Tuple[List[int], FrozenSet[int]]:
+    """
+    Получить разрешенные каналы диапазона и каналы DFS.
+
+    По правилам домена ядра канал разрешен, если его 20-МГц полоса целиком
+    входит в правило без флагов NO_IR_FLAGS. Без правил (нет iw или
+    мировой домен 00) используется код страны из настроек: в странах FCC
+    и при неизвестной стране в 2.4 ГГц остаются каналы 1-11.
+
+    Args:
+        band: Диапазон
+        regdomain: Результат read_regulatory_domain
+        country: Код страны из настроек
+
+    Returns:
+        Кортеж (разрешенные каналы, каналы DFS)
+    """
+    rules = regdomain.get("rules") if regdomain.get("country") not in (None, "00") else None
+    if rules:
+        channels, dfs = [], set()
+        for channel in CHANNELS[band]:
+            center = channel_to_frequency(channel, band)
+            rule = next((rule for rule in rules if rule[0] <= center - 10 and center + 10 <= rule[1]), None)
+            if rule is None or rule[2] & NO_IR_FLAGS:
+                continue
+            channels.append(channel)
+            if "DFS" in rule[2]:
+                dfs.add(channel)
+        return channels, frozenset(dfs)
+
+    channels = CHANNELS[band]
+    if band == "2.4" and (not country or country.upper() in FCC_24GHZ_COUNTRIES):
+        channels = [channel for channel in channels if channel <= 11]
+    return list(channels), DFS_CHANNELS if band == "5" else frozenset()
+
+
+def channel_span(channel: int, band: str, width: int,
+                 allowed: Optional[Iterable[int]] = None) -> Optional[Tuple[int, int]]:
+    """
+    Получить полосу частот объединенного канала, содержащего основной канал.
+
+    Args:
+        channel: Основной 20-МГц канал
+        band: Диапазон
+        width: Ширина канала в МГц (20, 40, 80 или 160)
+        allowed: Разрешенные каналы диапазона (по умолчанию CHANNELS)
+
+    Returns:
+        Кортеж (нижняя, верхняя граница в МГц) или None, если в диапазоне
+        нет всех 20-МГц каналов такого объединения
+    """
+    if width <= 20 or band == "2.4":
+        center = channel_to_frequency(channel, band)
+        return center - 10, center + 10
+
+    step = width // 5
+    base = max(start for start in _SEGMENTS_5GHZ if start <= channel) if band == "5" else 1
+    start = base + (channel - base) // step * step
+    allowed = CHANNELS[band] if allowed is None else allowed
+    if any(member not in allowed for member in range(start, start + step, 4)):
+        return None
+    low = channel_to_frequency(start, band) - 10
+    return low, low + width
+
+
+def _network_span(network: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    frequency = network.get("center_frequency") or network.get("frequency")
+    if not frequency:
+        return None
+    width = network.get("width") or 20
+    return frequency - width / 2, frequency + width / 2
+
+
+def _network_dbm(network: Dict[str, Any]) -> float:
+    if network.get("signal_dbm") is not None:
+        return float(network["signal_dbm"])
+    # Запасной разбор iw дает только проценты (0% = -100 dBm, 100% = -50 dBm)
+    return float(network.get("signal", 0)) / 2 - 100
+
+
+def score_channels(networks: Iterable[Dict[str, Any]], band: str, width: Optional[int] = None,
+                   include_dfs: bool = False, exclude_bssids: Iterable[str] = (),
+                   channels: Optional[Iterable[int]] = None,
+                   dfs_channels: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Оценить все разрешенные каналы диапазона по результатам сканирования.
+
+    Сети раскладываются за один проход в массивы 5-МГц полос диапазона:
+    мощность соседей (мощность сети делится поровну между полосами ее
+    канала) и число сетей на полосу. Оценка каждого канала - разности
+    префиксных сумм этих массивов и бинарный поиск по границам сетей,
+    поэтому все каналы оцениваются за O(сетей + каналов), а не попарно.
+
+    Оценка складывается из суммарной мощности соседей в полосе канала
+    (дБ над NOISE_FLOOR_DBM), числа пересекающихся сетей и среднего числа
+    сетей на 5 МГц полосы канала (перекрытие по ширине); меньше - лучше.
+    В 2.4 ГГц сети на другом основном канале, пересекающиеся с полосой
+    канала, штрафуются сильнее сетей на том же канале.
+
+    Args:
+        networks: Сети в формате SystemUtils.get_wifi_networks или записи таблицы BSS
+        band: Диапазон ("2.4", "5" или "6")
+        width: Ширина канала точки доступа в МГц (по умолчанию DEFAULT_WIDTH)
+        include_dfs: Учитывать каналы DFS 5 ГГц
+        exclude_bssids: BSSID, которые не считаются соседями (собственные точки доступа)
+        channels: Разрешенные каналы (по умолчанию CHANNELS, см. regulatory_channels)
+        dfs_channels: Каналы DFS (по умолчанию DFS_CHANNELS)
+
+    Returns:
+        Список оценок каналов, отсортированный от лучшего к худшему
+    """
+    width = min(width or DEFAULT_WIDTH[band], MAX_WIDTH[band])
+    low_edge, high_edge = BAND_EDGES[band]
+    slots = (high_edge - low_edge) // SLOT_MHZ
+    power = [0.0] * slots
+    occupancy = [0] * slots
+    starts, ends = [], []
+    primaries: Counter = Counter()
+    excluded = {bssid.lower() for bssid in exclude_bssids}
+    allowed = list(channels) if channels is not None else CHANNELS[band]
+    dfs_channels = frozenset(dfs_channels) if dfs_channels is not None else DFS_CHANNELS
+
+    for network in networks:
+        frequency = network.get("frequency")
+        if not frequency or frequency_band(int(frequency)) != band:
+            continue
+        if str(network.get("bssid", "")).lower() in excluded:
+            continue
+        span = _network_span(network)
+        first = max(int((span[0] - low_edge) // SLOT_MHZ), 0)
+        last = min(int(math.ceil((span[1] - low_edge) / SLOT_MHZ)), slots)
+        if first >= last:
+            continue
+        share = 10 ** ((_network_dbm(network) - NOISE_FLOOR_DBM) / 10) / (last - first)
+        for slot in range(first, last):
+            power[slot] += share
+            occupancy[slot] += 1
+        starts.append(span[0])
+        ends.append(span[1])
+        primaries[int(frequency)] += 1
+
+    power_sums = list(accumulate(power, initial=0.0))
+    occupancy_sums = list(accumulate(occupancy, initial=0))
+    starts.sort()
+    ends.sort()
+
+    def band_power(low: float, high: float) -> float:
+        return power_sums[int((high - low_edge) // SLOT_MHZ)] - power_sums[int((low - low_edge) // SLOT_MHZ)]
+
+    ranking = []
+    for channel in allowed:
+        dfs = band == "5" and channel in dfs_channels
+        if dfs and not include_dfs:
+            continue
+        span = channel_span(channel, band, width, allowed)
+        if span is None:
+            continue
+
+        first, last = (span[0] - low_edge) // SLOT_MHZ, (span[1] - low_edge) // SLOT_MHZ
+        interference = power_sums[last] - power_sums[first]
+        mean_occupancy = (occupancy_sums[last] - occupancy_sums[first]) / (last - first)
+        # Сети, полоса которых пересекается с полосой канала: начало ниже верхней границы, конец выше нижней
+        overlapping = bisect.bisect_left(starts, span[1]) - bisect.bisect_right(ends, span[0])
+        primary = channel_to_frequency(channel, band)
+        partial = overlapping - primaries[primary] if band == "2.4" else 0
+
+        score = (INTERFERENCE_WEIGHT * 10 * math.log10(1 + interference) + OVERLAP_WEIGHT * (overlapping - partial)
+                 + PARTIAL_OVERLAP_WEIGHT * partial + OCCUPANCY_WEIGHT * mean_occupancy)
+        if dfs:
+            score += DFS_PENALTY
+        if band == "6" and channel not in PSC_CHANNELS:
+            score += NON_PSC_PENALTY
+
+        # Помехи на основном 20-МГц канале различают каналы внутри одного объединения
+        ranking.append((round(score, 2), band_power(primary - 10, primary + 10), channel, {
+            "channel": channel,
+            "frequency": primary,
+            "width": width,
+            "center_frequency": (span[0] + span[1]) // 2,
+            "score": round(score, 2),
+            "overlapping": overlapping,
+            "partial_overlapping": partial,
+            "interference_dbm": round(10 * math.log10(interference) + NOISE_FLOOR_DBM, 1) if interference else None,
+            "occupancy": round(mean_occupancy, 2),
+            "dfs": dfs,
+        }))
+
+    ranking.sort(key=lambda item: item[:3])
+    return [item[3] for item in ranking]
+
+
+class ChannelPlanner:
+    """
+    Подбор каналов точек доступа по соседним сетям.
+
+    Рекомендация строится по таблице BSS (сглаженный сигнал всех
+    сканирований); собственные точки доступа роутера исключаются. При
+    включенном auto_apply задача цикла событий раз в interval секунд
+    сканирует адаптеры через службу сканирования и, если лучший канал
+    лучше текущего не меньше чем на min_improvement, записывает его в
+    конфигурацию точки доступа.
+    """
+
+    def __init__(self):
+        self.config = dict(DEFAULT_PLANNER_CONFIG)
+        self.last_run: Optional[float] = None
+        self.last_changes: List[Dict[str, Any]] = []
+        self._regdomain: Dict[str, Any] = {}
+        self._regdomain_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @staticmethod
+    def ap_settings(wifi_config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Получить настройки точек доступа из конфигурации WiFi.
+
+        Поддерживаются оба формата: словарь adapters с секцией ap и список
+        adapters с секцией ap_settings.
+
+        Args:
+            wifi_config: Конфигурация WiFi
+
+        Returns:
+            Словарь настроек точки доступа (ссылки на секции конфигурации) по именам адаптеров
+        """
+        adapters = wifi_config.get("adapters") or {}
+        if isinstance(adapters, dict):
+            items = adapters.items()
+        else:
+            items = ((adapter.get("name"), adapter) for adapter in adapters if isinstance(adapter, dict))
+
+        result = {}
+        for name, adapter in items:
+            if not name or not isinstance(adapter, dict) or adapter.get("mode") != "ap" \
+                    or adapter.get("enabled") is False:
+                continue
+            settings = adapter.get("ap_settings") if "ap_settings" in adapter else adapter.get("ap")
+            if isinstance(settings, dict):
+                result[name] = settings
+        return result
+
+    @staticmethod
+    def local_bssids() -> List[str]:
+        """
+        Получить MAC-адреса интерфейсов роутера: BSSID собственных точек доступа совпадают с ними.
+        """
+        addresses = []
+        try:
+            for name in os.listdir("/sys/class/net"):
+                try:
+                    with open(f"/sys/class/net/{name}/address") as f:
+                        addresses.append(f.read().strip().lower())
+                except OSError:
+                    continue
+        except OSError:
+            pass
+        return addresses
+
+    def regulatory_domain(self) -> Dict[str, Any]:
+        """
+        Получить регуляторный домен ядра; значение хранится REGDOMAIN_TTL секунд.
+        """
+        now = time.monotonic()
+        if self._regdomain_at is None or now - self._regdomain_at > REGDOMAIN_TTL:
+            self._regdomain, self._regdomain_at = read_regulatory_domain(), now
+        return self._regdomain
+
+    def recommend(self, adapter: Optional[str] = None, band: Optional[str] = None, width: Optional[int] = None,
+                  include_dfs: Optional[bool] = None, wifi_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Рекомендовать канал точки доступа по текущей таблице BSS.
+
+        Оцениваются только каналы, разрешенные регуляторным доменом ядра
+        или страной из настроек планировщика (country).
+
+        Args:
+            adapter: Адаптер точки доступа; текущий канал берется из его настроек
+            band: Диапазон (по умолчанию - band из настроек адаптера, диапазон текущего канала или 2.4 ГГц)
+            width: Ширина канала в МГц
+            include_dfs: Учитывать каналы DFS (по умолчанию из настроек планировщика)
+            wifi_config: Конфигурация WiFi (по умолчанию читается из файла)
+
+        Returns:
+            Словарь с текущим и рекомендуемым каналом, выигрышем по оценке и оценками всех каналов
+        """
+        wifi_config = wifi_config if wifi_config is not None else ConfigManager.get_wifi_config()
+        settings = ChannelPlanner.ap_settings(wifi_config).get(adapter, {}) if adapter else {}
+        try:
+            current_channel = int(settings.get("channel") or 0)
+        except (TypeError, ValueError):
+            current_channel = 0
+
+        band = band or settings.get("band") or (channel_band(current_channel) if current_channel else "2.4")
+        include_dfs = self.config["include_dfs"] if include_dfs is None else include_dfs
+        regdomain = self.regulatory_domain()
+        country = (wifi_config.get("channel_planner") or {}).get("country") or self.config.get("country") or None
+        if regdomain.get("country") not in (None, "00"):
+            country = regdomain["country"]
+        channels, dfs_channels = regulatory_channels(band, regdomain, country)
+        entries = bss_table.changes_since(0)["entries"]
+        ranking = score_channels(entries, band, width or self.config.get("width"), include_dfs,
+                                 ChannelPlanner.local_bssids(), channels, dfs_channels)
+
+        current = next((item for item in ranking if item["channel"] == current_channel), None)
+        best = ranking[0] if ranking else None
+        return {
+            "adapter": adapter,
+            "band": band,
+            "country": country,
+            "width": best["width"] if best else None,
+            "networks": sum(1 for entry in entries if entry.get("frequency")
+                            and frequency_band(int(entry["frequency"])) == band),
+            "current": current,
+            "recommended": best,
+            "improvement": round(current["score"] - best["score"], 2) if current and best else None,
+            "channels": ranking,
+        }
+
+    async def apply(self) -> List[Dict[str, Any]]:
+        """
+        Отсканировать адаптеры и записать лучшие каналы в конфигурацию точек доступа.
+
+        Сканирование выполняется службой сканирования: адаптеры сканируются
+        одновременно, выполняющиеся задания API присоединяются.
+
+        Returns:
+            Список смен каналов
+        """
+        adapters = await wifi_scan_service.resolve_adapters()
+        survey = await wifi_scan_service.survey(adapters, force=True)
+        for adapter, error in survey["errors"].items():
+            logger.warning(f"Подбор каналов: не удалось отсканировать {adapter}: {error}")
+        return await system_executor.run(self.update_channels)
+
+    def update_channels(self) -> List[Dict[str, Any]]:
+        """
+        Записать лучшие по текущей таблице BSS каналы в конфигурацию точек доступа.
+
+        Канал меняется, если текущий канал лучше рекомендуемого меньше чем
+        на min_improvement или не входит в разрешенные каналы.
+
+        Returns:
+            Список смен каналов
+        """
+        wifi_config = copy.deepcopy(ConfigManager.get_wifi_config())
+        selected = self.config.get("adapters") or []
+        ap_settings = {name: settings for name, settings in ChannelPlanner.ap_settings(wifi_config).items()
+                       if not selected or name in selected}
+
+        changes = []
+        for adapter, settings in ap_settings.items():
+            result = self.recommend(adapter, wifi_config=wifi_config)
+            best = result["recommended"]
+            if best is None or result["current"] is not None and result["improvement"] < float(self.config["min_improvement"]):
+                continue
+            changes.append({"adapter": adapter, "from": settings.get("channel"), "to": best["channel"],
+                            "improvement": result["improvement"]})
+            settings["channel"] = best["channel"]
+            logger.info(f"Канал точки доступа {adapter} изменен с {changes[-1]['from']} на {best['channel']}")
+
+        if changes:
+            ConfigManager.write_config("wifi", wifi_config)
+        self.last_run, self.last_changes = time.time(), changes
+        return changes
+
+    def start(self) -> bool:
+        """
+        Прочитать настройки и запустить автоматическую смену каналов, если она включена.
+
+        Вызывается из работающего цикла событий.
+
+        Returns:
+            True, если задача запущена
+        """
+        if self.running:
+            return True
+        self.config = {**DEFAULT_PLANNER_CONFIG, **(ConfigManager.get_wifi_config().get("channel_planner") or {})}
+        if not self.config["auto_apply"]:
+            return False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"Запущен автоматический подбор каналов с интервалом {self.config['interval']} с")
+        return True
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(float(self.config["interval"]))
+            try:
+                await self.apply()
+            except Exception as e:
+                logger.error(f"Ошибка автоматического подбора каналов: {str(e)}")
+
+
+# Общий планировщик каналов
+channel_planner = ChannelPlanner()
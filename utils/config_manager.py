@@ -1,5 +1,4 @@
 import os
-import yaml
 import json
 import logging
 from typing import Dict, Any, List, Tuple, Optional
@@ -323,12 +322,26 @@ class ConfigManager:
         Returns:
             Полный путь к файлу конфигурации
         """
-        # Создать директорию конфигурации, если она не существует
-        os.makedirs(ConfigManager.CONFIG_DIR, exist_ok=True)
-        
-        # Путь к файлу конфигурации
+        # Путь к файлу конфигурации; директория создается при первой записи
         return os.path.join(ConfigManager.CONFIG_DIR, f"{config_name}.yaml")
     
+    @staticmethod
+    def get_config_revision(config_name: str) -> Optional[Tuple[int, int]]:
+        """
+        Получить ревизию файла конфигурации.
+
+        Args:
+            config_name: Имя конфигурации (без расширения)
+
+        Returns:
+            Кортеж (время изменения в наносекундах, размер) или None, если файл не существует
+        """
+        try:
+            stat_result = os.stat(ConfigManager.get_config_path(config_name))
+        except OSError:
+            return None
+        return (stat_result.st_mtime_ns, stat_result.st_size)
+
     @staticmethod
     def read_config(config_name: str) -> Dict[str, Any]:
         """
@@ -348,6 +361,9 @@ class ConfigManager:
             return ConfigManager.DEFAULT_CONFIG.get(config_name, {})
         
         try:
+            # yaml загружается при первом чтении, а не при запуске
+            import yaml
+
             with open(config_path, 'r') as file:
                 return yaml.safe_load(file) or {}
         except Exception as e:
@@ -369,6 +385,9 @@ class ConfigManager:
         config_path = ConfigManager.get_config_path(config_name)
         
         try:
+            import yaml
+
+            os.makedirs(ConfigManager.CONFIG_DIR, exist_ok=True)
             with open(config_path, 'w') as file:
                 yaml.dump(config_data, file, default_flow_style=False)
             return True
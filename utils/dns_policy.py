@@ -0,0 +1,790 @@
+import time
+import random
+import struct
+import socket
+import asyncio
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple, Optional
+
+from utils.nftables_handler import NftablesHandler, TUNNEL_MARK_BASE
+
+logger = logging.getLogger(__name__)
+
+# Типы DNS-записей и коды ответа
+QTYPE_A = 1
+QTYPE_NS = 2
+QTYPE_CNAME = 5
+QTYPE_SOA = 6
+QTYPE_AAAA = 28
+QTYPE_OPT = 41
+RCODE_NOERROR = 0
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+
+# Имя таблицы nftables с наборами адресов для доменной маршрутизации
+DNS_TABLE = "armrouter_dns"
+
+
+class DomainTrie:
+    """
+    Суффиксное дерево доменов по инвертированным меткам.
+
+    Шаблон "example.com" хранится как путь com -> example и совпадает
+    с самим доменом и всеми его поддоменами. Поиск выполняется за
+    O(число меток в имени) независимо от количества шаблонов.
+    """
+
+    # Ключ узла, в котором хранится значение шаблона
+    _VALUE = ""
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _labels(name: str) -> List[str]:
+        name = name.strip().lower().rstrip(".")
+        if name.startswith("*."):
+            name = name[2:]
+        return [label for label in name.split(".") if label]
+
+    def add(self, pattern: str, value: Any) -> None:
+        """
+        Добавить доменный шаблон.
+
+        Args:
+            pattern: Домен ("example.com", допускается "*.example.com")
+            value: Значение, возвращаемое при совпадении (например, имя туннеля)
+        """
+        labels = DomainTrie._labels(pattern)
+        if not labels:
+            return
+
+        node = self._root
+        for label in reversed(labels):
+            node = node.setdefault(label, {})
+
+        if DomainTrie._VALUE not in node:
+            self._size += 1
+        node[DomainTrie._VALUE] = value
+
+    def match(self, name: str) -> Optional[Any]:
+        """
+        Найти наиболее специфичный шаблон, покрывающий имя.
+
+        Args:
+            name: Запрашиваемое доменное имя
+
+        Returns:
+            Значение самого длинного совпавшего шаблона или None
+        """
+        node = self._root
+        result = None
+        for label in reversed(DomainTrie._labels(name)):
+            node = node.get(label)
+            if node is None:
+                break
+            if DomainTrie._VALUE in node:
+                result = node[DomainTrie._VALUE]
+        return result
+
+
+class DNSMessage:
+    """
+    Минимальный разбор DNS-сообщений в формате RFC 1035.
+
+    Разбираются только поля, необходимые форвардеру: вопрос,
+    адресные записи ответа, TTL и SOA для негативного кеширования.
+    """
+
+    @staticmethod
+    def read_name(data: bytes, offset: int) -> Tuple[str, int]:
+        """
+        Прочитать доменное имя с учетом сжатия.
+
+        Args:
+            data: DNS-сообщение
+            offset: Смещение начала имени
+
+        Returns:
+            Кортеж (имя, смещение после имени)
+        """
+        labels = []
+        end = None
+        jumps = 0
+
+        while True:
+            length = data[offset]
+            if length & 0xC0 == 0xC0:
+                if end is None:
+                    end = offset + 2
+                offset = ((length & 0x3F) << 8) | data[offset + 1]
+                jumps += 1
+                if jumps > 32:
+                    raise ValueError("DNS name compression loop")
+                continue
+            offset += 1
+            if length == 0:
+                break
+            labels.append(data[offset:offset + length].decode("ascii", "replace"))
+            offset += length
+
+        return ".".join(labels).lower(), (end if end is not None else offset)
+
+    @staticmethod
+    def parse_question(data: bytes) -> Tuple[int, str, int, int]:
+        """
+        Разобрать первый вопрос DNS-запроса.
+
+        Args:
+            data: DNS-запрос
+
+        Returns:
+            Кортеж (идентификатор, имя, тип, класс)
+        """
+        if len(data) < 12:
+            raise ValueError("DNS message too short")
+
+        query_id, _, qdcount = struct.unpack("!HHH", data[:6])
+        if qdcount < 1:
+            raise ValueError("DNS query without question")
+
+        qname, offset = DNSMessage.read_name(data, 12)
+        qtype, qclass = struct.unpack("!HH", data[offset:offset + 4])
+        return query_id, qname, qtype, qclass
+
+    @staticmethod
+    def parse_response(data: bytes) -> Dict[str, Any]:
+        """
+        Разобрать DNS-ответ.
+
+        Args:
+            data: DNS-ответ
+
+        Returns:
+            Словарь с кодом ответа, адресами из A/AAAA записей,
+            смещениями полей TTL и временем жизни для кеша
+        """
+        flags, qdcount, ancount, nscount, arcount = struct.unpack("!HHHHH", data[2:12])
+        offset = 12
+        for _ in range(qdcount):
+            _, offset = DNSMessage.read_name(data, offset)
+            offset += 4
+
+        addresses = []
+        ttl_fields = []
+        min_ttl = None
+        negative_ttl = None
+
+        for index in range(ancount + nscount + arcount):
+            _, offset = DNSMessage.read_name(data, offset)
+            rtype, _, ttl, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+            # Поле TTL псевдозаписи OPT (EDNS) содержит расширенный код ответа, версию и флаг DO
+            if rtype != QTYPE_OPT:
+                ttl_fields.append((offset + 4, ttl))
+            rdata = data[offset + 10:offset + 10 + rdlength]
+            offset += 10 + rdlength
+
+            if index < ancount:
+                min_ttl = ttl if min_ttl is None else min(min_ttl, ttl)
+                if rtype == QTYPE_A and rdlength == 4:
+                    addresses.append((4, socket.inet_ntop(socket.AF_INET, rdata), ttl))
+                elif rtype == QTYPE_AAAA and rdlength == 16:
+                    addresses.append((6, socket.inet_ntop(socket.AF_INET6, rdata), ttl))
+            elif index < ancount + nscount and rtype == QTYPE_SOA and rdlength >= 4:
+                # RFC 2308: негативный TTL = min(TTL записи SOA, поле MINIMUM)
+                minimum = struct.unpack("!I", rdata[-4:])[0]
+                negative_ttl = min(ttl, minimum)
+
+        return {
+            "rcode": flags & 0x000F,
+            "addresses": addresses,
+            "ttl_fields": ttl_fields,
+            "min_ttl": min_ttl,
+            "negative_ttl": negative_ttl
+        }
+
+    @staticmethod
+    def with_id(data: bytes, query_id: int) -> bytes:
+        """
+        Заменить идентификатор DNS-сообщения.
+
+        Args:
+            data: DNS-сообщение
+            query_id: Новый идентификатор
+
+        Returns:
+            Сообщение с новым идентификатором
+        """
+        return struct.pack("!H", query_id) + data[2:]
+
+    @staticmethod
+    def servfail(query: bytes) -> bytes:
+        """
+        Сформировать ответ SERVFAIL на запрос.
+
+        Args:
+            query: Исходный DNS-запрос
+
+        Returns:
+            DNS-ответ с кодом SERVFAIL
+        """
+        flags = struct.unpack("!H", query[2:4])[0]
+        flags = 0x8000 | (flags & 0x0100) | 0x0080 | RCODE_SERVFAIL
+        return query[:2] + struct.pack("!H", flags) + query[4:]
+
+
+class DNSCache:
+    """
+    Позитивный и негативный кеш DNS-ответов.
+
+    Ответы хранятся в исходном бинарном виде; при выдаче из кеша
+    подменяется идентификатор и уменьшаются TTL всех записей.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_ttl: int = 86400, max_negative_ttl: int = 300):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.max_negative_ttl = max_negative_ttl
+        self._entries: Dict[Tuple[str, int, int], Tuple[float, float, bytes, List[Tuple[int, int]]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, int, int], query_id: int) -> Optional[bytes]:
+        """
+        Получить ответ из кеша.
+
+        Args:
+            key: Ключ (имя, тип, класс)
+            query_id: Идентификатор запроса для подстановки в ответ
+
+        Returns:
+            DNS-ответ с актуальными TTL или None
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is None or entry[0] <= now:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        _, stored_at, response, ttl_fields = entry
+        elapsed = int(now - stored_at)
+        data = bytearray(response)
+        data[0:2] = struct.pack("!H", query_id)
+        if elapsed:
+            for offset, ttl in ttl_fields:
+                data[offset:offset + 4] = struct.pack("!I", max(0, ttl - elapsed))
+        return bytes(data)
+
+    def put(self, key: Tuple[str, int, int], response: bytes, parsed: Dict[str, Any]) -> None:
+        """
+        Сохранить ответ в кеш.
+
+        Args:
+            key: Ключ (имя, тип, класс)
+            response: DNS-ответ
+            parsed: Результат DNSMessage.parse_response
+        """
+        rcode = parsed["rcode"]
+
+        if rcode == RCODE_NOERROR and parsed["min_ttl"] is not None:
+            ttl = min(parsed["min_ttl"], self.max_ttl)
+        elif rcode in (RCODE_NOERROR, RCODE_NXDOMAIN) and parsed["negative_ttl"] is not None:
+            ttl = min(parsed["negative_ttl"], self.max_negative_ttl)
+        else:
+            return
+
+        if ttl <= 0:
+            return
+
+        if len(self._entries) >= self.max_entries:
+            self.prune()
+            if len(self._entries) >= self.max_entries:
+                # Вытесняем самую старую запись (словарь сохраняет порядок вставки)
+                del self._entries[next(iter(self._entries))]
+
+        now = time.monotonic()
+        self._entries[key] = (now + ttl, now, response, parsed["ttl_fields"])
+
+    def prune(self) -> int:
+        """
+        Удалить просроченные записи.
+
+        Returns:
+            Количество удаленных записей
+        """
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class NftSetUpdater:
+    """
+    Пакетное добавление разрешенных адресов в наборы nftables туннелей.
+
+    Элементы наборов создаются с таймаутом, равным TTL записи, поэтому
+    ядро само удаляет устаревшие адреса. Обновления накапливаются и
+    применяются одной транзакцией nft за интервал сброса.
+    """
+
+    def __init__(self, min_timeout: int = 60, max_timeout: int = 86400, flush_interval: float = 0.05):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Dict[str, int]] = {}
+        self._expires: Dict[Tuple[str, str], float] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Один поток: пакеты применяются по порядку, а вызов nft не блокирует цикл событий DNS
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nft-sets")
+
+    @staticmethod
+    def set_name(tunnel_index: int, family: int) -> str:
+        """
+        Получить имя набора адресов туннеля.
+
+        Args:
+            tunnel_index: Индекс туннеля в конфигурации
+            family: Версия IP (4 или 6)
+
+        Returns:
+            Имя набора nftables
+        """
+        return f"tunnel{tunnel_index}_v{family}"
+
+    @staticmethod
+    def render_table(tunnel_indexes: List[int]) -> str:
+        """
+        Сформировать скрипт таблицы с наборами и правилами маркировки.
+
+        Таблица пересоздается атомарно в рамках одной транзакции nft.
+
+        Args:
+            tunnel_indexes: Индексы туннелей, для которых нужны наборы
+
+        Returns:
+            Текст скрипта nft
+        """
+        lines = [
+            f"table inet {DNS_TABLE} {{}}",
+            f"delete table inet {DNS_TABLE}",
+            f"table inet {DNS_TABLE} {{"
+        ]
+
+        mark_rules = []
+        for index in sorted(set(tunnel_indexes)):
+            mark = hex(TUNNEL_MARK_BASE + index)
+            set_v4 = NftSetUpdater.set_name(index, 4)
+            set_v6 = NftSetUpdater.set_name(index, 6)
+            lines.append(f"    set {set_v4} {{ type ipv4_addr; flags timeout; }}")
+            lines.append(f"    set {set_v6} {{ type ipv6_addr; flags timeout; }}")
+            mark_rules.append(f"        ip daddr @{set_v4} meta mark set {mark}")
+            mark_rules.append(f"        ip6 daddr @{set_v6} meta mark set {mark}")
+
+        for chain, chain_type, hook in (("prerouting", "filter", "prerouting"), ("output", "route", "output")):
+            lines.append(f"    chain {chain} {{")
+            lines.append(f"        type {chain_type} hook {hook} priority mangle; policy accept;")
+            lines.extend(mark_rules)
+            lines.append("    }")
+
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def add(self, tunnel_index: int, addresses: List[Tuple[int, str, int]]) -> None:
+        """
+        Поставить адреса в очередь на добавление в набор туннеля.
+
+        Args:
+            tunnel_index: Индекс туннеля
+            addresses: Список кортежей (версия IP, адрес, TTL)
+        """
+        now = time.monotonic()
+
+        for family, address, ttl in addresses:
+            set_name = NftSetUpdater.set_name(tunnel_index, family)
+            timeout = max(self.min_timeout, min(ttl, self.max_timeout))
+
+            # Адрес уже в наборе и проживет дольше нового TTL - ничего не делаем
+            if self._expires.get((set_name, address), 0) >= now + timeout:
+                continue
+
+            pending = self._pending.setdefault(set_name, {})
+            pending[address] = max(timeout, pending.get(address, 0))
+
+        if self._pending and self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.flush_interval, self.flush)
+
+    def render_batch(self) -> Tuple[str, Dict[Tuple[str, str], float]]:
+        """
+        Сформировать скрипт nft для накопленных адресов и очистить очередь.
+
+        Returns:
+            Текст скрипта nft (пустая строка, если очередь пуста) и сроки
+            жизни элементов, которые нужно запомнить после успешного применения
+        """
+        now = time.monotonic()
+        lines = []
+        expires = {}
+
+        for set_name, elements in self._pending.items():
+            refresh = []
+            for address, timeout in elements.items():
+                if (set_name, address) in self._expires:
+                    refresh.append(address)
+                expires[(set_name, address)] = now + timeout
+
+            # Таймаут существующего элемента обновляется только удалением и
+            # повторным добавлением. Элемент мог уже истечь в ядре, поэтому
+            # сначала добавляем его без таймаута: удаление тогда не завершится
+            # ошибкой и не отменит всю транзакцию
+            if refresh:
+                items = ", ".join(refresh)
+                lines.append(f"add element inet {DNS_TABLE} {set_name} {{ {items} }}")
+                lines.append(f"delete element inet {DNS_TABLE} {set_name} {{ {items} }}")
+
+            items = ", ".join(f"{address} timeout {timeout}s" for address, timeout in elements.items())
+            lines.append(f"add element inet {DNS_TABLE} {set_name} {{ {items} }}")
+
+        self._pending = {}
+        return ("\n".join(lines) + "\n" if lines else ""), expires
+
+    def commit(self, expires: Dict[Tuple[str, str], float]) -> None:
+        """
+        Запомнить сроки жизни элементов, успешно добавленных в ядро.
+
+        Args:
+            expires: Сроки жизни элементов по (набор, адрес)
+        """
+        self._expires.update(expires)
+
+        # Периодически чистим локальные отметки об истекших элементах
+        if len(self._expires) > 100000:
+            now = time.monotonic()
+            self._expires = {key: expiry for key, expiry in self._expires.items() if expiry > now}
+
+    def flush(self) -> None:
+        """
+        Применить накопленные адреса одной транзакцией nft в фоновом потоке.
+
+        Сроки жизни запоминаются только после успешного применения, поэтому
+        адреса из неудавшейся транзакции будут добавлены при следующем ответе DNS.
+        """
+        self._flush_handle = None
+        script, expires = self.render_batch()
+        if not script:
+            return
+
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(NftablesHandler.apply_script, script)
+        future.add_done_callback(lambda done: self._flush_done(done, loop, expires))
+
+    def _flush_done(self, future: Future, loop: asyncio.AbstractEventLoop,
+                    expires: Dict[Tuple[str, str], float]) -> None:
+        try:
+            success, error = future.result()
+        except Exception as e:
+            success, error = False, str(e)
+        if not success:
+            logger.error(f"Ошибка обновления наборов адресов туннелей: {error}")
+            return
+
+        try:
+            loop.call_soon_threadsafe(self.commit, expires)
+        except RuntimeError:
+            # Цикл событий уже остановлен
+            pass
+
+
+class DNSPolicy:
+    """
+    Политика доменной маршрутизации, построенная из конфигурации туннелей.
+    """
+
+    def __init__(self, tunnel_config: Dict[str, Any]):
+        self.trie = DomainTrie()
+        self.tunnel_indexes: List[int] = []
+
+        tunnels = tunnel_config.get("tunnels", []) or []
+        traffic_routing = tunnel_config.get("traffic_routing", {}) or {}
+        default_index = DNSPolicy.select_default_tunnel(tunnels)
+        names = {tunnel.get("name"): index for index, tunnel in enumerate(tunnels)}
+
+        for entry in traffic_routing.get("domains", []) or []:
+            # Элемент списка - строка домена (уходит в туннель по умолчанию)
+            # или словарь {"domain": ..., "tunnel": ...}
+            if isinstance(entry, dict):
+                pattern = entry.get("domain", "")
+                index = names.get(entry.get("tunnel"), default_index)
+            else:
+                pattern = str(entry)
+                index = default_index
+
+            if pattern and index is not None:
+                self.trie.add(pattern, index)
+                if index not in self.tunnel_indexes:
+                    self.tunnel_indexes.append(index)
+
+    @staticmethod
+    def select_default_tunnel(tunnels: List[Dict[str, Any]]) -> Optional[int]:
+        """
+        Выбрать туннель по умолчанию для доменов без явного туннеля.
+
+        Используется туннель с флагом default, иначе первый включенный
+        туннель с наименьшим приоритетом (first_available).
+
+        Args:
+            tunnels: Список туннелей из конфигурации
+
+        Returns:
+            Индекс туннеля или None, если включенных туннелей нет
+        """
+        enabled = [(tunnel.get("priority", 0), index) for index, tunnel in enumerate(tunnels) if tunnel.get("enabled", False)]
+        if not enabled:
+            return None
+
+        for _, index in enabled:
+            if tunnels[index].get("default", False):
+                return index
+
+        return min(enabled)[1]
+
+
+class _UpstreamProtocol(asyncio.DatagramProtocol):
+    """
+    Протокол обмена с вышестоящим DNS-сервером через один сокет.
+    """
+
+    def __init__(self):
+        self.pending: Dict[int, asyncio.Future] = {}
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if len(data) < 12:
+            return
+        future = self.pending.pop(struct.unpack("!H", data[:2])[0], None)
+        if future is not None and not future.done():
+            future.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.error(f"Ошибка обмена с вышестоящим DNS-сервером: {str(exc)}")
+
+
+class _ClientProtocol(asyncio.DatagramProtocol):
+    """
+    Протокол приема запросов от клиентов.
+    """
+
+    def __init__(self, forwarder: "DNSPolicyForwarder"):
+        self.forwarder = forwarder
+        self.transport = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        asyncio.ensure_future(self.forwarder.handle(data, addr, self.transport))
+
+
+class DNSPolicyForwarder:
+    """
+    Асинхронный кеширующий DNS-форвардер для доменной маршрутизации.
+
+    Имена запросов сопоставляются с доменами из tunnel.traffic_routing.domains,
+    адреса из ответов на совпавшие запросы добавляются в наборы nftables
+    соответствующих туннелей с таймаутом по TTL.
+    """
+
+    def __init__(self, policy: DNSPolicy, upstream: Tuple[str, int] = ("1.1.1.1", 53),
+                 timeout: float = 2.0, cache: Optional[DNSCache] = None,
+                 set_updater: Optional[NftSetUpdater] = None):
+        self.policy = policy
+        self.upstream = upstream
+        self.timeout = timeout
+        self.cache = cache if cache is not None else DNSCache()
+        self.set_updater = set_updater if set_updater is not None else NftSetUpdater()
+        self.stats = {"queries": 0, "matched": 0, "forwarded": 0, "failures": 0}
+        self._upstream_transport = None
+        self._upstream_protocol: Optional[_UpstreamProtocol] = None
+        self._client_transport = None
+        self._inflight: Dict[Tuple[str, int, int], asyncio.Future] = {}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 5353) -> None:
+        """
+        Запустить прием запросов и подключение к вышестоящему серверу.
+
+        Args:
+            host: Адрес для приема запросов
+            port: Порт для приема запросов
+        """
+        loop = asyncio.get_running_loop()
+
+        self._upstream_transport, self._upstream_protocol = await loop.create_datagram_endpoint(
+            _UpstreamProtocol, remote_addr=self.upstream
+        )
+        self._client_transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ClientProtocol(self), local_addr=(host, port)
+        )
+        logger.info(f"DNS-форвардер слушает {host}:{port}, upstream {self.upstream[0]}:{self.upstream[1]}, доменов: {len(self.policy.trie)}")
+
+    def stop(self) -> None:
+        """
+        Остановить форвардер.
+        """
+        for transport in (self._client_transport, self._upstream_transport):
+            if transport is not None:
+                transport.close()
+        self._client_transport = None
+        self._upstream_transport = None
+
+    async def resolve(self, query: bytes) -> bytes:
+        """
+        Обработать DNS-запрос и вернуть ответ.
+
+        Args:
+            query: DNS-запрос в бинарном виде
+
+        Returns:
+            DNS-ответ в бинарном виде
+        """
+        self.stats["queries"] += 1
+        query_id, qname, qtype, qclass = DNSMessage.parse_question(query)
+        key = (qname, qtype, qclass)
+
+        cached = self.cache.get(key, query_id)
+        if cached is not None:
+            return cached
+
+        # Одинаковые запросы, пришедшие до ответа upstream, ждут один общий ответ
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return DNSMessage.with_id(await asyncio.shield(inflight), query_id)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._forward(query, query_id)
+            future.set_result(response)
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение передается ожидающим; помечаем его полученным
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            del self._inflight[key]
+
+        try:
+            parsed = DNSMessage.parse_response(response)
+        except (ValueError, IndexError, struct.error):
+            return response
+
+        self.cache.put(key, response, parsed)
+
+        if parsed["addresses"]:
+            tunnel_index = self.policy.trie.match(qname)
+            if tunnel_index is not None:
+                self.stats["matched"] += 1
+                self.set_updater.add(tunnel_index, parsed["addresses"])
+
+        return response
+
+    async def _forward(self, query: bytes, query_id: int) -> bytes:
+        pending = self._upstream_protocol.pending
+
+        # Подбираем свободный идентификатор для общего сокета upstream
+        upstream_id = random.getrandbits(16)
+        while upstream_id in pending:
+            upstream_id = random.getrandbits(16)
+
+        future = asyncio.get_running_loop().create_future()
+        pending[upstream_id] = future
+        self.stats["forwarded"] += 1
+
+        try:
+            self._upstream_transport.sendto(DNSMessage.with_id(query, upstream_id))
+            response = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            pending.pop(upstream_id, None)
+            self.stats["failures"] += 1
+            return DNSMessage.servfail(query)
+
+        return DNSMessage.with_id(response, query_id)
+
+    async def handle(self, data: bytes, addr, transport) -> None:
+        """
+        Обработать запрос клиента и отправить ответ.
+
+        Args:
+            data: DNS-запрос
+            addr: Адрес клиента
+            transport: Транспорт для отправки ответа
+        """
+        try:
+            response = await self.resolve(data)
+        except (ValueError, IndexError, struct.error) as e:
+            logger.debug(f"Некорректный DNS-запрос от {addr}: {str(e)}")
+            return
+        except Exception as e:
+            logger.error(f"Ошибка обработки DNS-запроса: {str(e)}")
+            self.stats["failures"] += 1
+            response = DNSMessage.servfail(data)
+
+        transport.sendto(response, addr)
+
+
+async def serve(host: str, port: int, upstream: Tuple[str, int], setup_table: bool = True) -> None:
+    """
+    Запустить DNS-форвардер по текущей конфигурации туннелей.
+
+    Args:
+        host: Адрес для приема запросов
+        port: Порт для приема запросов
+        upstream: Адрес и порт вышестоящего DNS-сервера
+        setup_table: Создать таблицу nftables с наборами туннелей
+    """
+    from utils.config_manager import ConfigManager
+
+    policy = DNSPolicy(ConfigManager.get_tunnel_config())
+
+    if setup_table and policy.tunnel_indexes:
+        success, error = NftablesHandler.apply_script(NftSetUpdater.render_table(policy.tunnel_indexes))
+        if not success:
+            logger.error(f"Не удалось создать таблицу {DNS_TABLE}: {error}")
+
+    forwarder = DNSPolicyForwarder(policy, upstream=upstream)
+    await forwarder.start(host, port)
+
+    try:
+        while True:
+            await asyncio.sleep(60)
+            forwarder.cache.prune()
+    finally:
+        forwarder.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DNS-форвардер доменной маршрутизации ArmRouter")
+    parser.add_argument("--listen", default="127.0.0.1", help="Адрес для приема запросов")
+    parser.add_argument("--port", type=int, default=5353, help="Порт для приема запросов")
+    parser.add_argument("--upstream", default="1.1.1.1", help="Вышестоящий DNS-сервер")
+    parser.add_argument("--upstream-port", type=int, default=53, help="Порт вышестоящего DNS-сервера")
+    parser.add_argument("--no-table", action="store_true", help="Не создавать таблицу nftables")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(args.listen, args.port, (args.upstream, args.upstream_port), not args.no_table))
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BlockingCallTimeout(TimeoutError):
+    """
+    Блокирующий вызов не завершился за отведенное время.
+    """
+
+
+class ExecutorBusy(RuntimeError):
+    """
+    Очередь блокирующих вызовов переполнена.
+    """
+
+
+class BlockingExecutor:
+    """
+    Ограниченный пул потоков для блокирующих вызовов из асинхронных обработчиков.
+
+    Вызов выполняется вне цикла событий, поэтому медленная системная
+    команда не задерживает остальные запросы. Число одновременно
+    ожидающих вызовов ограничено (при переполнении - ExecutorBusy), а
+    ожидание результата прерывается по таймауту (BlockingCallTimeout).
+    Еще не начатый вызов при таймауте отменяется; начатый завершается в
+    своем потоке, а запущенные им процессы ограничены собственными
+    таймаутами subprocess.
+    """
+
+    def __init__(self, name: str, max_workers: int, timeout: float, max_pending: Optional[int] = None):
+        self.name = name
+        self.timeout = timeout
+        self.max_pending = max_pending if max_pending is not None else max_workers * 4
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+
+    def _release(self, _: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Выполнить блокирующую функцию в пуле потоков.
+
+        Args:
+            func: Блокирующая функция
+            args: Позиционные аргументы функции
+            timeout: Таймаут ожидания в секундах (по умолчанию таймаут пула)
+            kwargs: Именованные аргументы функции
+
+        Returns:
+            Результат функции
+
+        Raises:
+            ExecutorBusy: Если ожидающих вызовов больше max_pending
+            BlockingCallTimeout: Если вызов не завершился за timeout секунд
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise ExecutorBusy(f"Too many pending {self.name} calls")
+            self.pending += 1
+
+        # Счетчик уменьшается, когда вызов действительно завершен или отменен до начала
+        future = self._executor.submit(func, *args, **kwargs)
+        future.add_done_callback(self._release)
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            name = getattr(func, "__qualname__", repr(func))
+            logger.warning(f"Вызов {name} не завершился за {timeout} с")
+            raise BlockingCallTimeout(f"{name} did not finish in {timeout} s")
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Быстрые системные вызовы: чтение состояния системы, таблицы маршрутизации
+system_executor = BlockingExecutor("system", max_workers=4, timeout=10.0)
+
+# Долгие операции: сканирование Wi-Fi, перезапуск служб, применение правил.
+# Отдельный пул, чтобы они не занимали потоки быстрых вызовов
+slow_executor = BlockingExecutor("slow", max_workers=2, timeout=60.0, max_pending=4)
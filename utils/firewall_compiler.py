@@ -0,0 +1,696 @@
+import re
+import time
+import hashlib
+import logging
+import ipaddress
+from typing import Dict, Any, List, Tuple, Optional
+
+from utils.nftables_handler import NftablesHandler
+from utils.firewall_optimizer import FirewallOptimizer
+
+logger = logging.getLogger(__name__)
+
+# Имя таблицы nftables межсетевого экрана
+FIREWALL_TABLE = "armrouter"
+
+# Префикс комментария, по которому правила сопоставляются с конфигурацией
+RULE_COMMENT_PREFIX = "armrouter:"
+
+# Префикс именованных счетчиков правил
+COUNTER_PREFIX = "rule-"
+
+# Встроенные цепочки: имя в конфигурации -> (цепочка nft, тип, хук, приоритет)
+BUILTIN_CHAINS = {
+    "INPUT": ("input", "filter", "input", "filter"),
+    "FORWARD": ("forward", "filter", "forward", "filter"),
+    "OUTPUT": ("output", "filter", "output", "filter"),
+    "PREROUTING": ("prerouting", "nat", "prerouting", "dstnat"),
+    "POSTROUTING": ("postrouting", "nat", "postrouting", "srcnat"),
+}
+
+# Действия правил: действие в конфигурации -> вердикт nft
+ACTIONS = {
+    "ACCEPT": "accept",
+    "DROP": "drop",
+    "REJECT": "reject",
+    "RETURN": "return",
+    "LOG": "log",
+    "MASQUERADE": "masquerade",
+}
+
+TERMINAL_ACTIONS = ("accept", "drop", "reject", "return", "jump", "masquerade")
+
+ANY_ADDRESSES = ("", "any", "0.0.0.0/0", "::/0", "*")
+
+CT_STATES = ("new", "established", "related", "invalid", "untracked")
+
+
+class FirewallCompileError(ValueError):
+    """
+    Ошибка компиляции правила межсетевого экрана.
+    """
+
+
+class FirewallCompiler:
+    """
+    Компилятор конфигурации межсетевого экрана в скрипт nftables.
+
+    Компиляция выполняется в два этапа: нормализация секций default_policy,
+    chains, custom_chains, open_ports и rules в единый список правил и
+    отрисовка этого списка в скрипт. Скрипт пересоздает таблицу целиком
+    и применяется одной транзакцией nft -f, поэтому набор правил
+    заменяется атомарно, без окна с незащищенным трафиком.
+    """
+
+    @staticmethod
+    def rule_id(rule: Dict[str, Any], chain: str, seen: Dict[str, int]) -> str:
+        """
+        Получить стабильный идентификатор правила.
+
+        Используется поле id, а при его отсутствии - хеш цепочки и имени
+        с номером повторения, чтобы одноименные правила различались.
+
+        Args:
+            rule: Правило из конфигурации
+            chain: Имя цепочки правила
+            seen: Счетчик уже выданных идентификаторов
+
+        Returns:
+            Идентификатор правила
+        """
+        if rule.get("id"):
+            base = str(rule["id"])
+        else:
+            key = f"{chain}|{rule.get('name', '')}|{rule.get('comment', '')}"
+            base = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+        count = seen.get(base, 0)
+        seen[base] = count + 1
+        return base if count == 0 else f"{base}-{count}"
+
+    @staticmethod
+    def parse_ports(value: Any) -> List[Tuple[int, int]]:
+        """
+        Разобрать порты: число, "22", "22,80,443", "1000-2000" или список.
+
+        Args:
+            value: Значение порта из конфигурации
+
+        Returns:
+            Список диапазонов (начало, конец)
+        """
+        if value is None or value == "" or value == []:
+            return []
+
+        items = value if isinstance(value, (list, tuple)) else str(value).split(",")
+        ports = []
+        for item in items:
+            item = str(item).strip()
+            if not item:
+                continue
+            if "-" in item or ":" in item:
+                low, high = item.replace(":", "-").split("-", 1)
+                low, high = int(low), int(high)
+            else:
+                low = high = int(item)
+            if not (0 <= low <= high <= 65535):
+                raise FirewallCompileError(f"Invalid port range: {item}")
+            ports.append((low, high))
+        return ports
+
+    @staticmethod
+    def parse_addresses(value: Any) -> Tuple[List[str], bool]:
+        """
+        Разобрать адреса: IP, CIDR, список через запятую; "!" в начале - отрицание.
+
+        Args:
+            value: Значение адреса из конфигурации
+
+        Returns:
+            Кортеж (список сетей в каноническом виде, признак отрицания)
+        """
+        if value is None:
+            return [], False
+
+        items = value if isinstance(value, (list, tuple)) else str(value).split(",")
+        negated = False
+        networks = []
+        for item in items:
+            item = str(item).strip()
+            if item.startswith("!"):
+                negated = True
+                item = item[1:].strip()
+            if item.lower() in ANY_ADDRESSES:
+                continue
+            try:
+                networks.append(str(ipaddress.ip_network(item, strict=False)))
+            except ValueError:
+                raise FirewallCompileError(f"Invalid address: {item}")
+        return networks, negated
+
+    @staticmethod
+    def normalize_rule(rule: Dict[str, Any], chain: str, custom_chains: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Привести правило конфигурации к нормализованному виду.
+
+        Правила, в которых смешаны адреса IPv4 и IPv6, разделяются по семействам.
+
+        Args:
+            rule: Правило из конфигурации
+            chain: Имя цепочки nft
+            custom_chains: Пользовательские цепочки (для действий-переходов)
+
+        Returns:
+            Список нормализованных правил
+        """
+        action_name = str(rule.get("action", "ACCEPT")).strip()
+        target = None
+        if action_name.upper() in ACTIONS:
+            action = ACTIONS[action_name.upper()]
+        elif action_name.upper() in ("JUMP", "GOTO") and rule.get("target") in custom_chains:
+            action, target = "jump", rule["target"]
+        elif action_name in custom_chains:
+            action, target = "jump", action_name
+        else:
+            raise FirewallCompileError(f"Unknown action: {action_name}")
+
+        protocol = str(rule.get("protocol") or "all").lower()
+        if protocol in ("all", "any"):
+            protocols = None
+        elif protocol == "both":
+            protocols = ["tcp", "udp"]
+        elif protocol in ("tcp", "udp", "icmp", "icmpv6", "sctp", "udplite"):
+            protocols = [protocol]
+        else:
+            raise FirewallCompileError(f"Unknown protocol: {protocol}")
+
+        sport = FirewallCompiler.parse_ports(rule.get("source_port"))
+        dport = FirewallCompiler.parse_ports(rule.get("destination_port", rule.get("port")))
+        if (sport or dport) and protocols is None:
+            protocols = ["tcp", "udp"]
+        if (sport or dport) and any(p not in ("tcp", "udp", "sctp", "udplite") for p in protocols):
+            raise FirewallCompileError(f"Ports require a transport protocol, got {protocol}")
+
+        saddr, saddr_neg = FirewallCompiler.parse_addresses(rule.get("source"))
+        daddr, daddr_neg = FirewallCompiler.parse_addresses(rule.get("destination"))
+
+        ct_state = rule.get("state") or rule.get("ct_state")
+        if isinstance(ct_state, str):
+            ct_state = [state.strip().lower() for state in ct_state.split(",") if state.strip()]
+        for state in ct_state or []:
+            if state not in CT_STATES:
+                raise FirewallCompileError(f"Unknown connection state: {state}")
+
+        icmp_type = rule.get("icmp_type")
+        if isinstance(icmp_type, str):
+            icmp_type = [item.strip().lower() for item in icmp_type.split(",") if item.strip()]
+        elif icmp_type is not None and not isinstance(icmp_type, (list, tuple)):
+            # Числовой тип ICMP
+            icmp_type = [icmp_type]
+
+        base = {
+            "name": rule.get("name", ""),
+            "chain": chain,
+            "priority": int(rule.get("priority", 100)),
+            "protocols": protocols,
+            "sport": sport,
+            "dport": dport,
+            "saddr_neg": saddr_neg,
+            "daddr_neg": daddr_neg,
+            "iif": rule.get("in_interface") or rule.get("interface") or None,
+            "oif": rule.get("out_interface") or None,
+            "ct_state": ct_state or None,
+            "icmp_type": list(icmp_type) if icmp_type else None,
+            "action": action,
+            "target": target,
+            "log_prefix": rule.get("log_prefix") or (rule.get("name", "")[:20] + ": " if action == "log" else None),
+        }
+
+        families = {ipaddress.ip_network(a).version for a in saddr + daddr}
+        if len(families) <= 1:
+            return [{**base, "saddr": saddr, "daddr": daddr}]
+
+        # Адреса обоих семейств: одно правило на семейство
+        result = []
+        for version in sorted(families):
+            s = [a for a in saddr if ipaddress.ip_network(a).version == version]
+            d = [a for a in daddr if ipaddress.ip_network(a).version == version]
+            if (saddr and not s) or (daddr and not d):
+                continue
+            result.append({**base, "saddr": s, "daddr": d, "id_suffix": f"v{version}"})
+        return result
+
+    @staticmethod
+    def builtin_rules(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Сформировать служебные правила из флагов allow_* конфигурации.
+
+        Returns:
+            Список правил в формате конфигурации
+        """
+        rules = []
+        if config.get("allow_loopback", True):
+            rules.append({"id": "builtin-loopback", "name": "Allow loopback", "chain": "INPUT",
+                          "in_interface": "lo", "action": "ACCEPT", "priority": -30})
+
+        states = []
+        if config.get("allow_established", True):
+            states.append("established")
+        if config.get("allow_related", True):
+            states.append("related")
+        for chain in ("INPUT", "FORWARD"):
+            if states:
+                rules.append({"id": f"builtin-{chain.lower()}-ct", "name": "Allow established/related",
+                              "chain": chain, "state": states, "action": "ACCEPT", "priority": -20})
+            rules.append({"id": f"builtin-{chain.lower()}-invalid", "name": "Drop invalid",
+                          "chain": chain, "state": ["invalid"], "action": "DROP", "priority": -19})
+
+        # Без ND и RA IPv6 перестает работать при политике DROP
+        rules.append({"id": "builtin-icmpv6-nd", "name": "Allow IPv6 neighbour discovery", "chain": "INPUT",
+                      "protocol": "icmpv6", "action": "ACCEPT", "priority": -10,
+                      "icmp_type": ["nd-neighbor-solicit", "nd-neighbor-advert", "nd-router-solicit", "nd-router-advert"]})
+
+        if config.get("allow_ping", True):
+            rules.append({"id": "builtin-ping-v4", "name": "Allow ping", "chain": "INPUT", "protocol": "icmp",
+                          "icmp_type": ["echo-request"], "action": "ACCEPT", "priority": -5})
+            rules.append({"id": "builtin-ping-v6", "name": "Allow ping", "chain": "INPUT", "protocol": "icmpv6",
+                          "icmp_type": ["echo-request"], "action": "ACCEPT", "priority": -5})
+        return rules
+
+    @staticmethod
+    def source_rules(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Собрать правила конфигурации в порядке объявления: служебные,
+        открытые порты (open_ports) и пользовательские правила (rules).
+
+        Args:
+            config: Конфигурация межсетевого экрана
+
+        Returns:
+            Список правил в формате конфигурации
+        """
+        source_rules = FirewallCompiler.builtin_rules(config)
+        for port in config.get("open_ports", []) or []:
+            protocol = port.get("protocol", "tcp")
+            source_rules.append({
+                "id": f"port-{protocol}-{port.get('port')}",
+                "name": port.get("description") or f"Open port {port.get('port')}/{protocol}",
+                "chain": "INPUT",
+                "protocol": protocol,
+                "destination_port": port.get("port"),
+                "action": "ACCEPT",
+                "priority": port.get("priority", 100),
+                "enabled": port.get("enabled", True),
+            })
+        source_rules.extend(config.get("rules", []) or [])
+        return source_rules
+
+    @staticmethod
+    def rule_ids(rules: List[Dict[str, Any]]) -> List[str]:
+        """
+        Получить идентификаторы правил конфигурации.
+
+        Идентификатор выдается каждому правилу, в том числе выключенному,
+        чтобы включение правила не меняло идентификаторы остальных.
+
+        Args:
+            rules: Правила в формате конфигурации
+
+        Returns:
+            Список идентификаторов в порядке правил
+        """
+        seen: Dict[str, int] = {}
+        ids = []
+        for rule in rules:
+            chain_name = str(rule.get("chain", "INPUT"))
+            chain = BUILTIN_CHAINS[chain_name.upper()][0] if chain_name.upper() in BUILTIN_CHAINS else chain_name
+            ids.append(FirewallCompiler.rule_id(rule, chain, seen))
+        return ids
+
+    @staticmethod
+    def normalize(config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Нормализовать конфигурацию межсетевого экрана.
+
+        Args:
+            config: Конфигурация межсетевого экрана
+
+        Returns:
+            Словарь с цепочками, упорядоченными правилами и ошибками
+        """
+        default_policy = config.get("default_policy", {}) or {}
+        # Конфигурация и интерфейс хранят настройки цепочек под именами в нижнем регистре
+        chain_settings = {str(name).upper(): settings for name, settings in (config.get("chains", {}) or {}).items()}
+        custom_chains = {
+            name: settings for name, settings in (config.get("custom_chains", {}) or {}).items()
+            if (settings or {}).get("enabled", True)
+        }
+
+        chains: Dict[str, Dict[str, Any]] = {}
+        disabled = set()
+        for name, (nft_name, chain_type, hook, priority) in BUILTIN_CHAINS.items():
+            settings = chain_settings.get(name, {}) or {}
+            if settings.get("enabled", True) is False:
+                disabled.add(name)
+                continue
+            policy = str(settings.get("policy") or default_policy.get(name.lower(), "ACCEPT")).upper()
+            chains[nft_name] = {
+                "name": name,
+                "type": chain_type,
+                "hook": hook,
+                "priority": priority,
+                "policy": "accept" if policy == "ACCEPT" or chain_type == "nat" else "drop",
+                "reject": policy == "REJECT" and chain_type != "nat",
+            }
+        for name in custom_chains:
+            chains[name] = {"name": name, "type": None, "hook": None, "priority": None, "policy": None, "reject": False}
+
+        source_rules = FirewallCompiler.source_rules(config)
+        rule_ids = FirewallCompiler.rule_ids(source_rules)
+
+        rules: List[Dict[str, Any]] = []
+        errors: List[Dict[str, Any]] = []
+
+        for position, rule in enumerate(source_rules):
+            if not rule.get("enabled", True):
+                continue
+
+            chain_name = str(rule.get("chain", "INPUT"))
+            if chain_name.upper() in BUILTIN_CHAINS:
+                if chain_name.upper() in disabled:
+                    continue
+                chain = BUILTIN_CHAINS[chain_name.upper()][0]
+            elif chain_name in custom_chains:
+                chain = chain_name
+            else:
+                errors.append({"rule": rule.get("name", ""), "error": f"Unknown chain: {chain_name}"})
+                continue
+
+            try:
+                rule_id = rule_ids[position]
+                for normalized in FirewallCompiler.normalize_rule(rule, chain, custom_chains):
+                    suffix = normalized.pop("id_suffix", None)
+                    normalized["id"] = f"{rule_id}-{suffix}" if suffix else rule_id
+                    normalized["position"] = position
+                    rules.append(normalized)
+            except (FirewallCompileError, ValueError, TypeError) as e:
+                errors.append({"rule": rule.get("name", ""), "error": str(e)})
+
+        # Порядок внутри цепочки: приоритет по возрастанию, затем порядок в конфигурации
+        rules.sort(key=lambda r: (r["priority"], r["position"]))
+
+        return {"enabled": config.get("enabled", True), "chains": chains, "rules": rules, "errors": errors}
+
+    @staticmethod
+    def _ports(ports: List[Tuple[int, int]]) -> str:
+        items = [str(low) if low == high else f"{low}-{high}" for low, high in ports]
+        return items[0] if len(items) == 1 else "{ " + ", ".join(items) + " }"
+
+    @staticmethod
+    def _set(items: List[str]) -> str:
+        return items[0] if len(items) == 1 else "{ " + ", ".join(items) + " }"
+
+    @staticmethod
+    def render_match(rule: Dict[str, Any]) -> str:
+        """
+        Отрисовать условия правила в синтаксисе nft.
+
+        Args:
+            rule: Нормализованное правило
+
+        Returns:
+            Строка условий
+        """
+        vmap_field = (rule.get("vmap") or {}).get("field")
+        parts = []
+        if rule.get("iif"):
+            parts.append(f"iifname {NftablesHandler.quote(rule['iif'])}")
+        if rule.get("oif"):
+            parts.append(f"oifname {NftablesHandler.quote(rule['oif'])}")
+
+        for field, direction in (("saddr", "saddr"), ("daddr", "daddr")):
+            addresses = rule.get(field) or []
+            if not addresses or field == vmap_field:
+                continue
+            prefix = "ip" if ipaddress.ip_network(addresses[0]).version == 4 else "ip6"
+            operator = "!= " if rule.get(f"{field}_neg") else ""
+            parts.append(f"{prefix} {direction} {operator}{FirewallCompiler._set(addresses)}")
+
+        protocols = rule.get("protocols")
+        ports = rule.get("sport") or rule.get("dport")
+        if protocols:
+            if len(protocols) == 1 and rule.get("icmp_type") and protocols[0] in ("icmp", "icmpv6"):
+                # "icmp type" уже подразумевает протокол
+                proto = protocols[0]
+            elif len(protocols) == 1 and ports:
+                proto = protocols[0]
+            else:
+                parts.append(f"meta l4proto {FirewallCompiler._set(protocols)}")
+                proto = "th"
+            if rule.get("sport") and vmap_field != "sport":
+                parts.append(f"{proto} sport {FirewallCompiler._ports(rule['sport'])}")
+            if rule.get("dport") and vmap_field != "dport":
+                parts.append(f"{proto} dport {FirewallCompiler._ports(rule['dport'])}")
+            if rule.get("icmp_type") and protocols[0] in ("icmp", "icmpv6"):
+                parts.append(f"{protocols[0]} type {FirewallCompiler._set(list(rule['icmp_type']))}")
+
+        if rule.get("ct_state"):
+            parts.append(f"ct state {FirewallCompiler._set(list(rule['ct_state']))}")
+
+        return " ".join(parts)
+
+    @staticmethod
+    def render_verdict(rule: Dict[str, Any]) -> str:
+        """
+        Отрисовать действие правила.
+
+        Args:
+            rule: Нормализованное правило
+
+        Returns:
+            Строка действия nft
+        """
+        if rule.get("vmap"):
+            return FirewallCompiler.render_vmap(rule)
+
+        action = rule["action"]
+        if action == "jump":
+            return f"jump {rule['target']}"
+        if action == "log":
+            return f"log prefix {NftablesHandler.quote(rule.get('log_prefix') or '')}"
+        return action
+
+    @staticmethod
+    def render_vmap(rule: Dict[str, Any]) -> str:
+        """
+        Отрисовать карту вердиктов объединенного правила.
+
+        Args:
+            rule: Нормализованное правило с полем vmap
+
+        Returns:
+            Строка вида "tcp dport vmap { 22 : accept, 23 : drop }"
+        """
+        field = rule["vmap"]["field"]
+        if field in ("saddr", "daddr"):
+            family = "ip" if ipaddress.ip_network(rule[field][0]).version == 4 else "ip6"
+            selector = f"{family} {field}"
+        else:
+            protocols = rule["protocols"]
+            selector = f"{protocols[0] if len(protocols) == 1 else 'th'} {field}"
+
+        elements = []
+        for entry in rule["vmap"]["entries"]:
+            verdict = f"jump {entry['target']}" if entry["action"] == "jump" else entry["action"]
+            for value in entry["values"]:
+                key = value if isinstance(value, str) else FirewallCompiler._ports([value])
+                elements.append(f"{key} : {verdict}")
+        return f"{selector} vmap {{ {', '.join(elements)} }}"
+
+    @staticmethod
+    def render_rule(rule: Dict[str, Any]) -> str:
+        """
+        Отрисовать правило целиком с комментарием-идентификатором.
+
+        Args:
+            rule: Нормализованное правило
+
+        Returns:
+            Текст правила nft
+        """
+        match = FirewallCompiler.render_match(rule)
+        counter = FirewallCompiler.counter_name(rule["id"])
+        verdict = FirewallCompiler.render_verdict(rule)
+        comment = NftablesHandler.quote(RULE_COMMENT_PREFIX + rule["id"])
+        statements = f"counter name {counter} {verdict} comment {comment}"
+        return f"{match} {statements}" if match else statements
+
+    @staticmethod
+    def counter_name(rule_id: str) -> str:
+        """
+        Получить имя именованного счетчика правила.
+
+        Args:
+            rule_id: Идентификатор правила
+
+        Returns:
+            Имя объекта counter в таблице межсетевого экрана
+        """
+        # Имя объекта nft - идентификатор без кавычек, лишние символы заменяются
+        return COUNTER_PREFIX + re.sub(r"[^A-Za-z0-9_.\-]", "_", rule_id)
+
+    @staticmethod
+    def render_chain_header(chain: Dict[str, Any]) -> Optional[str]:
+        """
+        Отрисовать заголовок базовой цепочки (тип, хук, политика).
+
+        Args:
+            chain: Описание цепочки
+
+        Returns:
+            Строка заголовка или None для обычных цепочек
+        """
+        if not chain.get("hook"):
+            return None
+        return f"type {chain['type']} hook {chain['hook']} priority {chain['priority']}; policy {chain['policy']};"
+
+    @staticmethod
+    def layout(normalized: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Разложить нормализованные правила по цепочкам в порядке применения.
+
+        Args:
+            normalized: Результат normalize
+
+        Returns:
+            Словарь {цепочка: {"header": заголовок, "rules": [(id правила, текст правила)]}}
+        """
+        if not normalized["enabled"]:
+            return {}
+
+        by_chain: Dict[str, List[Tuple[str, str]]] = {name: [] for name in normalized["chains"]}
+        for rule in normalized["rules"]:
+            by_chain[rule["chain"]].append((rule["id"], FirewallCompiler.render_rule(rule)))
+
+        result = {}
+        for name, chain in normalized["chains"].items():
+            # Цепочки NAT без правил не создаются
+            if chain["type"] == "nat" and not by_chain[name]:
+                continue
+            rules = by_chain[name]
+            if chain.get("reject"):
+                rule_id = f"policy-reject-{name}"
+                rules.append((rule_id, FirewallCompiler.render_rule({"id": rule_id, "action": "reject"})))
+            result[name] = {"header": FirewallCompiler.render_chain_header(chain), "rules": rules}
+        return result
+
+    @staticmethod
+    def render(layout: Dict[str, Dict[str, Any]]) -> str:
+        """
+        Отрисовать полный скрипт nft, атомарно пересоздающий таблицу.
+
+        Args:
+            layout: Результат layout; пустой словарь удаляет таблицу
+
+        Returns:
+            Текст скрипта nft
+        """
+        lines = [f"table inet {FIREWALL_TABLE} {{}}", f"delete table inet {FIREWALL_TABLE}"]
+        if not layout:
+            return "\n".join(lines) + "\n"
+
+        lines.append(f"table inet {FIREWALL_TABLE} {{")
+        for chain in layout.values():
+            for rule_id, _ in chain["rules"]:
+                lines.append(f"    counter {FirewallCompiler.counter_name(rule_id)} {{}}")
+        for name, chain in layout.items():
+            lines.append(f"    chain {name} {{")
+            if chain["header"]:
+                lines.append(f"        {chain['header']}")
+            for _, rule_text in chain["rules"]:
+                lines.append(f"        {rule_text}")
+            lines.append("    }")
+        lines.append("}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def compile(config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Скомпилировать конфигурацию межсетевого экрана в скрипт nft.
+
+        Между нормализацией и отрисовкой выполняется оптимизация правил
+        (отключается параметром optimize: false в конфигурации).
+
+        Args:
+            config: Конфигурация межсетевого экрана
+
+        Returns:
+            Словарь со скриптом, нормализованными правилами, отчетом оптимизации,
+            ошибками и временем этапов
+        """
+        started = time.perf_counter()
+        normalized = FirewallCompiler.normalize(config)
+        normalized_at = time.perf_counter()
+        if config.get("optimize", True):
+            normalized = FirewallOptimizer.optimize(normalized)
+        else:
+            count = len(normalized["rules"])
+            normalized["optimization"] = {"before": count, "after": count, "duplicates": [], "shadowed": [], "merged": []}
+        optimized_at = time.perf_counter()
+        layout = FirewallCompiler.layout(normalized)
+        script = FirewallCompiler.render(layout)
+        rendered_at = time.perf_counter()
+
+        return {
+            **normalized,
+            "layout": layout,
+            "script": script,
+            "timings": {
+                "normalize_ms": round((normalized_at - started) * 1000, 3),
+                "optimize_ms": round((optimized_at - normalized_at) * 1000, 3),
+                "render_ms": round((rendered_at - optimized_at) * 1000, 3),
+            },
+        }
+
+    @staticmethod
+    def apply(config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Скомпилировать и атомарно применить конфигурацию межсетевого экрана.
+
+        При ошибках компиляции ядро не изменяется.
+
+        Args:
+            config: Конфигурация межсетевого экрана
+
+        Returns:
+            Словарь с результатом, ошибками и временем компиляции и применения
+        """
+        compiled = FirewallCompiler.compile(config)
+        timings = dict(compiled["timings"])
+        timings["compile_ms"] = round(timings["normalize_ms"] + timings["optimize_ms"] + timings["render_ms"], 3)
+
+        if compiled["errors"]:
+            return {
+                "success": False,
+                "message": "Firewall configuration has errors",
+                "errors": compiled["errors"],
+                "timings": timings,
+            }
+
+        started = time.perf_counter()
+        success, error = NftablesHandler.apply_script(compiled["script"])
+        timings["apply_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+        if success:
+            logger.info(f"Межсетевой экран применен: правил {len(compiled['rules'])}, "
+                        f"компиляция {timings['compile_ms']} мс, применение {timings['apply_ms']} мс")
+
+        return {
+            "success": success,
+            "message": "Firewall rules applied" if success else f"Failed to apply firewall rules: {error}",
+            "errors": [] if success else [{"rule": "", "error": error}],
+            "rules": len(compiled["rules"]),
+            "optimization": compiled["optimization"],
+            "timings": timings,
+        }
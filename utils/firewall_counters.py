@@ -0,0 +1,221 @@
+import time
+import logging
+import threading
+from typing import Dict, Any, Callable, Optional
+
+from utils.nftables_handler import NftablesHandler
+from utils.firewall_compiler import FirewallCompiler, FIREWALL_TABLE, COUNTER_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Поля, по которым можно сортировать счетчики
+SORT_FIELDS = ("packets", "bytes", "pps", "bps", "last_hit", "name", "chain", "position")
+
+
+class FirewallCounterCollector:
+    """
+    Фоновый сбор именованных счетчиков правил межсетевого экрана.
+
+    Все счетчики таблицы читаются одним вызовом nft -j list counters,
+    по разнице с предыдущим чтением считаются скорости в пакетах и байтах
+    в секунду. Описание правил (имя, цепочка, объединенные правила)
+    передается при каждом применении конфигурации.
+    """
+
+    def __init__(self, interval: float = 10.0):
+        self.interval = interval
+        self.rules: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.collected_at: Optional[float] = None
+        # Увеличивается при каждом сборе и смене правил; по ней кешируются ответы API
+        self.revision = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def track(self, compiled: Dict[str, Any]) -> None:
+        """
+        Обновить описание правил после применения конфигурации и запустить сбор.
+
+        Args:
+            compiled: Результат FirewallCompiler.compile
+        """
+        rules_by_id = {rule["id"]: rule for rule in compiled["rules"]}
+        rules = {}
+        for chain_name, chain in compiled["layout"].items():
+            for position, (rule_id, _) in enumerate(chain["rules"]):
+                rule = rules_by_id.get(rule_id, {})
+                rules[rule_id] = {
+                    "id": rule_id,
+                    "name": rule.get("name") or ("Policy reject" if rule_id.startswith("policy-reject") else ""),
+                    "chain": chain_name,
+                    "position": position,
+                    "action": rule.get("action", "reject"),
+                    "merged": rule.get("merged", []),
+                }
+
+        with self._lock:
+            self.rules = rules
+            self.stats = {rule_id: stats for rule_id, stats in self.stats.items() if rule_id in rules}
+            self.revision += 1
+
+        if rules:
+            self.start()
+        else:
+            self.stop()
+
+    def track_config(self, config: Dict[str, Any]) -> bool:
+        """
+        Скомпилировать конфигурацию и отслеживать ее правила.
+
+        Используется при запуске: правила, примененные до перезапуска
+        сервиса, известны только по текущей конфигурации.
+
+        Args:
+            config: Конфигурация межсетевого экрана
+
+        Returns:
+            True, если конфигурация скомпилирована
+        """
+        try:
+            compiled = FirewallCompiler.compile(config)
+        except Exception as e:
+            logger.error(f"Не удалось скомпилировать правила для счетчиков межсетевого экрана: {str(e)}")
+            return False
+        self.track(compiled)
+        return True
+
+    def track_config_later(self, loader: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Прочитать и скомпилировать конфигурацию в отдельном потоке и отслеживать ее правила.
+
+        Запуск сервиса не ждет компиляции большого набора правил.
+
+        Args:
+            loader: Функция чтения конфигурации межсетевого экрана
+        """
+        def run() -> None:
+            try:
+                self.track_config(loader())
+            except Exception as e:
+                logger.error(f"Не удалось прочитать конфигурацию для счетчиков межсетевого экрана: {str(e)}")
+
+        threading.Thread(target=run, name="firewall-counters-init", daemon=True).start()
+
+    @property
+    def pending(self) -> bool:
+        """Правила известны, но счетчики еще не читались"""
+        return self.collected_at is None and bool(self.rules)
+
+    @staticmethod
+    def read() -> Dict[str, Dict[str, int]]:
+        """
+        Прочитать все счетчики правил одним вызовом nft.
+
+        Returns:
+            Словарь {имя счетчика: {"packets", "bytes"}}
+        """
+        data = NftablesHandler.list_json("counters", "table", "inet", FIREWALL_TABLE)
+        counters = {}
+        for item in data.get("nftables", []):
+            counter = item.get("counter")
+            if counter and counter.get("name", "").startswith(COUNTER_PREFIX):
+                counters[counter["name"]] = {"packets": counter.get("packets", 0), "bytes": counter.get("bytes", 0)}
+        return counters
+
+    def collect(self) -> None:
+        """
+        Прочитать счетчики и пересчитать скорости по каждому правилу.
+        """
+        counters = FirewallCounterCollector.read()
+        now = time.time()
+
+        with self._lock:
+            for rule_id in self.rules:
+                counter = counters.get(FirewallCompiler.counter_name(rule_id))
+                if counter is None:
+                    continue
+
+                previous = self.stats.get(rule_id)
+                stats = {"packets": counter["packets"], "bytes": counter["bytes"], "pps": 0.0, "bps": 0.0,
+                         "last_hit": previous["last_hit"] if previous else None}
+                # Уменьшение значения - таблица была пересоздана, счет начинается заново
+                if previous and counter["packets"] >= previous["packets"]:
+                    elapsed = now - previous["time"]
+                    if elapsed > 0:
+                        stats["pps"] = round((counter["packets"] - previous["packets"]) / elapsed, 3)
+                        stats["bps"] = round((counter["bytes"] - previous["bytes"]) * 8 / elapsed, 3)
+                    if counter["packets"] > previous["packets"]:
+                        stats["last_hit"] = now
+                elif counter["packets"] > 0:
+                    stats["last_hit"] = now
+                stats["time"] = now
+                self.stats[rule_id] = stats
+            self.collected_at = now
+            self.revision += 1
+
+    def query(self, sort: str = "packets", order: str = "desc", chain: Optional[str] = None,
+              unused: Optional[bool] = None, search: Optional[str] = None,
+              limit: Optional[int] = None, offset: int = 0) -> Dict[str, Any]:
+        """
+        Получить счетчики правил с фильтрацией и сортировкой.
+
+        Args:
+            sort: Поле сортировки (см. SORT_FIELDS)
+            order: Порядок сортировки: asc или desc
+            chain: Только правила цепочки
+            unused: True - только правила без срабатываний, False - только сработавшие
+            search: Подстрока имени или идентификатора правила
+            limit: Максимальное число записей
+            offset: Смещение от начала выборки
+
+        Returns:
+            Словарь со счетчиками правил, общим числом и временем последнего сбора
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort field: {sort}")
+
+        with self._lock:
+            items = []
+            for rule_id, rule in self.rules.items():
+                stats = self.stats.get(rule_id, {})
+                item = {**rule, "packets": stats.get("packets", 0), "bytes": stats.get("bytes", 0),
+                        "pps": stats.get("pps", 0.0), "bps": stats.get("bps", 0.0), "last_hit": stats.get("last_hit")}
+                if chain and item["chain"] != chain:
+                    continue
+                if unused is not None and (item["packets"] == 0) != unused:
+                    continue
+                if search and search.lower() not in f"{rule_id} {item['name']}".lower():
+                    continue
+                items.append(item)
+            collected_at = self.collected_at
+
+        # Правила без значения (еще не срабатывали) всегда в конце выборки
+        present = sorted((item for item in items if item[sort] is not None), key=lambda item: item[sort],
+                         reverse=(order == "desc"))
+        items = present + [item for item in items if item[sort] is None]
+        total = len(items)
+        items = items[offset:offset + limit] if limit is not None else items[offset:]
+
+        return {"counters": items, "total": total, "collected_at": collected_at, "interval": self.interval}
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="firewall-counters", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.collect()
+            except Exception as e:
+                logger.error(f"Ошибка чтения счетчиков межсетевого экрана: {str(e)}")
+
+
+# Общий экземпляр сборщика счетчиков
+counter_collector = FirewallCounterCollector()
@@ -0,0 +1,419 @@
+import logging
+import ipaddress
+from typing import Dict, Any, List, Tuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Поля условий нормализованного правила
+MATCH_FIELDS = ("protocols", "sport", "dport", "saddr", "daddr", "saddr_neg", "daddr_neg",
+                "iif", "oif", "ct_state", "icmp_type")
+
+# Поля, по которым соседние правила объединяются в множество или карту вердиктов
+MERGE_FIELDS = ("dport", "saddr", "daddr", "sport")
+
+# Действия, после которых пакет не проходит к следующим правилам цепочки
+SHADOWING_ACTIONS = ("accept", "drop", "reject", "return", "masquerade")
+
+# Действия, которые допускаются в объединенных правилах
+MERGEABLE_ACTIONS = ("accept", "drop", "reject", "return", "jump", "masquerade")
+
+# Вердикты, допустимые в картах вердиктов nft (vmap)
+VMAP_ACTIONS = ("accept", "drop", "return", "jump")
+
+
+def merge_port_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Объединить пересекающиеся и смежные диапазоны портов."""
+    result: List[Tuple[int, int]] = []
+    for low, high in sorted(ranges):
+        if result and low <= result[-1][1] + 1:
+            result[-1] = (result[-1][0], max(result[-1][1], high))
+        else:
+            result.append((low, high))
+    return result
+
+
+class CoverIndex:
+    """
+    Индекс правил цепочки для поиска правил, которые могут перекрыть новое.
+
+    Правило, ограничивающее адрес или порт, перекрывает только правила с
+    ограничением того же поля, поэтому оно хранится в корзине по своей
+    сети (по длине префикса) или по одиночному порту. Полная проверка
+    covers выполняется только для найденных кандидатов, а не для всех
+    более ранних правил цепочки.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.general: List[Tuple[int, Dict[str, Any]]] = []
+        # Поле адреса -> (версия, длина префикса) -> сеть, сдвинутая на длину хоста -> правила
+        self.networks: Dict[str, Dict[Tuple[int, int], Dict[int, List[Tuple[int, Dict[str, Any]]]]]] = {
+            "saddr": {}, "daddr": {}}
+        # Поле порта -> одиночный порт -> правила, и список правил с диапазонами
+        self.single_ports: Dict[str, Dict[int, List[Tuple[int, Dict[str, Any]]]]] = {"dport": {}, "sport": {}}
+        self.port_ranges: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {"dport": [], "sport": []}
+
+    def add(self, rule: Dict[str, Any]) -> None:
+        entry = (self.count, rule)
+        self.count += 1
+
+        for field in ("saddr", "daddr"):
+            if rule.get(field) and not rule.get(f"{field}_neg"):
+                for net in rule[field]:
+                    network = ipaddress.ip_network(net)
+                    table = self.networks[field].setdefault((network.version, network.prefixlen), {})
+                    key = int(network.network_address) >> (network.max_prefixlen - network.prefixlen)
+                    table.setdefault(key, []).append(entry)
+                return
+
+        for field in ("dport", "sport"):
+            if rule.get(field):
+                for low, high in rule[field]:
+                    if low == high:
+                        self.single_ports[field].setdefault(low, []).append(entry)
+                    else:
+                        self.port_ranges[field].append(entry)
+                return
+
+        self.general.append(entry)
+
+    def candidates(self, rule: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Получить более ранние правила, которые могут перекрыть правило, в порядке добавления.
+
+        Args:
+            rule: Проверяемое правило
+
+        Returns:
+            Список правил-кандидатов
+        """
+        found = dict(self.general)
+
+        for field in ("saddr", "daddr"):
+            if not rule.get(field) or rule.get(f"{field}_neg"):
+                continue
+            # Перекрывающая сеть обязана содержать первую сеть правила
+            probe = ipaddress.ip_network(rule[field][0])
+            address = int(probe.network_address)
+            for (version, prefixlen), table in self.networks[field].items():
+                if version == probe.version and prefixlen <= probe.prefixlen:
+                    found.update(table.get(address >> (probe.max_prefixlen - prefixlen), ()))
+
+        for field in ("dport", "sport"):
+            if rule.get(field):
+                found.update(self.single_ports[field].get(rule[field][0][0], ()))
+                found.update(self.port_ranges[field])
+
+        return [found[position] for position in sorted(found)]
+
+
+class FirewallOptimizer:
+    """
+    Оптимизатор нормализованных правил межсетевого экрана.
+
+    Выполняется между нормализацией и отрисовкой: удаляет дубликаты,
+    находит правила, перекрытые более ранними (такие правила никогда не
+    срабатывают), и объединяет подряд идущие правила, отличающиеся одним
+    полем, в анонимное множество или карту вердиктов. Поиск по множеству
+    в nftables выполняется за O(1) вместо линейного перебора правил.
+    """
+
+    @staticmethod
+    def signature(rule: Dict[str, Any]) -> Tuple:
+        """
+        Получить ключ условий правила, не зависящий от порядка элементов.
+
+        Args:
+            rule: Нормализованное правило
+
+        Returns:
+            Кортеж значений полей условий
+        """
+        key = []
+        for field in MATCH_FIELDS:
+            value = rule.get(field)
+            if isinstance(value, (list, tuple)):
+                value = tuple(sorted(value))
+            key.append(value or None)
+        return tuple(key)
+
+    @staticmethod
+    def verdict(rule: Dict[str, Any]) -> Tuple:
+        """
+        Получить ключ действия правила.
+
+        Args:
+            rule: Нормализованное правило
+
+        Returns:
+            Кортеж (действие, цель перехода, префикс журнала)
+        """
+        return rule["action"], rule.get("target"), rule.get("log_prefix") if rule["action"] == "log" else None
+
+    @staticmethod
+    def _covers_ports(outer: List[Tuple[int, int]], inner: List[Tuple[int, int]]) -> bool:
+        if not outer:
+            return True
+        if not inner:
+            return False
+        merged = merge_port_ranges(outer)
+        return all(any(low <= i_low and i_high <= high for low, high in merged) for i_low, i_high in inner)
+
+    @staticmethod
+    def _covers_addresses(outer: Dict[str, Any], inner: Dict[str, Any], field: str) -> bool:
+        outer_nets, inner_nets = outer.get(field) or [], inner.get(field) or []
+        outer_neg, inner_neg = outer.get(f"{field}_neg", False), inner.get(f"{field}_neg", False)
+        if not outer_nets:
+            return True
+        if outer_neg or inner_neg:
+            return outer_neg == inner_neg and sorted(outer_nets) == sorted(inner_nets)
+        if not inner_nets:
+            return False
+
+        outer_parsed = [ipaddress.ip_network(net) for net in outer_nets]
+        for net in inner_nets:
+            network = ipaddress.ip_network(net)
+            if not any(o.version == network.version and network.subnet_of(o) for o in outer_parsed):
+                return False
+        return True
+
+    @staticmethod
+    def _covers_values(outer: Optional[List[Any]], inner: Optional[List[Any]]) -> bool:
+        if not outer:
+            return True
+        if not inner:
+            return False
+        return set(inner) <= set(outer)
+
+    @staticmethod
+    def covers(outer: Dict[str, Any], inner: Dict[str, Any]) -> bool:
+        """
+        Проверить, что каждый пакет, подходящий под inner, подходит и под outer.
+
+        Args:
+            outer: Более раннее правило
+            inner: Более позднее правило
+
+        Returns:
+            True, если условия outer не уже условий inner
+        """
+        for field in ("iif", "oif"):
+            if outer.get(field) and outer.get(field) != inner.get(field):
+                return False
+        return (
+            FirewallOptimizer._covers_values(outer.get("protocols"), inner.get("protocols"))
+            and FirewallOptimizer._covers_ports(outer.get("sport"), inner.get("sport"))
+            and FirewallOptimizer._covers_ports(outer.get("dport"), inner.get("dport"))
+            and FirewallOptimizer._covers_addresses(outer, inner, "saddr")
+            and FirewallOptimizer._covers_addresses(outer, inner, "daddr")
+            and FirewallOptimizer._covers_values(outer.get("ct_state"), inner.get("ct_state"))
+            and FirewallOptimizer._covers_values(outer.get("icmp_type"), inner.get("icmp_type"))
+        )
+
+    @staticmethod
+    def remove_unreachable(rules: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Удалить дубликаты и правила, перекрытые более ранними правилами цепочки.
+
+        Args:
+            rules: Нормализованные правила в порядке применения
+
+        Returns:
+            Кортеж (оставшиеся правила, дубликаты, перекрытые правила)
+        """
+        kept: List[Dict[str, Any]] = []
+        duplicates: List[Dict[str, Any]] = []
+        shadowed: List[Dict[str, Any]] = []
+        seen: Dict[Tuple, str] = {}
+        terminal_by_chain: Dict[str, CoverIndex] = {}
+
+        for rule in rules:
+            key = (rule["chain"], FirewallOptimizer.signature(rule), FirewallOptimizer.verdict(rule))
+            if key in seen:
+                duplicates.append({"id": rule["id"], "name": rule["name"], "duplicate_of": seen[key]})
+                continue
+
+            earlier = terminal_by_chain.setdefault(rule["chain"], CoverIndex())
+            cover = next((r for r in earlier.candidates(rule) if FirewallOptimizer.covers(r, rule)), None)
+            if cover is not None:
+                conflict = FirewallOptimizer.verdict(cover) != FirewallOptimizer.verdict(rule)
+                shadowed.append({"id": rule["id"], "name": rule["name"], "shadowed_by": cover["id"], "conflict": conflict})
+                if conflict:
+                    logger.warning(f"Правило '{rule['name']}' ({rule['id']}) никогда не срабатывает: "
+                                   f"его перекрывает правило {cover['id']} с другим действием")
+                continue
+
+            seen[key] = rule["id"]
+            kept.append(rule)
+            if rule["action"] in SHADOWING_ACTIONS:
+                earlier.add(rule)
+
+        return kept, duplicates, shadowed
+
+    @staticmethod
+    def _merge_key(rule: Dict[str, Any], field: str) -> Optional[Tuple]:
+        """Ключ совместимости правил для объединения по полю field или None."""
+        if not rule.get(field) or rule["action"] not in MERGEABLE_ACTIONS:
+            return None
+        if field in ("saddr", "daddr"):
+            if rule.get(f"{field}_neg"):
+                return None
+            versions = {ipaddress.ip_network(net).version for net in rule[field]}
+            if len(versions) != 1:
+                return None
+            family = versions.pop()
+        else:
+            family = None
+
+        signature = FirewallOptimizer.signature({**rule, field: None})
+        return rule["chain"], signature, family
+
+    @staticmethod
+    def _disjoint(field: str, first: List[Any], second: List[Any]) -> bool:
+        if field in ("sport", "dport"):
+            return all(high_a < low_b or high_b < low_a for low_a, high_a in first for low_b, high_b in second)
+        return all(not ipaddress.ip_network(a).overlaps(ipaddress.ip_network(b)) for a in first for b in second)
+
+    @staticmethod
+    def _union(field: str, values: List[Any]) -> List[Any]:
+        if field in ("sport", "dport"):
+            return merge_port_ranges(values)
+        return [str(net) for net in ipaddress.collapse_addresses(ipaddress.ip_network(v) for v in values)]
+
+    @staticmethod
+    def _can_extend(group: Dict[str, Any], rule: Dict[str, Any]) -> bool:
+        """Проверить, что правило можно добавить в группу без изменения семантики."""
+        field = group["field"]
+        if FirewallOptimizer._merge_key(rule, field) != group["key"]:
+            return False
+
+        verdict = FirewallOptimizer.verdict(rule)
+        verdicts = {FirewallOptimizer.verdict(member) for member in group["rules"]} | {verdict}
+        if len(verdicts) == 1:
+            return True
+
+        # Разные действия допустимы только в карте вердиктов с непересекающимися ключами
+        if any(action not in VMAP_ACTIONS for action, _, _ in verdicts):
+            return False
+        return all(
+            FirewallOptimizer._disjoint(field, member[field], rule[field])
+            for member in group["rules"] if FirewallOptimizer.verdict(member) != verdict
+        )
+
+    @staticmethod
+    def build_merged(group: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Собрать одно правило из группы объединяемых правил.
+
+        Правила с одинаковым действием объединяются в анонимное множество,
+        с разными действиями - в карту вердиктов. Идентификатор берется у
+        первого правила группы, чтобы инкрементальное обновление заменяло
+        правило на месте при добавлении новых элементов.
+
+        Args:
+            group: Группа правил с полем объединения
+
+        Returns:
+            Объединенное правило
+        """
+        field, members = group["field"], group["rules"]
+        merged = dict(members[0])
+        merged["merged"] = [member["id"] for member in members]
+        merged[field] = FirewallOptimizer._union(field, [value for member in members for value in member[field]])
+
+        verdicts: Dict[Tuple, List[Any]] = {}
+        for member in members:
+            verdicts.setdefault(FirewallOptimizer.verdict(member), []).extend(member[field])
+        if len(verdicts) > 1:
+            merged["vmap"] = {
+                "field": field,
+                "entries": [
+                    {"values": FirewallOptimizer._union(field, values), "action": action, "target": target}
+                    for (action, target, _), values in verdicts.items()
+                ],
+            }
+        return merged
+
+    @staticmethod
+    def merge(rules: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Объединить подряд идущие правила, отличающиеся одним полем.
+
+        Объединяются только соседние правила одной цепочки, поэтому порядок
+        проверки относительно остальных правил не меняется.
+
+        Args:
+            rules: Правила в порядке применения
+
+        Returns:
+            Кортеж (правила после объединения, описание объединенных групп)
+        """
+        result: List[Dict[str, Any]] = []
+        report: List[Dict[str, Any]] = []
+        group: Optional[Dict[str, Any]] = None
+
+        for rule in rules + [None]:
+            if group is not None and rule is not None:
+                if group["field"] and FirewallOptimizer._can_extend(group, rule):
+                    group["rules"].append(rule)
+                    continue
+
+                # Группа из одного правила выбирает поле объединения по следующему правилу
+                if len(group["rules"]) == 1:
+                    candidate = FirewallOptimizer._start_group(group["rules"][0], rule)
+                    if candidate is not None:
+                        group = candidate
+                        continue
+
+            if group is not None:
+                if len(group["rules"]) == 1:
+                    result.append(group["rules"][0])
+                else:
+                    merged_rule = FirewallOptimizer.build_merged(group)
+                    result.append(merged_rule)
+                    report.append({"id": merged_rule["id"], "field": group["field"],
+                                   "rules": merged_rule["merged"], "vmap": "vmap" in merged_rule})
+            group = {"field": None, "key": None, "rules": [rule]} if rule is not None else None
+
+        return result, report
+
+    @staticmethod
+    def _start_group(first: Dict[str, Any], rule: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Подобрать поле, по которому два правила объединяются, и создать группу."""
+        for field in MERGE_FIELDS:
+            key = FirewallOptimizer._merge_key(first, field)
+            if key is None:
+                continue
+            candidate = {"field": field, "key": key, "rules": [first]}
+            if FirewallOptimizer._can_extend(candidate, rule):
+                candidate["rules"].append(rule)
+                return candidate
+        return None
+
+    @staticmethod
+    def optimize(normalized: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Оптимизировать результат нормализации конфигурации.
+
+        Args:
+            normalized: Результат FirewallCompiler.normalize
+
+        Returns:
+            Результат нормализации с оптимизированными правилами и отчетом optimization
+        """
+        rules = normalized["rules"]
+        kept, duplicates, shadowed = FirewallOptimizer.remove_unreachable(rules)
+        merged_rules, merged = FirewallOptimizer.merge(kept)
+
+        report = {
+            "before": len(rules),
+            "after": len(merged_rules),
+            "duplicates": duplicates,
+            "shadowed": shadowed,
+            "merged": merged,
+        }
+        if duplicates or shadowed or merged:
+            logger.info(f"Оптимизация правил: {len(rules)} -> {len(merged_rules)}, дубликатов {len(duplicates)}, "
+                        f"перекрытых {len(shadowed)}, объединено групп {len(merged)}")
+
+        return {**normalized, "rules": merged_rules, "optimization": report}
@@ -0,0 +1,330 @@
+import os
+import json
+import base64
+import bisect
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from utils.firewall_compiler import FirewallCompiler, FirewallCompileError
+
+logger = logging.getLogger(__name__)
+
+# Размер страницы по умолчанию и максимальный размер страницы
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Поля, по которым фильтруются правила (значение сравнивается без учета регистра)
+FILTER_FIELDS = ("chain", "action", "protocol")
+
+# Число запоминаемых результатов фильтрации для одного индекса
+FILTER_CACHE_SIZE = 32
+
+
+def _priority(rule: Dict[str, Any]) -> int:
+    try:
+        return int(rule.get("priority", 100))
+    except (TypeError, ValueError):
+        return 100
+
+
+# Ключи сортировки; идентификатор правила делает порядок полным и не меняется
+# при удалении и добавлении других правил, в отличие от позиции
+SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], Tuple]] = {
+    "priority": lambda rule: (_priority(rule), rule["id"]),
+    "name": lambda rule: (str(rule.get("name", "")).lower(), rule["id"]),
+    "chain": lambda rule: (str(rule.get("chain", "INPUT")).upper(), _priority(rule), rule["id"]),
+    "position": lambda rule: (rule["position"], rule["id"]),
+}
+
+
+class FirewallRuleNotFound(KeyError):
+    """
+    Правило межсетевого экрана с указанным идентификатором не найдено.
+    """
+
+
+class FirewallRuleIndex:
+    """
+    Индекс пользовательских правил межсетевого экрана в памяти.
+
+    Для каждого поля сортировки заранее построен упорядоченный список
+    ключей, а результаты фильтрации кешируются, поэтому страница по курсору
+    находится бинарным поиском, а не перебором всех правил. Курсор хранит
+    ключ и идентификатор последнего правила страницы; если правило еще
+    существует, продолжение ищется по его текущему ключу, поэтому курсор
+    остается корректным при добавлении и удалении правил.
+    """
+
+    def __init__(self, config: Dict[str, Any], revision: Any = None):
+        self.revision = revision
+        config_rules = config.get("rules", []) or []
+        source_rules = FirewallCompiler.source_rules(config)
+        # Идентификаторы совпадают с используемыми в компиляторе, счетчиках и симуляторе
+        ids = FirewallCompiler.rule_ids(source_rules)[len(source_rules) - len(config_rules):]
+
+        self.rules: List[Dict[str, Any]] = []
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        for position, (rule_id, rule) in enumerate(zip(ids, config_rules)):
+            entry = {**rule, "id": rule_id, "position": position}
+            entry["_text"] = " ".join(str(value) for key, value in entry.items() if key != "position").lower()
+            self.rules.append(entry)
+            self.by_id[rule_id] = entry
+
+        self.sorted: Dict[str, List[Tuple[Tuple, int]]] = {
+            sort: sorted((key(rule), rule["position"]) for rule in self.rules)
+            for sort, key in SORT_KEYS.items()
+        }
+        self._filter_cache: Dict[Tuple, List[Tuple[Tuple, int]]] = {}
+
+    @staticmethod
+    def public(rule: Dict[str, Any]) -> Dict[str, Any]:
+        """Правило без служебных полей индекса."""
+        return {key: value for key, value in rule.items() if not key.startswith("_")}
+
+    @staticmethod
+    def encode_cursor(sort: str, order: str, key: Tuple) -> str:
+        # Идентификатор правила - последний элемент ключа
+        data = json.dumps({"s": sort, "o": order, "k": list(key), "i": key[-1]}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, cursor: str, sort: str, order: str) -> Tuple:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            key = tuple(data["k"])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+        if data.get("s") != sort or data.get("o") != order:
+            raise ValueError("Cursor does not match sort order")
+        # Позиция правила сдвигается при удалении правил перед ним: берется текущий ключ
+        rule = self.by_id.get(data.get("i"))
+        return SORT_KEYS[sort](rule) if rule is not None else key
+
+    def get(self, rule_id: str) -> Dict[str, Any]:
+        """
+        Получить правило по идентификатору.
+
+        Args:
+            rule_id: Идентификатор правила
+
+        Returns:
+            Правило конфигурации с полями id и position
+        """
+        if rule_id not in self.by_id:
+            raise FirewallRuleNotFound(rule_id)
+        return FirewallRuleIndex.public(self.by_id[rule_id])
+
+    def query(self, sort: str = "priority", order: str = "asc", cursor: Optional[str] = None,
+              limit: int = DEFAULT_PAGE_SIZE, search: Optional[str] = None,
+              enabled: Optional[bool] = None, **filters: Optional[str]) -> Dict[str, Any]:
+        """
+        Получить страницу правил.
+
+        Args:
+            sort: Поле сортировки: priority, name, chain или position
+            order: Порядок сортировки: asc или desc
+            cursor: Курсор из next_cursor предыдущей страницы
+            limit: Размер страницы
+            search: Подстрока для поиска по всем полям правила
+            enabled: Только включенные (True) или выключенные (False) правила
+            filters: Точное совпадение полей chain, action, protocol
+
+        Returns:
+            Словарь с правилами страницы, курсором следующей страницы и числом подходящих правил
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort field: {sort}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"Unknown sort order: {order}")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        active = tuple(sorted(
+            (field, str(value).lower()) for field, value in filters.items() if field in FILTER_FIELDS and value
+        ))
+        needle = search.lower() if search else None
+        matching = self._matching(sort, active, enabled, needle)
+
+        # Ключ курсора дополняется бесконечностью вместо позиции, чтобы сравнение было строгим
+        key = self.decode_cursor(cursor, sort, order) if cursor else None
+        if order == "asc":
+            start = bisect.bisect_right(matching, (key, float("inf"))) if key is not None else 0
+            selected = matching[start:start + limit]
+            has_more = start + limit < len(matching)
+        else:
+            end = bisect.bisect_left(matching, (key, float("-inf"))) if key is not None else len(matching)
+            selected = matching[max(0, end - limit):end][::-1]
+            has_more = end - limit > 0
+
+        page = [FirewallRuleIndex.public(self.rules[position]) for _, position in selected]
+        next_cursor = FirewallRuleIndex.encode_cursor(sort, order, selected[-1][0]) if selected and has_more else None
+        return {"rules": page, "next_cursor": next_cursor, "total": len(matching), "limit": limit}
+
+    def _matching(self, sort: str, active: Tuple, enabled: Optional[bool], needle: Optional[str]) -> List[Tuple[Tuple, int]]:
+        """Упорядоченные ключи правил, подходящих под фильтры (результат кешируется)."""
+        if not active and enabled is None and needle is None:
+            return self.sorted[sort]
+
+        cache_key = (sort, active, enabled, needle)
+        if cache_key in self._filter_cache:
+            return self._filter_cache[cache_key]
+
+        def matches(rule: Dict[str, Any]) -> bool:
+            for field, value in active:
+                if str(rule.get(field, "INPUT" if field == "chain" else "")).lower() != value:
+                    return False
+            if enabled is not None and bool(rule.get("enabled", True)) != enabled:
+                return False
+            return needle is None or needle in rule["_text"]
+
+        result = [item for item in self.sorted[sort] if matches(self.rules[item[1]])]
+        if len(self._filter_cache) >= FILTER_CACHE_SIZE:
+            self._filter_cache.pop(next(iter(self._filter_cache)))
+        self._filter_cache[cache_key] = result
+        return result
+
+
+class FirewallRuleStore:
+    """
+    Хранилище пользовательских правил межсетевого экрана с операциями над
+    отдельными правилами.
+
+    Индекс перестраивается только при изменении файла конфигурации
+    (по времени изменения) или после собственной записи.
+    """
+
+    def __init__(self, loader: Callable[[], Dict[str, Any]], saver: Callable[[Dict[str, Any]], Any], path: str):
+        self.loader = loader
+        self.saver = saver
+        self.path = str(path)
+        self.index: Optional[FirewallRuleIndex] = None
+        self._lock = threading.RLock()
+
+    def revision(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def current(self) -> Optional[FirewallRuleIndex]:
+        """
+        Получить индекс, если он построен и файл конфигурации с тех пор не менялся.
+
+        Returns:
+            Индекс правил или None, если индекс нужно построить (get_index)
+        """
+        index = self.index
+        return index if index is not None and index.revision == self.revision() else None
+
+    def get_index(self) -> FirewallRuleIndex:
+        """
+        Получить актуальный индекс правил.
+
+        Returns:
+            Индекс правил
+        """
+        with self._lock:
+            revision = self.revision()
+            if self.index is None or self.index.revision != revision:
+                self.index = FirewallRuleIndex(self.loader() or {}, revision)
+            return self.index
+
+    @staticmethod
+    def validate(config: Dict[str, Any], rule: Dict[str, Any]) -> None:
+        """
+        Проверить правило компилятором межсетевого экрана.
+
+        Args:
+            config: Текущая конфигурация (для пользовательских цепочек)
+            rule: Проверяемое правило
+
+        Raises:
+            FirewallCompileError: Если правило не компилируется
+        """
+        if not isinstance(rule, dict):
+            raise FirewallCompileError("Rule must be an object")
+        checked = {**config, "enabled": True, "open_ports": [], "rules": [{**rule, "enabled": True}]}
+        errors = FirewallCompiler.normalize(checked)["errors"]
+        if errors:
+            raise FirewallCompileError(errors[0]["error"])
+
+    def _save(self, config: Dict[str, Any], rules: List[Dict[str, Any]]) -> None:
+        self.saver({**config, "rules": rules})
+        self.index = None
+
+    def _stored_rules(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]], FirewallRuleIndex]:
+        config = self.loader() or {}
+        index = FirewallRuleIndex(config, self.revision())
+        # Идентификатор записывается в каждое правило, чтобы не меняться при правке имени
+        rules = [{**rule, "id": entry["id"]} for rule, entry in zip(config.get("rules", []) or [], index.rules)]
+        return config, rules, index
+
+    def create(self, rule: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Добавить правило в конец списка правил.
+
+        Args:
+            rule: Новое правило
+
+        Returns:
+            Добавленное правило с идентификатором
+        """
+        with self._lock:
+            config, rules, index = self._stored_rules()
+            FirewallRuleStore.validate(config, rule)
+            rule = {key: value for key, value in rule.items() if key != "position"}
+            if rule.get("id") and str(rule["id"]) in index.by_id:
+                raise ValueError(f"Rule {rule['id']} already exists")
+
+            rules.append(rule)
+            if not rule.get("id"):
+                source_rules = FirewallCompiler.source_rules({**config, "rules": rules})
+                rule["id"] = FirewallCompiler.rule_ids(source_rules)[-1]
+            self._save(config, rules)
+            return {**rule, "position": len(rules) - 1}
+
+    def update(self, rule_id: str, changes: Dict[str, Any], replace: bool = False) -> Dict[str, Any]:
+        """
+        Изменить правило.
+
+        Args:
+            rule_id: Идентификатор правила
+            changes: Новые значения полей
+            replace: Заменить правило целиком вместо обновления полей
+
+        Returns:
+            Измененное правило
+        """
+        with self._lock:
+            config, rules, index = self._stored_rules()
+            if rule_id not in index.by_id:
+                raise FirewallRuleNotFound(rule_id)
+
+            position = index.by_id[rule_id]["position"]
+            changes = {key: value for key, value in changes.items() if key not in ("id", "position")}
+            rule = {**changes, "id": rule_id} if replace else {**rules[position], **changes}
+            FirewallRuleStore.validate(config, rule)
+
+            rules[position] = rule
+            self._save(config, rules)
+            return {**rule, "position": position}
+
+    def delete(self, rule_id: str) -> Dict[str, Any]:
+        """
+        Удалить правило.
+
+        Args:
+            rule_id: Идентификатор правила
+
+        Returns:
+            Удаленное правило
+        """
+        with self._lock:
+            config, rules, index = self._stored_rules()
+            if rule_id not in index.by_id:
+                raise FirewallRuleNotFound(rule_id)
+
+            position = index.by_id[rule_id]["position"]
+            removed = rules.pop(position)
+            self._save(config, rules)
+            return removed
@@ -0,0 +1,375 @@
+import time
+import bisect
+import logging
+import ipaddress
+from typing import Dict, Any, List, Tuple, Optional, Union
+
+from utils.firewall_compiler import FirewallCompiler, BUILTIN_CHAINS
+from utils.firewall_optimizer import merge_port_ranges
+
+logger = logging.getLogger(__name__)
+
+# Максимальная глубина переходов между цепочками
+MAX_JUMP_DEPTH = 16
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+# Базовые цепочки, через которые можно пропустить пакет
+HOOK_CHAINS = tuple(nft_name for nft_name, _, _, _ in BUILTIN_CHAINS.values())
+
+
+def _bits(mask: int):
+    """Перебрать номера установленных битов маски по возрастанию."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class ValueIndex:
+    """
+    Индекс точного совпадения: значение -> маска правил.
+
+    Правила без условия по полю попадают в маску wildcard. Значения,
+    оканчивающиеся на "*", сопоставляются по префиксу (как iifname "eth*").
+    """
+
+    def __init__(self):
+        self.wildcard = 0
+        self.values: Dict[Any, int] = {}
+        self.prefixes: Dict[str, int] = {}
+
+    def add(self, bit: int, values: Optional[List[Any]]) -> None:
+        if not values:
+            self.wildcard |= bit
+            return
+        # Одиночное значение (строка конфигурации) - не последовательность символов
+        if isinstance(values, (str, int)):
+            values = [values]
+        for value in values:
+            if isinstance(value, str) and value.endswith("*"):
+                self.prefixes[value[:-1]] = self.prefixes.get(value[:-1], 0) | bit
+            else:
+                self.values[value] = self.values.get(value, 0) | bit
+
+    def lookup(self, value: Any) -> int:
+        if value is None:
+            return self.wildcard
+        mask = self.wildcard | self.values.get(value, 0)
+        for prefix, bits in self.prefixes.items():
+            if isinstance(value, str) and value.startswith(prefix):
+                mask |= bits
+        return mask
+
+
+class PortIndex:
+    """
+    Индекс диапазонов портов.
+
+    Границы всех диапазонов делят пространство портов на отрезки, для
+    каждого отрезка заранее посчитана маска покрывающих его правил;
+    поиск - один bisect по границам.
+    """
+
+    def __init__(self):
+        self.wildcard = 0
+        self._toggles: Dict[int, int] = {}
+        self.points: List[int] = []
+        self.masks: List[int] = []
+
+    def add(self, bit: int, ranges: List[Tuple[int, int]]) -> None:
+        if not ranges:
+            self.wildcard |= bit
+            return
+        for low, high in merge_port_ranges(ranges):
+            self._toggles[low] = self._toggles.get(low, 0) ^ bit
+            self._toggles[high + 1] = self._toggles.get(high + 1, 0) ^ bit
+
+    def build(self) -> None:
+        active = 0
+        self.points, self.masks = [], []
+        for point in sorted(self._toggles):
+            active ^= self._toggles[point]
+            self.points.append(point)
+            self.masks.append(active)
+        self._toggles = {}
+
+    def lookup(self, port: Optional[int]) -> int:
+        if port is None:
+            return self.wildcard
+        index = bisect.bisect_right(self.points, port) - 1
+        return self.wildcard | (self.masks[index] if index >= 0 else 0)
+
+
+class PrefixIndex:
+    """
+    Индекс сетей (CIDR) одного семейства адресов.
+
+    Сжатое префиксное дерево: для каждой встречающейся длины префикса
+    хранится хеш-таблица "номер сети -> маска правил", поэтому поиск
+    занимает по одному обращению на каждую различную длину префикса.
+    """
+
+    def __init__(self, max_bits: int):
+        self.max_bits = max_bits
+        self.tables: Dict[int, Dict[int, int]] = {}
+        self.lengths: List[int] = []
+
+    def add(self, bit: int, network: IPNetwork) -> None:
+        if network.prefixlen not in self.tables:
+            self.tables[network.prefixlen] = {}
+            self.lengths = sorted(self.tables)
+        table = self.tables[network.prefixlen]
+        key = int(network.network_address) >> (self.max_bits - network.prefixlen)
+        table[key] = table.get(key, 0) | bit
+
+    def lookup(self, address: int) -> int:
+        mask = 0
+        for length in self.lengths:
+            mask |= self.tables[length].get(address >> (self.max_bits - length), 0)
+        return mask
+
+
+class AddressIndex:
+    """
+    Индекс адресного условия (saddr или daddr) с учетом отрицания.
+    """
+
+    def __init__(self):
+        self.wildcard = 0
+        self.positive = {4: PrefixIndex(32), 6: PrefixIndex(128)}
+        self.negative = {4: PrefixIndex(32), 6: PrefixIndex(128)}
+        self.negated = {4: 0, 6: 0}
+
+    def add(self, bit: int, networks: List[str], negated: bool) -> None:
+        if not networks:
+            self.wildcard |= bit
+            return
+        for network in map(ipaddress.ip_network, networks):
+            if negated:
+                self.negative[network.version].add(bit, network)
+                self.negated[network.version] |= bit
+            else:
+                self.positive[network.version].add(bit, network)
+
+    def lookup(self, address: Optional[IPAddress]) -> int:
+        if address is None:
+            return self.wildcard
+        version, value = address.version, int(address)
+        negated = self.negated[version] & ~self.negative[version].lookup(value)
+        return self.wildcard | self.positive[version].lookup(value) | negated
+
+
+class ChainIndex:
+    """
+    Индекс правил одной цепочки.
+
+    Каждое правило - бит в маске; для пакета маски подходящих правил по
+    каждому полю пересекаются, и первое правило в порядке цепочки - это
+    младший установленный бит результата.
+    """
+
+    def __init__(self, chain: Dict[str, Any], rules: List[Dict[str, Any]]):
+        self.chain = chain
+        self.rules = rules
+        self.all = (1 << len(rules)) - 1
+        self.protocols = ValueIndex()
+        self.iif = ValueIndex()
+        self.oif = ValueIndex()
+        self.ct_state = ValueIndex()
+        self.icmp_type = ValueIndex()
+        self.sport = PortIndex()
+        self.dport = PortIndex()
+        self.saddr = AddressIndex()
+        self.daddr = AddressIndex()
+
+        for position, rule in enumerate(rules):
+            bit = 1 << position
+            self.protocols.add(bit, rule.get("protocols"))
+            self.iif.add(bit, [rule["iif"]] if rule.get("iif") else None)
+            self.oif.add(bit, [rule["oif"]] if rule.get("oif") else None)
+            self.ct_state.add(bit, rule.get("ct_state"))
+            self.icmp_type.add(bit, rule.get("icmp_type"))
+            self.sport.add(bit, rule.get("sport"))
+            self.dport.add(bit, rule.get("dport"))
+            self.saddr.add(bit, rule.get("saddr"), rule.get("saddr_neg", False))
+            self.daddr.add(bit, rule.get("daddr"), rule.get("daddr_neg", False))
+        self.sport.build()
+        self.dport.build()
+
+    def candidates(self, packet: Dict[str, Any]) -> int:
+        """
+        Получить маску правил цепочки, условия которых выполняются для пакета.
+
+        Args:
+            packet: Разобранный пакет (см. FirewallSimulator.parse_packet)
+
+        Returns:
+            Битовая маска правил
+        """
+        mask = self.all & self.protocols.lookup(packet["protocol"])
+        for index, field in ((self.iif, "iif"), (self.oif, "oif"), (self.ct_state, "ct_state"),
+                             (self.icmp_type, "icmp_type"), (self.dport, "dport"), (self.sport, "sport"),
+                             (self.saddr, "saddr"), (self.daddr, "daddr")):
+            if not mask:
+                break
+            mask &= index.lookup(packet[field])
+        return mask
+
+
+class FirewallSimulator:
+    """
+    Симулятор прохождения пакетов через настроенный межсетевой экран.
+
+    Строится по нормализованной (не оптимизированной) конфигурации, чтобы
+    в ответе указывались правила в том виде, в котором они заданы.
+    Повторяет семантику nftables: правила проверяются по порядку, log не
+    прерывает обработку, jump возвращается по return или концу цепочки,
+    при отсутствии совпадений действует политика базовой цепочки.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        normalized = FirewallCompiler.normalize(config)
+        self.enabled = normalized["enabled"]
+        self.errors = normalized["errors"]
+
+        by_chain: Dict[str, List[Dict[str, Any]]] = {name: [] for name in normalized["chains"]}
+        for rule in normalized["rules"]:
+            by_chain[rule["chain"]].append(rule)
+        self.chains = {
+            name: ChainIndex(chain, by_chain[name]) for name, chain in normalized["chains"].items()
+        }
+
+    @staticmethod
+    def parse_packet(packet: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Разобрать описание пакета в формате полей правил конфигурации.
+
+        Args:
+            packet: Словарь с полями chain, protocol, source, destination,
+                source_port, destination_port, in_interface, out_interface,
+                state и icmp_type
+
+        Returns:
+            Нормализованный пакет
+        """
+        def address(value: Any) -> Optional[IPAddress]:
+            return ipaddress.ip_address(str(value).strip()) if value not in (None, "") else None
+
+        def port(value: Any) -> Optional[int]:
+            if value in (None, ""):
+                return None
+            value = int(value)
+            if not 0 <= value <= 65535:
+                raise ValueError(f"Invalid port: {value}")
+            return value
+
+        saddr, daddr = address(packet.get("source")), address(packet.get("destination"))
+        if saddr is not None and daddr is not None and saddr.version != daddr.version:
+            raise ValueError("Source and destination address families differ")
+
+        return {
+            "chain": str(packet.get("chain", "input")).lower(),
+            "protocol": str(packet.get("protocol") or "").lower() or None,
+            "saddr": saddr,
+            "daddr": daddr,
+            "sport": port(packet.get("source_port")),
+            "dport": port(packet.get("destination_port")),
+            "iif": packet.get("in_interface") or None,
+            "oif": packet.get("out_interface") or None,
+            "ct_state": str(packet.get("state") or "new").lower(),
+            "icmp_type": packet.get("icmp_type") or None,
+        }
+
+    def evaluate_chain(self, name: str, packet: Dict[str, Any], logged: List[str], depth: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Пройти пакетом по цепочке.
+
+        Args:
+            name: Имя цепочки nft
+            packet: Разобранный пакет
+            logged: Список, в который добавляются сработавшие правила log
+            depth: Текущая глубина переходов
+
+        Returns:
+            Вердикт с правилом или None, если цепочка завершилась без вердикта
+        """
+        if depth > MAX_JUMP_DEPTH:
+            raise ValueError(f"Jump depth exceeded in chain {name}")
+
+        index = self.chains[name]
+        for position in _bits(index.candidates(packet)):
+            rule = index.rules[position]
+            action = rule["action"]
+            if action == "log":
+                logged.append(rule["id"])
+            elif action == "jump":
+                result = self.evaluate_chain(rule["target"], packet, logged, depth + 1)
+                if result is not None:
+                    return result
+            elif action == "return":
+                return None
+            else:
+                return {"verdict": action, "rule": rule["id"], "rule_name": rule["name"], "chain": name}
+        return None
+
+    def evaluate(self, packet: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Определить вердикт межсетевого экрана для пакета.
+
+        Args:
+            packet: Описание пакета (см. parse_packet)
+
+        Returns:
+            Словарь с вердиктом, сработавшим правилом, цепочкой и правилами log
+        """
+        parsed = FirewallSimulator.parse_packet(packet)
+        chain_name = parsed["chain"]
+        logged: List[str] = []
+
+        if chain_name not in HOOK_CHAINS:
+            raise ValueError(f"Unknown chain: {chain_name}")
+
+        # Выключенный межсетевой экран или цепочка пропускают весь трафик
+        if not self.enabled or chain_name not in self.chains:
+            return {"verdict": "accept", "rule": None, "rule_name": None, "chain": chain_name, "policy": True, "logged": logged}
+
+        result = self.evaluate_chain(chain_name, parsed, logged)
+        if result is None:
+            chain = self.chains[chain_name].chain
+            verdict = "reject" if chain.get("reject") else chain["policy"]
+            rule = f"policy-reject-{chain_name}" if chain.get("reject") else None
+            return {"verdict": verdict, "rule": rule, "rule_name": None, "chain": chain_name, "policy": True, "logged": logged}
+        return {**result, "policy": False, "logged": logged}
+
+    def evaluate_many(self, packets: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Определить вердикты для набора пакетов.
+
+        Ошибка в описании одного пакета не прерывает обработку остальных.
+
+        Args:
+            packets: Список описаний пакетов
+
+        Returns:
+            Словарь с результатами по пакетам, сводкой вердиктов и временем обработки
+        """
+        started = time.perf_counter()
+        results = []
+        summary: Dict[str, int] = {}
+        for packet in packets:
+            try:
+                result = self.evaluate(packet)
+                summary[result["verdict"]] = summary.get(result["verdict"], 0) + 1
+            except (ValueError, TypeError) as e:
+                result = {"error": str(e)}
+                summary["error"] = summary.get("error", 0) + 1
+            results.append(result)
+
+        return {
+            "results": results,
+            "summary": summary,
+            "count": len(results),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
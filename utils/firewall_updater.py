@@ -0,0 +1,253 @@
+import time
+import bisect
+import logging
+import threading
+from typing import Dict, Any, List, Tuple, Optional
+
+from utils.nftables_handler import NftablesHandler
+from utils.firewall_compiler import FirewallCompiler, FIREWALL_TABLE, RULE_COMMENT_PREFIX
+from utils.firewall_counters import counter_collector
+
+logger = logging.getLogger(__name__)
+
+
+def _stable_ids(old_ids: List[str], new_ids: List[str]) -> set:
+    """
+    Найти правила, которые остаются на месте: наибольшая общая
+    подпоследовательность двух списков уникальных идентификаторов.
+
+    Так как идентификаторы уникальны, задача сводится к наибольшей
+    возрастающей подпоследовательности позиций и решается за O(n log n).
+    """
+    old_positions = {rule_id: index for index, rule_id in enumerate(old_ids)}
+    sequence = [(old_positions[rule_id], rule_id) for rule_id in new_ids if rule_id in old_positions]
+
+    tails: List[int] = []
+    tail_items: List[int] = []
+    parents: List[Optional[int]] = []
+    for index, (position, _) in enumerate(sequence):
+        slot = bisect.bisect_left(tails, position)
+        parents.append(tail_items[slot - 1] if slot > 0 else None)
+        if slot == len(tails):
+            tails.append(position)
+            tail_items.append(index)
+        else:
+            tails[slot] = position
+            tail_items[slot] = index
+
+    result = set()
+    current = tail_items[-1] if tail_items else None
+    while current is not None:
+        result.add(sequence[current][1])
+        current = parents[current]
+    return result
+
+
+class FirewallUpdater:
+    """
+    Инкрементальное применение набора правил межсетевого экрана.
+
+    Хранит последнюю примененную раскладку правил и дескрипторы (handle)
+    правил в ядре, сопоставленные по идентификатору из комментария.
+    Новая раскладка сравнивается с примененной, и в ядро одной транзакцией
+    отправляются только операции delete, replace, add и insert.
+    Полная перезагрузка таблицы выполняется при изменении структуры
+    цепочек или если состояние ядра расходится с сохраненным.
+    """
+
+    def __init__(self):
+        self.layout: Optional[Dict[str, Dict[str, Any]]] = None
+        self.handles: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def structure(layout: Dict[str, Dict[str, Any]]) -> List[Tuple[str, Optional[str]]]:
+        """
+        Получить структуру цепочек (имена и заголовки) раскладки.
+
+        Args:
+            layout: Раскладка правил по цепочкам
+
+        Returns:
+            Список пар (цепочка, заголовок)
+        """
+        return [(name, chain["header"]) for name, chain in layout.items()]
+
+    @staticmethod
+    def read_handles() -> Optional[Dict[str, int]]:
+        """
+        Прочитать дескрипторы правил таблицы межсетевого экрана из ядра.
+
+        Returns:
+            Словарь {идентификатор правила: handle} или None, если таблицы нет
+        """
+        data = NftablesHandler.list_json("table", "inet", FIREWALL_TABLE)
+        if not data.get("nftables"):
+            return None
+
+        handles = {}
+        for item in data["nftables"]:
+            rule = item.get("rule")
+            if rule and str(rule.get("comment", "")).startswith(RULE_COMMENT_PREFIX):
+                handles[rule["comment"][len(RULE_COMMENT_PREFIX):]] = rule["handle"]
+        return handles
+
+    def diff(self, layout: Dict[str, Dict[str, Any]]) -> Optional[List[str]]:
+        """
+        Сформировать команды nft для перехода от примененной раскладки к новой.
+
+        Args:
+            layout: Новая раскладка правил по цепочкам
+
+        Returns:
+            Список команд nft или None, если требуется полная перезагрузка
+        """
+        if self.layout is None or FirewallUpdater.structure(self.layout) != FirewallUpdater.structure(layout):
+            return None
+
+        prefix = f"inet {FIREWALL_TABLE}"
+        commands: List[str] = []
+
+        for chain_name, chain in layout.items():
+            old_rules = self.layout[chain_name]["rules"]
+            new_rules = chain["rules"]
+            if old_rules == new_rules:
+                continue
+
+            old_text = dict(old_rules)
+            old_ids = [rule_id for rule_id, _ in old_rules]
+            new_ids = [rule_id for rule_id, _ in new_rules]
+            if any(rule_id not in self.handles for rule_id in old_ids):
+                return None
+
+            kept = _stable_ids(old_ids, new_ids)
+
+            # Удаляем исчезнувшие и переместившиеся правила
+            for rule_id in old_ids:
+                if rule_id not in kept:
+                    commands.append(f"delete rule {prefix} {chain_name} handle {self.handles[rule_id]}")
+
+            # Изменившиеся правила на своих местах заменяем, сохраняя позицию
+            for rule_id, text in new_rules:
+                if rule_id in kept and old_text[rule_id] != text:
+                    commands.append(f"replace rule {prefix} {chain_name} handle {self.handles[rule_id]} {text}")
+
+            # Новые правила вставляем группами относительно ближайшего
+            # сохраненного правила: после предыдущего или перед следующим
+            index = 0
+            while index < len(new_rules):
+                if new_rules[index][0] in kept:
+                    index += 1
+                    continue
+
+                run_end = index
+                while run_end < len(new_rules) and new_rules[run_end][0] not in kept:
+                    run_end += 1
+                run = new_rules[index:run_end]
+
+                if index > 0:
+                    anchor = self.handles[new_rules[index - 1][0]]
+                    for _, text in reversed(run):
+                        commands.append(f"add rule {prefix} {chain_name} position {anchor} {text}")
+                elif run_end < len(new_rules):
+                    anchor = self.handles[new_rules[run_end][0]]
+                    for _, text in run:
+                        commands.append(f"insert rule {prefix} {chain_name} position {anchor} {text}")
+                else:
+                    for _, text in run:
+                        commands.append(f"add rule {prefix} {chain_name} {text}")
+
+                index = run_end
+
+        # Счетчики новых правил создаются до правил, счетчики удаленных - удаляются после
+        old_all = {rule_id for chain in self.layout.values() for rule_id, _ in chain["rules"]}
+        new_all = {rule_id for chain in layout.values() for rule_id, _ in chain["rules"]}
+        added = [f"add counter {prefix} {FirewallCompiler.counter_name(rule_id)}"
+                 for chain in layout.values() for rule_id, _ in chain["rules"] if rule_id not in old_all]
+        removed = [f"delete counter {prefix} {FirewallCompiler.counter_name(rule_id)}"
+                   for chain in self.layout.values() for rule_id, _ in chain["rules"] if rule_id not in new_all]
+        return added + commands + removed if commands else commands
+
+    def apply(self, config: Dict[str, Any], force_full: bool = False) -> Dict[str, Any]:
+        """
+        Скомпилировать конфигурацию и применить только изменения.
+
+        Args:
+            config: Конфигурация межсетевого экрана
+            force_full: Всегда выполнять полную перезагрузку таблицы
+
+        Returns:
+            Словарь с результатом, режимом применения, числом операций и временем этапов
+        """
+        with self._lock:
+            started = time.perf_counter()
+            compiled = FirewallCompiler.compile(config)
+            timings = dict(compiled["timings"])
+            timings["compile_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+            if compiled["errors"]:
+                return {
+                    "success": False,
+                    "message": "Firewall configuration has errors",
+                    "errors": compiled["errors"],
+                    "timings": timings,
+                }
+
+            layout = compiled["layout"]
+            commands = None if force_full else self.diff(layout)
+            mode = "full" if commands is None else "incremental"
+
+            started = time.perf_counter()
+            if commands is None:
+                script = compiled["script"]
+            else:
+                script = "\n".join(commands) + "\n" if commands else ""
+            timings["diff_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+            started = time.perf_counter()
+            success, error = NftablesHandler.apply_script(script) if script else (True, "")
+
+            if not success and mode == "incremental":
+                # Состояние ядра разошлось с сохраненным: перезагружаем таблицу целиком
+                logger.warning(f"Инкрементальное обновление не применено ({error}), выполняется полная перезагрузка")
+                mode = "full"
+                success, error = NftablesHandler.apply_script(compiled["script"])
+            timings["apply_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+            if not success:
+                self.layout = None
+                self.handles = {}
+                return {
+                    "success": False,
+                    "message": f"Failed to apply firewall rules: {error}",
+                    "errors": [{"rule": "", "error": error}],
+                    "mode": mode,
+                    "timings": timings,
+                }
+
+            if script:
+                started = time.perf_counter()
+                handles = FirewallUpdater.read_handles() if layout else {}
+                timings["handles_ms"] = round((time.perf_counter() - started) * 1000, 3)
+                self.handles = handles or {}
+
+            self.layout = layout
+            counter_collector.track(compiled)
+            operations = len(commands) if commands is not None else sum(len(c["rules"]) for c in layout.values())
+            logger.info(f"Межсетевой экран применен ({mode}): операций {operations}, "
+                        f"компиляция {timings['compile_ms']} мс, применение {timings['apply_ms']} мс")
+
+            return {
+                "success": True,
+                "message": "Firewall rules applied",
+                "errors": [],
+                "mode": mode,
+                "operations": operations,
+                "rules": len(compiled["rules"]),
+                "optimization": compiled["optimization"],
+                "timings": timings,
+            }
+
+
+# Общий экземпляр, хранящий примененное состояние межсетевого экрана
+firewall_updater = FirewallUpdater()
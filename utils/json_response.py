@@ -0,0 +1,135 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Число закодированных ответов в кеше
+RESPONSE_CACHE_SIZE = 128
+
+
+def encode_json(content: Any) -> bytes:
+    """
+    Закодировать данные в компактный JSON (UTF-8).
+
+    Используется orjson, если он установлен; значения, которые orjson не
+    поддерживает (например, целые числа больше 64 бит), кодируются
+    стандартным модулем json.
+
+    Args:
+        content: Данные ответа
+
+    Returns:
+        JSON в виде байтов
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON-ответ, кодируемый через orjson (или json без лишних пробелов).
+
+    Данные передаются кодировщику как есть, без обхода jsonable_encoder,
+    поэтому обработчик должен возвращать словари, списки и простые значения.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+class EncodedResponseCache:
+    """
+    Кеш закодированных JSON-ответов.
+
+    Ответ хранится вместе с ревизией источника (время изменения файла
+    конфигурации, номер выборки метрик и т.п.); пока ревизия не изменилась,
+    данные не читаются и не кодируются заново. Размер кеша ограничен,
+    вытесняются давно не использованные ответы.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, revision: Any, producer: Callable[[], Any]) -> bytes:
+        """
+        Получить закодированный ответ.
+
+        Args:
+            key: Ключ ответа (адрес и параметры запроса)
+            revision: Ревизия источника данных; None - не кешировать
+            producer: Функция, возвращающая данные ответа
+
+        Returns:
+            JSON в виде байтов
+        """
+        if revision is not None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == revision:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+
+        body = encode_json(producer())
+        if revision is None:
+            return body
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (revision, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def contains(self, key: Hashable, revision: Any) -> bool:
+        """
+        Проверить, есть ли в кеше ответ для ревизии (данные не нужно читать и кодировать).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return revision is not None and entry is not None and entry[0] == revision
+
+    def response(self, key: Hashable, revision: Any, producer: Callable[[], Any],
+                 status_code: int = 200, headers: Optional[dict] = None) -> Response:
+        """
+        Получить HTTP-ответ с закодированными данными.
+
+        Args:
+            key: Ключ ответа
+            revision: Ревизия источника данных; None - не кешировать
+            producer: Функция, возвращающая данные ответа
+            status_code: Код ответа
+            headers: Дополнительные заголовки
+
+        Returns:
+            Ответ application/json
+        """
+        return Response(content=self.get(key, revision, producer), status_code=status_code,
+                        headers=headers, media_type="application/json")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Общий кеш ответов API
+response_cache = EncodedResponseCache()
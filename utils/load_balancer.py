@@ -0,0 +1,485 @@
+import time
+import socket
+import logging
+import subprocess
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.nftables_handler import NftablesHandler, TUNNEL_MARK_BASE, TUNNEL_TABLE_BASE
+
+logger = logging.getLogger(__name__)
+
+# Имя таблицы nftables балансировщика
+LB_TABLE = "armrouter_lb"
+
+# Число корзин хеша для взвешенного распределения потоков
+HASH_BUCKETS = 100
+
+# Приоритет правил ip rule для меток туннелей
+RULE_PRIORITY_BASE = 1000
+
+ALGORITHMS = ("round_robin", "weighted", "least_latency")
+
+# Методы балансировки в формате веб-интерфейса (tunnel.balancing_method)
+BALANCING_METHODS = {
+    "round-robin": "round_robin",
+    "weighted": "weighted",
+    "performance": "least_latency"
+}
+
+
+class TunnelLoadBalancer:
+    """
+    Балансировщик потоков между включенными туннелями.
+
+    Новые соединения получают метку туннеля через numgen (round_robin)
+    или jhash по адресам и портам (weighted, least_latency); метка
+    сохраняется в conntrack, поэтому перераспределение затрагивает только
+    новые потоки. Каждой метке соответствует своя таблица маршрутизации
+    с маршрутом по умолчанию через интерфейс туннеля.
+    """
+
+    def __init__(self, tunnel_config: Dict[str, Any]):
+        traffic_routing = tunnel_config.get("traffic_routing", {}) or {}
+        self.enabled = tunnel_config.get("enabled", False)
+        # Веб-интерфейс хранит режим и метод в корне секции, traffic_routing - прежний формат
+        self.mode = tunnel_config.get("routing_mode") or traffic_routing.get("mode", "all")
+        method = tunnel_config.get("balancing_method")
+        self.algorithm = (BALANCING_METHODS.get(method, method) if method
+                          else traffic_routing.get("load_balance_algorithm", "round_robin"))
+        self.selection = traffic_routing.get("tunnel_selection", "first_available")
+        self.preferred = [str(key) for key in (tunnel_config.get("primary_tunnel"), tunnel_config.get("backup_tunnel"))
+                          if key]
+        self.tunnels = TunnelLoadBalancer.collect_tunnels(
+            tunnel_config.get("tunnels", []) or [],
+            tunnel_config.get("balanced_tunnels") if self.mode == "balanced" else None
+        )
+        self.health: Dict[str, Dict[str, Any]] = {}
+        self.applied_weights: Dict[int, int] = {}
+
+        if self.algorithm not in ALGORITHMS:
+            logger.warning(f"Неизвестный алгоритм балансировки {self.algorithm}, используется round_robin")
+            self.algorithm = "round_robin"
+
+    @staticmethod
+    def collect_tunnels(tunnels: List[Dict[str, Any]],
+                        balanced: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Отобрать включенные туннели и определить их интерфейсы.
+
+        Args:
+            tunnels: Список туннелей из конфигурации
+            balanced: Туннели для балансировки из веб-интерфейса (id и вес);
+                если список задан, остальные туннели не используются
+
+        Returns:
+            Список словарей с индексом, именем, интерфейсом, весом и приоритетом
+        """
+        balanced_weights = {str(item.get("id")): item.get("weight", 1) for item in balanced or [] if item.get("id")}
+
+        result = []
+        for index, tunnel in enumerate(tunnels):
+            if not tunnel.get("enabled", False):
+                continue
+
+            name = tunnel.get("name", f"tunnel{index}")
+            key = str(tunnel.get("id", name))
+            weight = tunnel.get("weight", 1)
+            if balanced_weights:
+                if key not in balanced_weights:
+                    continue
+                weight = balanced_weights[key]
+
+            config = tunnel.get("config", {}) or {}
+            interface = tunnel.get("interface") or config.get("interface")
+            if not interface:
+                # OpenVPN и другие туннели без явного интерфейса получают tunN по порядку
+                interface = f"tun{index}"
+
+            result.append({
+                "index": index,
+                "id": key,
+                "name": name,
+                "interface": interface,
+                "weight": max(0, int(weight or 0)),
+                "priority": tunnel.get("priority", 0),
+                "mark": TUNNEL_MARK_BASE + index,
+                "table": TUNNEL_TABLE_BASE + index
+            })
+
+        result.sort(key=lambda t: t["priority"])
+        return result
+
+    def update_health(self, name: str, up: bool, latency_ms: Optional[float] = None) -> None:
+        """
+        Обновить данные о состоянии туннеля.
+
+        Args:
+            name: Имя туннеля
+            up: Туннель доступен
+            latency_ms: Измеренная задержка в миллисекундах
+        """
+        previous = self.health.get(name, {})
+        latency = latency_ms
+        if latency is not None and previous.get("latency_ms") is not None:
+            # Сглаживание, чтобы единичный выброс не вызывал перебалансировку
+            latency = 0.7 * previous["latency_ms"] + 0.3 * latency_ms
+
+        self.health[name] = {"up": up, "latency_ms": latency, "updated": time.time()}
+
+    def is_up(self, tunnel: Dict[str, Any]) -> bool:
+        return self.health.get(tunnel["name"], {}).get("up", True)
+
+    def compute_weights(self) -> Dict[int, int]:
+        """
+        Вычислить доли корзин хеша для каждого доступного туннеля.
+
+        Returns:
+            Словарь {индекс туннеля: число корзин из HASH_BUCKETS}
+        """
+        # Режимы geo, ip и domain маркируют только выбранный трафик своими правилами
+        if not self.enabled or self.mode not in ("all", "balanced"):
+            return {}
+
+        available = [tunnel for tunnel in self.tunnels if self.is_up(tunnel)]
+        if not available:
+            return {}
+
+        if self.mode != "balanced":
+            # Без балансировки весь трафик идет через один туннель: основной, резервный или по приоритету
+            for key in self.preferred:
+                for tunnel in available:
+                    if tunnel["id"] == key:
+                        return {tunnel["index"]: HASH_BUCKETS}
+            if self.selection == "first_available":
+                return {available[0]["index"]: HASH_BUCKETS}
+            preferred = [t for t in available if t["priority"] == available[0]["priority"]]
+            return {preferred[0]["index"]: HASH_BUCKETS}
+
+        if self.algorithm == "least_latency":
+            raw = {}
+            for tunnel in available:
+                latency = self.health.get(tunnel["name"], {}).get("latency_ms")
+                raw[tunnel["index"]] = 1.0 / max(latency, 1.0) if latency is not None else 0.0
+            if not any(raw.values()):
+                raw = {tunnel["index"]: 1.0 for tunnel in available}
+        elif self.algorithm == "weighted":
+            raw = {tunnel["index"]: float(tunnel["weight"]) for tunnel in available}
+            if not any(raw.values()):
+                raw = {tunnel["index"]: 1.0 for tunnel in available}
+        else:
+            raw = {tunnel["index"]: 1.0 for tunnel in available}
+
+        total = sum(raw.values())
+        weights = {index: int(value / total * HASH_BUCKETS) for index, value in raw.items() if value > 0}
+
+        # Остаток от округления отдаем туннелям с наибольшей долей
+        remainder = HASH_BUCKETS - sum(weights.values())
+        for index in sorted(weights, key=lambda i: raw[i], reverse=True)[:remainder]:
+            weights[index] += 1
+
+        return {index: buckets for index, buckets in weights.items() if buckets > 0}
+
+    def needs_rebalance(self, weights: Dict[int, int], threshold: int = 5) -> bool:
+        """
+        Проверить, достаточно ли изменились доли, чтобы перестраивать правила.
+
+        Args:
+            weights: Новые доли корзин
+            threshold: Минимальное изменение доли любого туннеля в корзинах
+
+        Returns:
+            True, если правила нужно обновить
+        """
+        if set(weights) != set(self.applied_weights):
+            return True
+        return any(abs(weights[index] - self.applied_weights[index]) >= threshold for index in weights)
+
+    def render_nft(self, weights: Dict[int, int]) -> str:
+        """
+        Сформировать скрипт nft таблицы балансировщика.
+
+        Таблица пересоздается одной транзакцией; метки существующих
+        соединений хранятся в conntrack и не сбрасываются.
+
+        Args:
+            weights: Доли корзин по индексам туннелей
+
+        Returns:
+            Текст скрипта nft
+        """
+        marks = {tunnel["index"]: tunnel["mark"] for tunnel in self.tunnels}
+        down_marks = [tunnel["mark"] for tunnel in self.tunnels if not self.is_up(tunnel)]
+
+        lines = [
+            f"table inet {LB_TABLE} {{}}",
+            f"delete table inet {LB_TABLE}",
+            f"table inet {LB_TABLE} {{",
+            "    chain prerouting {",
+            "        type filter hook prerouting priority mangle; policy accept;",
+            "        fib daddr type local return"
+        ]
+
+        if down_marks:
+            # Потоки упавших туннелей переназначаются, остальные сохраняют туннель
+            down = ", ".join(hex(mark) for mark in down_marks)
+            lines.append(f"        ct mark {{ {down} }} ct mark set 0x0")
+
+        lines.append("        ct mark != 0x0 meta mark set ct mark return")
+
+        if weights:
+            ordered = sorted(weights.items())
+            if len(ordered) == 1:
+                lines.append(f"        ct state new meta mark set {hex(marks[ordered[0][0]])}")
+            elif self.algorithm == "round_robin":
+                elements = ", ".join(f"{position} : {hex(marks[index])}" for position, (index, _) in enumerate(ordered))
+                lines.append(f"        ct state new meta mark set numgen inc mod {len(ordered)} map {{ {elements} }}")
+            else:
+                buckets = []
+                start = 0
+                for index, count in ordered:
+                    end = start + count - 1
+                    bucket = f"{start}" if start == end else f"{start}-{end}"
+                    buckets.append(f"{bucket} : {hex(marks[index])}")
+                    start = end + 1
+                elements = ", ".join(buckets)
+                for nfproto, prefix in (("ipv4", "ip"), ("ipv6", "ip6")):
+                    lines.append(
+                        f"        meta nfproto {nfproto} ct state new meta mark set jhash "
+                        f"{prefix} saddr . {prefix} daddr . meta l4proto mod {HASH_BUCKETS} seed 0x41524d52 "
+                        f"map {{ {elements} }}"
+                    )
+            lines.append("        ct state new meta mark != 0x0 ct mark set meta mark")
+
+        lines.extend(["    }", "}"])
+        return "\n".join(lines) + "\n"
+
+    def render_ip_batch(self) -> List[str]:
+        """
+        Сформировать команды ip -batch для правил и таблиц маршрутизации туннелей.
+
+        Пакет выполняется отдельно для каждого семейства адресов (ip -4 и
+        ip -6), так как строки пакета не принимают глобальные опции.
+
+        Returns:
+            Список команд без префикса "ip"
+        """
+        commands = []
+        for tunnel in self.tunnels:
+            commands.append(f"rule del priority {RULE_PRIORITY_BASE + tunnel['index']}")
+            commands.append(
+                f"rule add fwmark {hex(tunnel['mark'])} table {tunnel['table']} "
+                f"priority {RULE_PRIORITY_BASE + tunnel['index']}"
+            )
+            commands.append(f"route replace default dev {tunnel['interface']} table {tunnel['table']}")
+        return commands
+
+    def apply_ip_batch(self) -> Tuple[bool, Optional[str]]:
+        """
+        Применить правила и таблицы маршрутизации туннелей для IPv4 и IPv6.
+
+        Returns:
+            Кортеж (успех, текст ошибки)
+        """
+        batch = "\n".join(self.render_ip_batch()) + "\n"
+        errors = []
+        for family in ("-4", "-6"):
+            try:
+                # Команды удаления правил могут завершиться ошибкой, если правил
+                # еще нет; -force продолжает выполнение пакета
+                result = subprocess.run(
+                    ["ip", family, "-force", "-batch", "-"],
+                    input=batch,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    universal_newlines=True
+                )
+            except OSError as e:
+                return False, f"Не удалось выполнить ip: {str(e)}"
+
+            if result.returncode != 0:
+                # Ошибки удаления еще не созданных правил ожидаемы и пропускаются
+                errors.extend(
+                    f"ip {family}: {line.strip()}" for line in result.stderr.splitlines()
+                    if line.strip() and "No such file or directory" not in line and "Command failed" not in line
+                )
+
+        return (False, "; ".join(errors)) if errors else (True, None)
+
+    def apply(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Применить таблицы маршрутизации и правила распределения потоков.
+
+        Args:
+            force: Применить даже если доли не изменились
+
+        Returns:
+            Словарь с результатом и текущими долями туннелей
+        """
+        weights = self.compute_weights()
+        if not force and not self.needs_rebalance(weights):
+            return {"success": True, "changed": False, "weights": self.describe(self.applied_weights)}
+
+        if force or set(weights) != set(self.applied_weights):
+            success, error = self.apply_ip_batch()
+            if not success:
+                logger.error(f"Ошибка применения правил маршрутизации балансировки: {error}")
+                return {"success": False, "changed": False, "error": error, "weights": self.describe(weights)}
+
+        success, error = NftablesHandler.apply_script(self.render_nft(weights))
+        if success:
+            self.applied_weights = weights
+            logger.info(f"Балансировка туннелей обновлена: {self.describe(weights)}")
+
+        return {"success": success, "changed": success, "error": error, "weights": self.describe(weights)}
+
+    def describe(self, weights: Dict[int, int]) -> List[Dict[str, Any]]:
+        """
+        Описать доли туннелей для API.
+
+        Args:
+            weights: Доли корзин по индексам туннелей
+
+        Returns:
+            Список туннелей с долей трафика и состоянием
+        """
+        return [
+            {
+                "name": tunnel["name"],
+                "interface": tunnel["interface"],
+                "mark": hex(tunnel["mark"]),
+                "table": tunnel["table"],
+                "share": weights.get(tunnel["index"], 0) / HASH_BUCKETS,
+                "health": self.health.get(tunnel["name"], {"up": True, "latency_ms": None})
+            }
+            for tunnel in self.tunnels
+        ]
+
+    @staticmethod
+    def measure_latency(interface: str, target: Tuple[str, int] = ("1.1.1.1", 53), timeout: float = 2.0) -> Optional[float]:
+        """
+        Измерить задержку через интерфейс туннеля по времени TCP-соединения.
+
+        Args:
+            interface: Интерфейс туннеля
+            target: Адрес и порт для проверки
+            timeout: Таймаут соединения в секундах
+
+        Returns:
+            Задержка в миллисекундах или None, если соединение не удалось
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            # Без прав на привязку к интерфейсу состояние туннеля неизвестно:
+            # PermissionError пробрасывается вызывающему коду
+            sock.setsockopt(socket.SOL_SOCKET, getattr(socket, "SO_BINDTODEVICE", 25), interface.encode() + b"\0")
+        except PermissionError:
+            sock.close()
+            raise
+
+        try:
+            sock.settimeout(timeout)
+            started = time.perf_counter()
+            sock.connect(target)
+            return (time.perf_counter() - started) * 1000
+        except OSError:
+            return None
+        finally:
+            sock.close()
+
+
+class LoadBalancerService:
+    """
+    Фоновая проверка состояния туннелей с перебалансировкой по результатам.
+    """
+
+    def __init__(self, interval: float = 10.0, target: Tuple[str, int] = ("1.1.1.1", 53)):
+        self.interval = interval
+        self.target = target
+        self.balancer: Optional[TunnelLoadBalancer] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def reload(self, tunnel_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Пересоздать балансировщик по конфигурации и применить правила.
+
+        Args:
+            tunnel_config: Конфигурация туннелей
+
+        Returns:
+            Результат применения
+        """
+        with self._lock:
+            balancer = TunnelLoadBalancer(tunnel_config)
+            if self.balancer is not None:
+                balancer.health = self.balancer.health
+            self.balancer = balancer
+            result = balancer.apply(force=True)
+
+        if tunnel_config.get("enabled", False) and balancer.tunnels:
+            self.start()
+        else:
+            self.stop()
+        return result
+
+    def probe(self) -> None:
+        """
+        Проверить все туннели и перебалансировать при необходимости.
+        """
+        balancer = self.balancer
+        if balancer is None:
+            return
+
+        for tunnel in balancer.tunnels:
+            try:
+                latency = TunnelLoadBalancer.measure_latency(tunnel["interface"], self.target)
+            except PermissionError:
+                logger.warning("Недостаточно прав для проверки туннелей, состояние не обновляется")
+                return
+            balancer.update_health(tunnel["name"], latency is not None, latency)
+
+        with self._lock:
+            if balancer is self.balancer:
+                balancer.apply()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Получить состояние балансировщика.
+
+        Returns:
+            Словарь с режимом, алгоритмом и долями туннелей
+        """
+        balancer = self.balancer
+        if balancer is None:
+            return {"running": False, "tunnels": []}
+
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "mode": balancer.mode,
+            "algorithm": balancer.algorithm,
+            "tunnel_selection": balancer.selection,
+            "tunnels": balancer.describe(balancer.applied_weights)
+        }
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tunnel-balancer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.probe()
+            except Exception as e:
+                logger.error(f"Ошибка проверки туннелей: {str(e)}")
+
+
+# Общий экземпляр службы балансировки
+balancer_service = LoadBalancerService()
@@ -0,0 +1,571 @@
+import json
+import time
+import asyncio
+import socket
+import struct
+import logging
+import ipaddress
+import threading
+from collections import deque
+from typing import Dict, Any, List, Tuple, Optional
+
+logger = logging.getLogger(__name__)
+
+NETLINK_ROUTE = 0
+
+# Типы сообщений netlink
+NLMSG_NOOP = 1
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+RTM_NEWROUTE = 24
+RTM_DELROUTE = 25
+RTM_GETROUTE = 26
+
+NLM_F_REQUEST = 0x01
+NLM_F_DUMP = 0x300
+
+# Группы рассылки rtnetlink (номера групп RTNLGRP_*)
+RTNLGRP_LINK = 1
+RTNLGRP_IPV4_IFADDR = 5
+RTNLGRP_IPV4_ROUTE = 7
+RTNLGRP_IPV6_IFADDR = 9
+RTNLGRP_IPV6_ROUTE = 11
+
+# Атрибуты
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_MTU = 4
+IFLA_OPERSTATE = 16
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+RTA_DST = 1
+RTA_OIF = 4
+RTA_GATEWAY = 5
+RTA_PRIORITY = 6
+RTA_PREFSRC = 7
+RTA_TABLE = 15
+
+IFF_UP = 0x1
+
+# Максимальная пауза между попытками повторного дампа после переполнения буфера, секунд
+RESYNC_MAX_DELAY = 30.0
+RT_TABLE_MAIN = 254
+RTN_UNICAST = 1
+
+OPERSTATES = ["unknown", "notpresent", "down", "lowerlayerdown", "testing", "dormant", "up"]
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_RTATTR = struct.Struct("=HH")
+_IFINFOMSG = struct.Struct("=BxHiII")
+_IFADDRMSG = struct.Struct("=BBBBI")
+_RTMSG = struct.Struct("=BBBBBBBBI")
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _parse_attrs(data: bytes, offset: int) -> Dict[int, bytes]:
+    attrs = {}
+    while offset + 4 <= len(data):
+        length, attr_type = _RTATTR.unpack_from(data, offset)
+        if length < 4:
+            break
+        attrs[attr_type & 0x3FFF] = data[offset + 4:offset + length]
+        offset += _align(length)
+    return attrs
+
+
+def _ip(family: int, raw: bytes) -> str:
+    return socket.inet_ntop(family, raw)
+
+
+class NetlinkMonitor:
+    """
+    Монитор изменений маршрутов, интерфейсов и адресов через rtnetlink.
+
+    Один раз выполняет полный дамп таблиц ядра, после чего поддерживает
+    копии в памяти по инкрементальным событиям групп RTNLGRP_LINK,
+    RTNLGRP_IPV4/IPV6_IFADDR и RTNLGRP_IPV4/IPV6_ROUTE. Каждое изменение
+    получает номер ревизии и рассылается подписчикам.
+    """
+
+    GROUPS = (RTNLGRP_LINK, RTNLGRP_IPV4_IFADDR, RTNLGRP_IPV4_ROUTE, RTNLGRP_IPV6_IFADDR, RTNLGRP_IPV6_ROUTE)
+
+    def __init__(self, history_size: int = 1000):
+        self.links: Dict[int, Dict[str, Any]] = {}
+        self.addresses: Dict[Tuple, Dict[str, Any]] = {}
+        self.routes: Dict[Tuple, Dict[str, Any]] = {}
+        self.revision = 0
+        self._history: deque = deque(maxlen=history_size)
+        self._subscribers: List[Any] = []
+        self._lock = threading.Lock()
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> bool:
+        """
+        Подписаться на события, выполнить начальный дамп и запустить поток чтения.
+
+        Returns:
+            True, если монитор запущен, иначе False
+        """
+        if self._running:
+            return True
+
+        try:
+            groups = 0
+            for group in NetlinkMonitor.GROUPS:
+                groups |= 1 << (group - 1)
+
+            # Подписка выполняется до дампа, чтобы не потерять события,
+            # произошедшие во время дампа; повторное применение идемпотентно
+            self._socket = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            self._socket.bind((0, groups))
+
+            started = time.monotonic()
+            self._dump()
+            logger.info(
+                f"Начальный дамп netlink: интерфейсов {len(self.links)}, адресов {len(self.addresses)}, "
+                f"маршрутов {len(self.routes)} за {(time.monotonic() - started) * 1000:.1f} мс"
+            )
+        except (OSError, AttributeError) as e:
+            logger.error(f"Не удалось запустить монитор netlink: {str(e)}")
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+            return False
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="netlink-monitor", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        """
+        Остановить монитор.
+        """
+        self._running = False
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _dump(self) -> None:
+        dump_socket = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        try:
+            dump_socket.bind((0, 0))
+            for seq, (msg_type, body) in enumerate((
+                (RTM_GETLINK, _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)),
+                (RTM_GETADDR, _IFADDRMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)),
+                (RTM_GETROUTE, _RTMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0, 0, 0, 0, 0)),
+            ), start=1):
+                header = _NLMSGHDR.pack(_NLMSGHDR.size + len(body), msg_type, NLM_F_REQUEST | NLM_F_DUMP, seq, 0)
+                dump_socket.send(header + body)
+
+                done = False
+                while not done:
+                    data = dump_socket.recv(1 << 16)
+                    done = self._handle(data, record=False)
+        finally:
+            dump_socket.close()
+
+    def _run(self) -> None:
+        while self._running:
+            try:
+                data = self._socket.recv(1 << 16)
+            except OSError as e:
+                if not self._running:
+                    break
+                if e.errno == 105:
+                    # ENOBUFS: события потеряны, таблицы нужно перечитать
+                    logger.warning("Переполнение буфера netlink, выполняется повторный дамп")
+                    self._resync()
+                    continue
+                logger.error(f"Ошибка чтения netlink: {str(e)}")
+                break
+
+            self._handle(data, record=True)
+
+    def _resync(self) -> None:
+        delay = 1.0
+        while self._running:
+            with self._lock:
+                self.links.clear()
+                self.addresses.clear()
+                self.routes.clear()
+            try:
+                self._dump()
+            except OSError as e:
+                # Повторный дамп сам может получить ENOBUFS или EBUSY при частых изменениях
+                logger.error(f"Ошибка повторного дампа netlink: {str(e)}, повтор через {delay:.0f} с")
+                time.sleep(delay)
+                delay = min(delay * 2, RESYNC_MAX_DELAY)
+                continue
+            self._record("reset", "snapshot", None, None)
+            return
+
+    def _handle(self, data: bytes, record: bool) -> bool:
+        offset = 0
+        done = False
+
+        while offset + _NLMSGHDR.size <= len(data):
+            length, msg_type, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+            if length < _NLMSGHDR.size:
+                break
+            body = data[offset + _NLMSGHDR.size:offset + length]
+            offset += _align(length)
+
+            if msg_type in (NLMSG_DONE, NLMSG_ERROR):
+                done = True
+                continue
+
+            try:
+                if msg_type in (RTM_NEWLINK, RTM_DELLINK):
+                    self._on_link(msg_type, body, record)
+                elif msg_type in (RTM_NEWADDR, RTM_DELADDR):
+                    self._on_addr(msg_type, body, record)
+                elif msg_type in (RTM_NEWROUTE, RTM_DELROUTE):
+                    self._on_route(msg_type, body, record)
+            except (struct.error, ValueError) as e:
+                logger.debug(f"Некорректное сообщение netlink типа {msg_type}: {str(e)}")
+
+        return done
+
+    def _on_link(self, msg_type: int, body: bytes, record: bool) -> None:
+        _, _, index, flags, _ = _IFINFOMSG.unpack_from(body)
+        attrs = _parse_attrs(body, _IFINFOMSG.size)
+
+        if msg_type == RTM_DELLINK:
+            with self._lock:
+                link = self.links.pop(index, None)
+            if record and link is not None:
+                self._record("link", "del", index, link)
+            return
+
+        operstate = attrs.get(IFLA_OPERSTATE, b"\x00")[0]
+        link = {
+            "index": index,
+            "name": attrs.get(IFLA_IFNAME, b"").rstrip(b"\x00").decode(errors="replace"),
+            "mac": ":".join(f"{b:02x}" for b in attrs.get(IFLA_ADDRESS, b"")),
+            "mtu": struct.unpack("=I", attrs[IFLA_MTU])[0] if IFLA_MTU in attrs else 0,
+            "up": bool(flags & IFF_UP),
+            "operstate": OPERSTATES[operstate] if operstate < len(OPERSTATES) else "unknown",
+            "flags": flags
+        }
+
+        with self._lock:
+            changed = self.links.get(index) != link
+            self.links[index] = link
+        if record and changed:
+            self._record("link", "new", index, link)
+
+    def _on_addr(self, msg_type: int, body: bytes, record: bool) -> None:
+        family, prefixlen, _, scope, index = _IFADDRMSG.unpack_from(body)
+        attrs = _parse_attrs(body, _IFADDRMSG.size)
+        raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+        if raw is None:
+            return
+
+        address = _ip(family, raw)
+        key = (index, family, address, prefixlen)
+
+        if msg_type == RTM_DELADDR:
+            with self._lock:
+                entry = self.addresses.pop(key, None)
+            if record and entry is not None:
+                self._record("address", "del", key, entry)
+            return
+
+        entry = {
+            "interface_index": index,
+            "interface": self._link_name(index),
+            "family": "ipv4" if family == socket.AF_INET else "ipv6",
+            "address": address,
+            "prefixlen": prefixlen,
+            "scope": scope
+        }
+        if IFA_LABEL in attrs:
+            entry["label"] = attrs[IFA_LABEL].rstrip(b"\x00").decode(errors="replace")
+
+        with self._lock:
+            changed = self.addresses.get(key) != entry
+            self.addresses[key] = entry
+        if record and changed:
+            self._record("address", "new", key, entry)
+
+    def _on_route(self, msg_type: int, body: bytes, record: bool) -> None:
+        family, dst_len, _, tos, table, protocol, scope, route_type, _ = _RTMSG.unpack_from(body)
+        attrs = _parse_attrs(body, _RTMSG.size)
+
+        if RTA_TABLE in attrs:
+            table = struct.unpack("=I", attrs[RTA_TABLE])[0]
+
+        if family == socket.AF_INET:
+            destination = _ip(family, attrs[RTA_DST]) if RTA_DST in attrs else "0.0.0.0"
+        else:
+            destination = _ip(family, attrs[RTA_DST]) if RTA_DST in attrs else "::"
+
+        metric = struct.unpack("=I", attrs[RTA_PRIORITY])[0] if RTA_PRIORITY in attrs else 0
+        oif = struct.unpack("=i", attrs[RTA_OIF])[0] if RTA_OIF in attrs else 0
+        gateway = _ip(family, attrs[RTA_GATEWAY]) if RTA_GATEWAY in attrs else ""
+        # IPv6 допускает несколько маршрутов с одинаковым префиксом и метрикой
+        # через разные интерфейсы и шлюзы, поэтому они входят в ключ
+        key = (family, table, destination, dst_len, tos, metric, oif, gateway)
+
+        if msg_type == RTM_DELROUTE:
+            with self._lock:
+                route = self.routes.pop(key, None)
+            if record and route is not None:
+                self._record("route", "del", key, route)
+            return
+
+        route = {
+            "family": "ipv4" if family == socket.AF_INET else "ipv6",
+            "table": table,
+            "destination": destination,
+            "prefixlen": dst_len,
+            "gateway": gateway,
+            "interface_index": oif,
+            "interface": self._link_name(oif),
+            "metric": metric,
+            "protocol": protocol,
+            "scope": scope,
+            "type": route_type
+        }
+        if RTA_PREFSRC in attrs:
+            route["prefsrc"] = _ip(family, attrs[RTA_PREFSRC])
+
+        with self._lock:
+            changed = self.routes.get(key) != route
+            self.routes[key] = route
+        if record and changed:
+            self._record("route", "new", key, route)
+
+    def _link_name(self, index: int) -> str:
+        link = self.links.get(index)
+        return link["name"] if link else ""
+
+    def _record(self, kind: str, op: str, key: Any, value: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.revision += 1
+            change = {
+                "revision": self.revision,
+                "kind": kind,
+                "op": op,
+                "key": list(key) if isinstance(key, tuple) else key,
+                "value": value
+            }
+            self._history.append(change)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber(change)
+            except Exception as e:
+                logger.error(f"Ошибка доставки изменения netlink подписчику: {str(e)}")
+
+    def subscribe(self, callback) -> None:
+        """
+        Подписаться на изменения.
+
+        Обработчик вызывается из потока монитора; для асинхронных клиентов
+        его следует передавать через loop.call_soon_threadsafe.
+
+        Args:
+            callback: Функция, принимающая словарь изменения
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        """
+        Отписаться от изменений.
+
+        Args:
+            callback: Ранее зарегистрированная функция
+        """
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def changes_since(self, revision: int) -> Dict[str, Any]:
+        """
+        Получить изменения после указанной ревизии.
+
+        Args:
+            revision: Последняя известная клиенту ревизия
+
+        Returns:
+            Словарь с текущей ревизией и списком изменений; если история
+            уже не содержит нужных ревизий, возвращается флаг reset
+        """
+        with self._lock:
+            oldest = self._history[0]["revision"] if self._history else self.revision + 1
+            if revision < oldest - 1:
+                return {"revision": self.revision, "reset": True, "changes": []}
+            changes = [change for change in self._history if change["revision"] > revision]
+            return {"revision": self.revision, "reset": False, "changes": changes}
+
+    def get_links(self) -> Dict[str, Any]:
+        """
+        Получить снимок интерфейсов с их адресами.
+
+        Returns:
+            Словарь интерфейсов по имени
+        """
+        with self._lock:
+            result = {}
+            for link in self.links.values():
+                result[link["name"]] = {**link, "addresses": []}
+            for entry in self.addresses.values():
+                if entry["interface"] in result:
+                    result[entry["interface"]]["addresses"].append(entry)
+            return {"revision": self.revision, "interfaces": result}
+
+    def get_routes(self, family: Optional[str] = None, table: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Получить снимок маршрутов.
+
+        Args:
+            family: Фильтр по семейству ("ipv4" или "ipv6")
+            table: Фильтр по таблице маршрутизации
+
+        Returns:
+            Список маршрутов
+        """
+        with self._lock:
+            return [
+                route for route in self.routes.values()
+                if (family is None or route["family"] == family) and (table is None or route["table"] == table)
+            ]
+
+    def get_routing_table(self) -> List[Dict[str, Any]]:
+        """
+        Получить основную таблицу маршрутизации IPv4 в формате SystemUtils.get_routing_table.
+
+        Returns:
+            Список маршрутов
+        """
+        routes = []
+        for route in self.get_routes("ipv4", RT_TABLE_MAIN):
+            if route["type"] != RTN_UNICAST:
+                continue
+
+            flags = "U"
+            if route["gateway"]:
+                flags += "G"
+            if route["prefixlen"] == 32:
+                flags += "H"
+
+            routes.append({
+                "destination": route["destination"],
+                "gateway": route["gateway"] or "0.0.0.0",
+                "netmask": str(ipaddress.IPv4Network(f"0.0.0.0/{route['prefixlen']}").netmask),
+                "flags": flags,
+                "metric": route["metric"],
+                "ref": 0,
+                "use": 0,
+                "interface": route["interface"]
+            })
+
+        routes.sort(key=lambda r: (-int(ipaddress.IPv4Address(r["netmask"])), r["metric"]))
+        return routes
+
+
+_monitor: Optional[NetlinkMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_monitor() -> Optional[NetlinkMonitor]:
+    """
+    Получить общий экземпляр монитора, запустив его при первом обращении.
+
+    Returns:
+        Запущенный монитор или None, если netlink недоступен
+    """
+    global _monitor
+
+    if _monitor is not None:
+        return _monitor if _monitor.running else None
+
+    with _monitor_lock:
+        if _monitor is None:
+            if not hasattr(socket, "AF_NETLINK"):
+                return None
+            _monitor = NetlinkMonitor()
+            _monitor.start()
+
+    return _monitor if _monitor.running else None
+
+
+async def event_stream(monitor: NetlinkMonitor, since: Optional[int] = None, keepalive: float = 15.0):
+    """
+    Асинхронный генератор событий в формате Server-Sent Events.
+
+    Args:
+        monitor: Монитор netlink
+        since: Ревизия, после которой нужно отдать накопленные изменения
+        keepalive: Интервал отправки комментария для поддержания соединения
+
+    Yields:
+        Строки событий SSE
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue(maxsize=10000)
+
+    def put(change: Dict[str, Any]) -> None:
+        if events.full():
+            # Клиент не успевает читать: накопленные изменения отбрасываются,
+            # вместо них клиент получит reset и перечитает состояние
+            while not events.empty():
+                events.get_nowait()
+            events.put_nowait(None)
+            return
+        events.put_nowait(change)
+
+    def on_change(change: Dict[str, Any]) -> None:
+        loop.call_soon_threadsafe(put, change)
+
+    monitor.subscribe(on_change)
+    last_revision = since if since is not None else monitor.revision
+    try:
+        if since is not None:
+            backlog = monitor.changes_since(since)
+            if backlog["reset"]:
+                yield f"event: reset\ndata: {json.dumps({'revision': backlog['revision']})}\n\n"
+            for change in backlog["changes"]:
+                last_revision = change["revision"]
+                yield f"id: {change['revision']}\ndata: {json.dumps(change)}\n\n"
+
+        while True:
+            try:
+                change = await asyncio.wait_for(events.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            if change is None:
+                last_revision = monitor.revision
+                yield f"event: reset\ndata: {json.dumps({'revision': last_revision})}\n\n"
+                continue
+
+            # Изменения, уже отданные из истории, пропускаем
+            if change["revision"] <= last_revision:
+                continue
+            last_revision = change["revision"]
+            yield f"id: {change['revision']}\ndata: {json.dumps(change)}\n\n"
+    finally:
+        monitor.unsubscribe(on_change)
@@ -0,0 +1,115 @@
+import json
+import shutil
+import logging
+import subprocess
+from typing import Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Базовые значения для маркировки трафика туннелей: туннелю с индексом N
+# соответствуют fwmark TUNNEL_MARK_BASE + N и таблица маршрутизации TUNNEL_TABLE_BASE + N
+TUNNEL_MARK_BASE = 0x100
+TUNNEL_TABLE_BASE = 100
+
+
+class NftablesHandler:
+    """
+    Обработчик nftables.
+
+    Этот класс предоставляет методы для применения скриптов nft
+    одной транзакцией и чтения состояния правил в формате JSON.
+    """
+
+    NFT_BINARY = "nft"
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Проверить наличие утилиты nft в системе.
+
+        Returns:
+            True, если nft доступна, иначе False
+        """
+        return shutil.which(NftablesHandler.NFT_BINARY) is not None
+
+    @staticmethod
+    def apply_script(script: str, check_only: bool = False, timeout: float = 30.0) -> Tuple[bool, str]:
+        """
+        Применить скрипт nft одной транзакцией (nft -f -).
+
+        Ядро применяет весь скрипт атомарно: либо все команды, либо ни одной.
+
+        Args:
+            script: Текст скрипта nft
+            check_only: Только проверить скрипт, не применяя его (nft -c)
+            timeout: Таймаут выполнения в секундах
+
+        Returns:
+            Кортеж (успех, текст ошибки)
+        """
+        if not NftablesHandler.is_available():
+            return False, "nft not found"
+
+        command = [NftablesHandler.NFT_BINARY]
+        if check_only:
+            command.append("-c")
+        command.extend(["-f", "-"])
+
+        try:
+            result = subprocess.run(
+                command,
+                input=script,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+                timeout=timeout
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.error(f"Ошибка выполнения nft: {str(e)}")
+            return False, str(e)
+
+        if result.returncode != 0:
+            logger.error(f"Ошибка применения скрипта nft: {result.stderr.strip()}")
+            return False, result.stderr.strip()
+
+        return True, ""
+
+    @staticmethod
+    def list_json(*args: str, timeout: float = 10.0) -> Dict[str, Any]:
+        """
+        Выполнить команду nft list в формате JSON.
+
+        Args:
+            args: Аргументы команды после "list", например ("table", "inet", "armrouter")
+            timeout: Таймаут выполнения в секундах
+
+        Returns:
+            Разобранный JSON-ответ nft или пустой словарь при ошибке
+        """
+        if not NftablesHandler.is_available():
+            return {}
+
+        try:
+            output = subprocess.check_output(
+                [NftablesHandler.NFT_BINARY, "-j", "-a", "list", *args],
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+                timeout=timeout
+            )
+            return json.loads(output)
+        except (OSError, subprocess.SubprocessError, ValueError) as e:
+            logger.error(f"Ошибка чтения состояния nft: {str(e)}")
+            return {}
+
+    @staticmethod
+    def quote(value: str) -> str:
+        """
+        Экранировать строку для использования в скрипте nft.
+
+        Args:
+            value: Исходная строка
+
+        Returns:
+            Строка в двойных кавычках
+        """
+        return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
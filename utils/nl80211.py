@@ -0,0 +1,556 @@
+import os
+import time
+import errno
+import socket
+import struct
+import logging
+import itertools
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.netlink_monitor import (
+    _NLMSGHDR, _RTATTR, _align, _parse_attrs, NLMSG_ERROR, NLMSG_DONE, NLM_F_REQUEST, NLM_F_DUMP,
+)
+
+logger = logging.getLogger(__name__)
+
+NETLINK_GENERIC = 16
+SOL_NETLINK = 270
+NETLINK_ADD_MEMBERSHIP = 1
+NLM_F_ACK = 0x04
+
+# Контроллер generic netlink: поиск семейства и его групп рассылки
+GENL_ID_CTRL = 0x10
+CTRL_CMD_GETFAMILY = 3
+CTRL_ATTR_FAMILY_ID = 1
+CTRL_ATTR_FAMILY_NAME = 2
+CTRL_ATTR_MCAST_GROUPS = 7
+CTRL_ATTR_MCAST_GRP_NAME = 1
+CTRL_ATTR_MCAST_GRP_ID = 2
+
+# Команды и атрибуты nl80211
+NL80211_CMD_GET_SCAN = 32
+NL80211_CMD_TRIGGER_SCAN = 33
+NL80211_CMD_NEW_SCAN_RESULTS = 34
+NL80211_CMD_SCAN_ABORTED = 35
+NL80211_ATTR_IFINDEX = 3
+NL80211_ATTR_BSS = 47
+NL80211_ATTR_SCAN_FLAGS = 158
+NL80211_SCAN_FLAG_AP = 1 << 2
+
+# Атрибуты BSS (вложены в NL80211_ATTR_BSS)
+NL80211_BSS_BSSID = 1
+NL80211_BSS_FREQUENCY = 2
+NL80211_BSS_CAPABILITY = 5
+NL80211_BSS_INFORMATION_ELEMENTS = 6
+NL80211_BSS_SIGNAL_MBM = 7
+NL80211_BSS_SIGNAL_UNSPEC = 8
+NL80211_BSS_STATUS = 9
+NL80211_BSS_SEEN_MS_AGO = 10
+NL80211_BSS_BEACON_IES = 11
+NL80211_BSS_STATUS_ASSOCIATED = 1
+
+WLAN_CAPABILITY_PRIVACY = 0x0010
+
+# Информационные элементы (IE) кадров beacon/probe response, которые разбираются
+_ELEMENTS = {0: "ssid", 7: "country", 45: "ht_cap", 48: "rsn", 61: "ht_op", 191: "vht_cap", 192: "vht_op"}
+WLAN_EID_VENDOR_SPECIFIC = 221
+WLAN_EID_EXTENSION = 255
+_EXT_ELEMENTS = {35: "he_cap", 36: "he_op", 108: "eht_cap"}
+
+_RSN_OUI = b"\x00\x0f\xac"
+_WPA_OUI = b"\x00\x50\xf2"
+
+CIPHER_SUITES = {
+    1: "WEP-40", 2: "TKIP", 4: "CCMP", 5: "WEP-104", 6: "BIP-CMAC-128", 8: "GCMP", 9: "GCMP-256",
+    10: "CCMP-256", 11: "BIP-GMAC-128", 12: "BIP-GMAC-256", 13: "BIP-CMAC-256",
+}
+AKM_SUITES = {
+    1: "802.1X", 2: "PSK", 3: "FT/802.1X", 4: "FT/PSK", 5: "802.1X/SHA-256", 6: "PSK/SHA-256", 8: "SAE",
+    9: "FT/SAE", 11: "802.1X/SUITE-B", 12: "802.1X/SUITE-B-192", 18: "OWE", 24: "SAE-EXT-KEY",
+    25: "FT/SAE-EXT-KEY",
+}
+
+# Наборы аутентификации, относящие сеть к WPA3
+_WPA3_AKMS = {"SAE", "FT/SAE", "SAE-EXT-KEY", "FT/SAE-EXT-KEY", "802.1X/SUITE-B-192"}
+
+_GENLMSGHDR = struct.Struct("=BBH")
+
+# Размер буфера приема; одна запись дампа BSS вместе с IE занимает до нескольких килобайт
+_RECV_SIZE = 1 << 16
+
+# Таймаут ответа на отдельную команду, секунд
+REQUEST_TIMEOUT = 5.0
+
+
+class Nl80211Error(OSError):
+    """
+    Ошибка обмена с nl80211: семейство не найдено, нет прав, интерфейс
+    не поддерживает сканирование или сканирование прервано.
+    """
+
+
+def _attr(attr_type: int, payload: bytes) -> bytes:
+    length = _RTATTR.size + len(payload)
+    return _RTATTR.pack(length, attr_type) + payload + b"\x00" * (_align(length) - length)
+
+
+def _u32(raw: Optional[bytes]) -> Optional[int]:
+    return struct.unpack_from("=I", raw)[0] if raw is not None and len(raw) >= 4 else None
+
+
+def _messages(data: bytes):
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, msg_type, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            break
+        yield msg_type, data[offset + _NLMSGHDR.size:offset + length]
+        offset += _align(length)
+
+
+def frequency_band(frequency: int) -> str:
+    """
+    Определить диапазон по частоте.
+
+    Args:
+        frequency: Частота в МГц
+
+    Returns:
+        "2.4", "5" или "6"
+    """
+    if frequency < 2500:
+        return "2.4"
+    return "5" if frequency < 5925 else "6"
+
+
+def frequency_to_channel(frequency: int) -> int:
+    """
+    Получить номер канала по центральной частоте 20-МГц канала.
+
+    Args:
+        frequency: Частота в МГц
+
+    Returns:
+        Номер канала или 0 для неизвестной частоты
+    """
+    if frequency == 2484:
+        return 14
+    if 2407 < frequency < 2484:
+        return (frequency - 2407) // 5
+    if frequency == 5935:
+        return 2
+    if 5950 < frequency <= 7125:
+        return (frequency - 5950) // 5
+    if 5000 < frequency < 5925:
+        return (frequency - 5000) // 5
+    if 4910 <= frequency <= 4980:
+        return (frequency - 4000) // 5
+    return 0
+
+
+def channel_to_frequency(channel: int, band: str) -> int:
+    """
+    Получить центральную частоту канала.
+
+    Args:
+        channel: Номер канала
+        band: Диапазон ("2.4", "5" или "6")
+
+    Returns:
+        Частота в МГц
+    """
+    if band == "2.4":
+        return 2484 if channel == 14 else 2407 + channel * 5
+    if band == "6":
+        return 5935 if channel == 2 else 5950 + channel * 5
+    return 5000 + channel * 5
+
+
+def signal_quality(signal_dbm: float) -> int:
+    """
+    Перевести уровень сигнала из dBm в проценты (-100 dBm и ниже - 0%, -50 dBm и выше - 100%).
+    """
+    return int(min(max(2 * (signal_dbm + 100), 0), 100))
+
+
+def parse_ies(data: bytes) -> Dict[str, bytes]:
+    """
+    Разбить информационные элементы на отдельные элементы.
+
+    Args:
+        data: IE кадра beacon или probe response
+
+    Returns:
+        Словарь содержимого элементов: ssid, country, ht_cap, ht_op, vht_cap,
+        vht_op, he_cap, he_op, eht_cap, rsn, wpa (без идентификаторов элементов)
+    """
+    elements = {}
+    offset = 0
+    while offset + 2 <= len(data):
+        eid, length = data[offset], data[offset + 1]
+        body = data[offset + 2:offset + 2 + length]
+        offset += 2 + length
+        if len(body) < length:
+            break
+        if eid in _ELEMENTS:
+            elements.setdefault(_ELEMENTS[eid], body)
+        elif eid == WLAN_EID_EXTENSION and body and body[0] in _EXT_ELEMENTS:
+            elements.setdefault(_EXT_ELEMENTS[body[0]], body[1:])
+        elif eid == WLAN_EID_VENDOR_SPECIFIC and body[:4] == _WPA_OUI + b"\x01":
+            elements.setdefault("wpa", body[4:])
+    return elements
+
+
+def _suite_name(suite: bytes, oui: bytes, names: Dict[int, str]) -> str:
+    if suite[:3] == oui and suite[3] in names:
+        return names[suite[3]]
+    return f"{suite[:3].hex()}:{suite[3]}"
+
+
+def parse_security_ie(body: bytes, oui: bytes = _RSN_OUI) -> Dict[str, Any]:
+    """
+    Разобрать элемент RSN или элемент WPA (vendor-specific 00:50:F2, тип 1).
+
+    Поля после версии необязательны; для отсутствующих используются
+    значения по умолчанию из стандарта (CCMP для RSN, TKIP для WPA, 802.1X).
+
+    Args:
+        body: Содержимое элемента, начиная с версии
+        oui: OUI наборов шифров и аутентификации
+
+    Returns:
+        Словарь с групповым шифром, парными шифрами, наборами аутентификации и режимом защиты кадров управления
+    """
+    default_cipher = "CCMP" if oui == _RSN_OUI else "TKIP"
+    result = {"group": default_cipher, "pairwise": [default_cipher], "akm": ["802.1X"], "mfp": None}
+    offset = 2
+    if len(body) < offset + 4:
+        return result
+    result["group"] = _suite_name(body[offset:offset + 4], oui, CIPHER_SUITES)
+    offset += 4
+
+    for key, names in (("pairwise", CIPHER_SUITES), ("akm", AKM_SUITES)):
+        if len(body) < offset + 2:
+            return result
+        count = struct.unpack_from("<H", body, offset)[0]
+        offset += 2
+        suites = body[offset:offset + count * 4]
+        result[key] = [_suite_name(suites[i:i + 4], oui, names) for i in range(0, len(suites) - 3, 4)]
+        offset += count * 4
+
+    if len(body) >= offset + 2:
+        capabilities = struct.unpack_from("<H", body, offset)[0]
+        if capabilities & 0x40:
+            result["mfp"] = "required"
+        elif capabilities & 0x80:
+            result["mfp"] = "capable"
+    return result
+
+
+def _security(elements: Dict[str, bytes], capability: int) -> Dict[str, Any]:
+    rsn = parse_security_ie(elements["rsn"]) if "rsn" in elements else None
+    wpa = parse_security_ie(elements["wpa"], _WPA_OUI) if "wpa" in elements else None
+
+    if rsn is not None:
+        akm = set(rsn["akm"])
+        if "OWE" in akm:
+            security, encryption = "OWE", "none"
+        elif akm & _WPA3_AKMS:
+            # Смешанный режим WPA2/WPA3 доступен клиентам WPA2
+            transition = bool(akm - _WPA3_AKMS)
+            security, encryption = ("WPA2/WPA3", "wpa2") if transition else ("WPA3", "wpa3")
+        else:
+            security, encryption = ("WPA/WPA2" if wpa is not None else "WPA2"), "wpa2"
+        suites = rsn
+    elif wpa is not None:
+        security, encryption, suites = "WPA", "wpa", wpa
+    elif capability & WLAN_CAPABILITY_PRIVACY:
+        return {"security": "WEP", "encryption": "wep", "akm": [], "ciphers": ["WEP"], "mfp": None}
+    else:
+        return {"security": "Open", "encryption": "none", "akm": [], "ciphers": [], "mfp": None}
+
+    return {"security": security, "encryption": encryption, "akm": suites["akm"], "ciphers": suites["pairwise"],
+            "mfp": suites["mfp"]}
+
+
+def _channel_width(elements: Dict[str, bytes], frequency: int) -> Tuple[int, int]:
+    band = frequency_band(frequency)
+    width, center = 20, frequency
+
+    ht_op = elements.get("ht_op")
+    if ht_op is not None and len(ht_op) >= 2 and ht_op[1] & 0x04:
+        # Смещение вторичного канала: 1 - выше основного, 3 - ниже
+        if ht_op[1] & 0x03 == 1:
+            width, center = 40, frequency + 10
+        elif ht_op[1] & 0x03 == 3:
+            width, center = 40, frequency - 10
+
+    vht_op = elements.get("vht_op")
+    if vht_op is not None and len(vht_op) >= 3 and vht_op[0] and band != "2.4":
+        seg0, seg1 = vht_op[1], vht_op[2]
+        if vht_op[0] == 2:
+            width, center = 160, channel_to_frequency(seg0, band)
+        elif seg1 and abs(seg1 - seg0) == 8:
+            width, center = 160, channel_to_frequency(seg1, band)
+        else:
+            # 80 МГц; для 80+80 учитывается сегмент основного канала
+            width, center = 80, channel_to_frequency(seg0, band)
+
+    he_op = elements.get("he_op")
+    if he_op is not None and band == "6" and len(he_op) >= 6:
+        params = int.from_bytes(he_op[:3], "little")
+        # Необязательные поля перед информацией о 6 ГГц: VHT Operation и Max Co-Hosted BSSID
+        offset = 6 + (3 if params & (1 << 14) else 0) + (1 if params & (1 << 15) else 0)
+        if params & (1 << 17) and len(he_op) >= offset + 4:
+            code, ccfs0, ccfs1 = he_op[offset + 1] & 0x03, he_op[offset + 2], he_op[offset + 3]
+            if code == 3 and ccfs1 and abs(ccfs1 - ccfs0) == 8:
+                width, center = 160, channel_to_frequency(ccfs1, band)
+            else:
+                width, center = min(20 << code, 80), channel_to_frequency(ccfs0, band)
+
+    return width, center
+
+
+def bss_record(bss: Dict[int, bytes]) -> Optional[Dict[str, Any]]:
+    """
+    Построить компактную запись сети по атрибутам NL80211_ATTR_BSS.
+
+    Args:
+        bss: Атрибуты BSS
+
+    Returns:
+        Словарь сети в формате SystemUtils.get_wifi_networks или None, если нет BSSID
+    """
+    bssid = bss.get(NL80211_BSS_BSSID)
+    if bssid is None or len(bssid) != 6:
+        return None
+
+    frequency = _u32(bss.get(NL80211_BSS_FREQUENCY)) or 0
+    capability = struct.unpack_from("=H", bss[NL80211_BSS_CAPABILITY])[0] \
+        if len(bss.get(NL80211_BSS_CAPABILITY, b"")) >= 2 else 0
+    # IE из probe response полнее, IE beacon - запасной вариант
+    elements = parse_ies(bss.get(NL80211_BSS_INFORMATION_ELEMENTS) or bss.get(NL80211_BSS_BEACON_IES) or b"")
+
+    signal_dbm = None
+    if len(bss.get(NL80211_BSS_SIGNAL_MBM, b"")) >= 4:
+        signal_dbm = struct.unpack_from("=i", bss[NL80211_BSS_SIGNAL_MBM])[0] / 100
+        signal = signal_quality(signal_dbm)
+    elif bss.get(NL80211_BSS_SIGNAL_UNSPEC):
+        signal = min(bss[NL80211_BSS_SIGNAL_UNSPEC][0], 100)
+    else:
+        signal = 0
+
+    ssid = elements.get("ssid", b"")
+    country = elements.get("country", b"")[:2]
+    width, center = _channel_width(elements, frequency)
+    standards = [name for key, name in (("ht_cap", "n"), ("vht_cap", "ac"), ("he_cap", "ax"), ("eht_cap", "be"))
+                 if key in elements]
+
+    return {
+        "bssid": bssid.hex(":"),
+        # Скрытая сеть передает пустой SSID или SSID из нулевых байтов
+        "ssid": ssid.decode("utf-8", "replace") if ssid.strip(b"\x00") else "",
+        "signal": signal,
+        "signal_dbm": signal_dbm,
+        "frequency": frequency,
+        "channel": frequency_to_channel(frequency),
+        "band": frequency_band(frequency),
+        "width": width,
+        "center_frequency": center,
+        **_security(elements, capability),
+        "standards": standards,
+        "country": country.decode("ascii") if len(country) == 2 and country.isalpha() else None,
+        "age_ms": _u32(bss.get(NL80211_BSS_SEEN_MS_AGO)),
+        "associated": _u32(bss.get(NL80211_BSS_STATUS)) == NL80211_BSS_STATUS_ASSOCIATED,
+    }
+
+
+class Nl80211Scanner:
+    """
+    Сканирование WiFi через nl80211 (generic netlink) без внешних утилит.
+
+    Сканирование запускается командой NL80211_CMD_TRIGGER_SCAN, после
+    события NL80211_CMD_NEW_SCAN_RESULTS группы рассылки "scan" найденные
+    BSS читаются дампом NL80211_CMD_GET_SCAN. Информационные элементы
+    разбираются в компактные записи: шифрование по RSN/WPA, стандарты по
+    HT/VHT/HE, ширина канала и код страны.
+    """
+
+    def __init__(self):
+        self._family: Optional[Tuple[int, Dict[str, int]]] = None
+        self._seq = itertools.count(1)
+
+    def _request(self, family_id: int, cmd: int, attrs: bytes = b"", dump: bool = False,
+                 version: int = 0) -> List[Tuple[int, Dict[int, bytes]]]:
+        flags = NLM_F_REQUEST | (NLM_F_DUMP if dump else NLM_F_ACK)
+        body = _GENLMSGHDR.pack(cmd, version, 0) + attrs
+        request = _NLMSGHDR.pack(_NLMSGHDR.size + len(body), family_id, flags, next(self._seq), 0) + body
+
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+        try:
+            sock.settimeout(REQUEST_TIMEOUT)
+            sock.bind((0, 0))
+            sock.send(request)
+
+            messages = []
+            while True:
+                for msg_type, payload in _messages(sock.recv(_RECV_SIZE)):
+                    if msg_type in (NLMSG_ERROR, NLMSG_DONE):
+                        # Код ошибки (отрицательный errno) или 0 для подтверждения
+                        error = -struct.unpack_from("=i", payload)[0] if len(payload) >= 4 else 0
+                        if error > 0:
+                            raise Nl80211Error(error, os.strerror(error))
+                        return messages
+                    messages.append((payload[0], _parse_attrs(payload, _GENLMSGHDR.size)))
+        finally:
+            sock.close()
+
+    def family(self) -> Tuple[int, Dict[str, int]]:
+        """
+        Получить идентификатор семейства nl80211 и его группы рассылки.
+
+        Returns:
+            Кортеж (идентификатор семейства, словарь групп рассылки по именам)
+
+        Raises:
+            Nl80211Error: Если семейство не зарегистрировано (нет драйвера cfg80211)
+        """
+        if self._family is None:
+            messages = self._request(GENL_ID_CTRL, CTRL_CMD_GETFAMILY,
+                                     _attr(CTRL_ATTR_FAMILY_NAME, b"nl80211\x00"), version=1)
+            if not messages or CTRL_ATTR_FAMILY_ID not in messages[0][1]:
+                raise Nl80211Error(errno.ENOENT, "nl80211 family not found")
+            attrs = messages[0][1]
+
+            groups = {}
+            for group in _parse_attrs(attrs.get(CTRL_ATTR_MCAST_GROUPS, b""), 0).values():
+                group_attrs = _parse_attrs(group, 0)
+                if CTRL_ATTR_MCAST_GRP_NAME in group_attrs and CTRL_ATTR_MCAST_GRP_ID in group_attrs:
+                    name = group_attrs[CTRL_ATTR_MCAST_GRP_NAME].rstrip(b"\x00").decode("ascii")
+                    groups[name] = _u32(group_attrs[CTRL_ATTR_MCAST_GRP_ID])
+
+            self._family = (struct.unpack_from("=H", attrs[CTRL_ATTR_FAMILY_ID])[0], groups)
+        return self._family
+
+    def results(self, ifname: str) -> List[Dict[str, Any]]:
+        """
+        Получить BSS из кеша сканирования ядра без запуска сканирования.
+
+        Args:
+            ifname: Имя WiFi интерфейса
+
+        Returns:
+            Список сетей
+
+        Raises:
+            Nl80211Error: Если дамп получить не удалось
+        """
+        try:
+            family_id, _ = self.family()
+            return self._dump(family_id, socket.if_nametoindex(ifname))
+        except Nl80211Error:
+            raise
+        except (OSError, AttributeError) as e:
+            raise Nl80211Error(getattr(e, "errno", None) or errno.EIO, str(e))
+
+    def scan(self, ifname: str, timeout: float = 25.0) -> List[Dict[str, Any]]:
+        """
+        Запустить сканирование и получить найденные сети.
+
+        Если на интерфейсе уже выполняется сканирование (например, его
+        запустил wpa_supplicant), ожидается его результат. Без прав
+        CAP_NET_ADMIN возвращаются результаты последнего сканирования ядра.
+
+        Args:
+            ifname: Имя WiFi интерфейса
+            timeout: Максимальное время ожидания результатов в секундах
+
+        Returns:
+            Список сетей
+
+        Raises:
+            Nl80211Error: Если nl80211 недоступен, сканирование прервано или не завершилось вовремя
+        """
+        try:
+            ifindex = socket.if_nametoindex(ifname)
+            family_id, groups = self.family()
+            if "scan" not in groups:
+                raise Nl80211Error(errno.ENOTSUP, "nl80211 scan multicast group not found")
+
+            # Подписка выполняется до запуска сканирования, чтобы не пропустить событие завершения
+            events = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+            try:
+                events.bind((0, 0))
+                events.setsockopt(SOL_NETLINK, NETLINK_ADD_MEMBERSHIP, groups["scan"])
+                try:
+                    self._trigger(family_id, ifindex)
+                except Nl80211Error as e:
+                    if e.errno == errno.EPERM:
+                        logger.warning(f"Нет прав на запуск сканирования {ifname}, используются результаты ядра")
+                        return self._dump(family_id, ifindex)
+                    if e.errno != errno.EBUSY:
+                        raise
+                    logger.info(f"На интерфейсе {ifname} уже выполняется сканирование, ожидается его результат")
+                self._wait_results(events, family_id, ifindex, timeout)
+            finally:
+                events.close()
+
+            return self._dump(family_id, ifindex)
+        except Nl80211Error:
+            raise
+        except (OSError, AttributeError) as e:
+            raise Nl80211Error(getattr(e, "errno", None) or errno.EIO, str(e))
+
+    def _trigger(self, family_id: int, ifindex: int) -> None:
+        attrs = _attr(NL80211_ATTR_IFINDEX, struct.pack("=I", ifindex))
+        try:
+            self._request(family_id, NL80211_CMD_TRIGGER_SCAN, attrs)
+        except Nl80211Error as e:
+            if e.errno != errno.EOPNOTSUPP:
+                raise
+            # Работающая точка доступа сканирует только с флагом AP
+            self._request(family_id, NL80211_CMD_TRIGGER_SCAN,
+                          attrs + _attr(NL80211_ATTR_SCAN_FLAGS, struct.pack("=I", NL80211_SCAN_FLAG_AP)))
+
+    @staticmethod
+    def _wait_results(events: socket.socket, family_id: int, ifindex: int, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise Nl80211Error(errno.ETIMEDOUT, f"Scan did not finish in {timeout} s")
+            events.settimeout(remaining)
+            try:
+                data = events.recv(_RECV_SIZE)
+            except socket.timeout:
+                continue
+
+            for msg_type, payload in _messages(data):
+                if msg_type != family_id or not payload:
+                    continue
+                if _u32(_parse_attrs(payload, _GENLMSGHDR.size).get(NL80211_ATTR_IFINDEX)) != ifindex:
+                    continue
+                if payload[0] == NL80211_CMD_NEW_SCAN_RESULTS:
+                    return
+                if payload[0] == NL80211_CMD_SCAN_ABORTED:
+                    raise Nl80211Error(errno.ECANCELED, "Scan aborted")
+
+    def _dump(self, family_id: int, ifindex: int) -> List[Dict[str, Any]]:
+        networks = []
+        messages = self._request(family_id, NL80211_CMD_GET_SCAN,
+                                 _attr(NL80211_ATTR_IFINDEX, struct.pack("=I", ifindex)), dump=True)
+        for _, attrs in messages:
+            if NL80211_ATTR_BSS not in attrs:
+                continue
+            try:
+                record = bss_record(_parse_attrs(attrs[NL80211_ATTR_BSS], 0))
+            except (struct.error, ValueError, IndexError) as e:
+                logger.debug(f"Некорректная запись BSS: {str(e)}")
+                continue
+            if record is not None:
+                networks.append(record)
+        return networks
+
+
+# Общий экземпляр сканера nl80211
+nl80211_scanner = Nl80211Scanner()
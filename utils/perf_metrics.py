@@ -0,0 +1,223 @@
+import sys
+import time
+import bisect
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы интервалов гистограммы задержки, миллисекунд; последний интервал не ограничен
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+# Ограничения профилировщика
+MAX_PROFILE_SECONDS = 60.0
+MIN_PROFILE_INTERVAL = 0.001
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек с фиксированными интервалами.
+
+    Запись - поиск интервала и увеличение счетчика, память не растет с
+    числом запросов. Процентили оцениваются линейной интерполяцией внутри
+    интервала, поэтому их точность ограничена шириной интервала.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.errors = 0
+
+    def observe(self, duration_ms: float, error: bool = False) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        if error:
+            self.errors += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Оценить процентиль задержки.
+
+        Args:
+            q: Доля от 0 до 1
+
+        Returns:
+            Задержка в миллисекундах или None, если запросов не было
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS_MS[index - 1] if index > 0 else 0.0
+                upper = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+                return round(min(lower + (upper - lower) * (rank - seen) / count, self.max_ms), 3)
+            seen += count
+        return round(self.max_ms, 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {("+Inf" if index == len(LATENCY_BUCKETS_MS) else str(LATENCY_BUCKETS_MS[index])): count
+                        for index, count in enumerate(self.counts) if count},
+        }
+
+
+class PerfRecorder:
+    """
+    Задержки запросов по маршрутам и число выполняющихся запросов.
+
+    Маршрут определяется после обработки запроса по шаблону пути
+    (/api/firewall/rules/{rule_id}), поэтому запросы к разным объектам
+    попадают в одну гистограмму.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.active: Dict[int, dict] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def route_name(scope: dict) -> str:
+        route = scope.get("route")
+        path = getattr(route, "path", None)
+        if path is None:
+            # Подключенные приложения (статика) маршрут не записывают, только свой префикс
+            if not scope.get("root_path"):
+                return "unmatched"
+            path = f"{scope['root_path']}/{{path}}"
+        return f"{scope.get('method', 'WS')} {path}"
+
+    def begin(self, scope: dict) -> None:
+        self.active[id(scope)] = scope
+
+    def end(self, scope: dict, duration: float, status: int) -> None:
+        self.active.pop(id(scope), None)
+        name = PerfRecorder.route_name(scope)
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.observe(duration * 1000, status >= 500)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Получить статистику задержек.
+
+        Returns:
+            Словарь с гистограммами по маршрутам и выполняющимися запросами
+        """
+        # Маршрут выполняющегося запроса известен, если он уже прошел маршрутизацию
+        in_flight = Counter(PerfRecorder.route_name(scope) for scope in list(self.active.values()))
+        with self._lock:
+            routes = {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+        for name, count in in_flight.items():
+            routes.setdefault(name, LatencyHistogram().snapshot())["in_flight"] = count
+        for route in routes.values():
+            route.setdefault("in_flight", 0)
+
+        return {
+            "since": self.started_at,
+            "in_flight": sum(in_flight.values()),
+            "bucket_bounds_ms": list(LATENCY_BUCKETS_MS),
+            "routes": dict(sorted(routes.items(), key=lambda item: item[1]["p95_ms"] or 0, reverse=True)),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms = {}
+            self.started_at = time.time()
+
+
+class PerfMiddleware:
+    """
+    ASGI-промежуточный слой, записывающий задержку каждого HTTP-запроса
+    до отправки последней части ответа.
+    """
+
+    def __init__(self, app, recorder: PerfRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.recorder.begin(scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.recorder.end(scope, time.perf_counter() - started, status)
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Dict[str, Any]:
+    """
+    Собрать стеки всех потоков процесса с заданным интервалом.
+
+    Выполняется в отдельном потоке; стек самого профилировщика не
+    учитывается. Результат - стеки в свернутом формате (collapsed stacks):
+    одна строка на стек, кадры от корня через ';', затем число выборок.
+
+    Args:
+        seconds: Длительность сбора
+        interval: Интервал между выборками
+
+    Returns:
+        Словарь с числом выборок и строками свернутых стеков
+    """
+    seconds = min(max(seconds, interval), MAX_PROFILE_SECONDS)
+    interval = max(interval, MIN_PROFILE_INTERVAL)
+    own_thread = threading.get_ident()
+    stacks: Counter = Counter()
+    samples = 0
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                frame = frame.f_back
+            frames.append(names.get(thread_id, str(thread_id)))
+            stacks[";".join(reversed(frames))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    logger.info(f"Профилирование завершено: выборок {samples} за {seconds} с")
+    return {
+        "samples": samples,
+        "collapsed": [f"{stack} {count}" for stack, count in stacks.most_common()],
+    }
+
+
+# Статистика задержек веб-процесса
+perf_recorder = PerfRecorder()
@@ -0,0 +1,264 @@
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, List, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Заголовок области: сигнатура, версия формата, счетчик seqlock, длина данных, время публикации
+_HEADER = struct.Struct("<4sIQId")
+_MAGIC = b"ARMM"
+_LAYOUT_VERSION = 1
+_SEQ_OFFSET = 8
+
+# Размер области, байт; данные больше этого размера не публикуются
+REGION_SIZE = 256 * 1024
+
+# Число попыток чтения, если запись произошла во время чтения
+READ_RETRIES = 8
+
+
+def _shm_dir() -> str:
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+class SharedMetricRegion:
+    """
+    Область разделяемой памяти (mmap файла) с одним писателем и
+    читателями без блокировок.
+
+    Согласованность обеспечивается по схеме seqlock: писатель делает
+    счетчик нечетным, записывает данные и делает его четным; читатель
+    копирует данные и принимает их, только если счетчик до и после
+    копирования одинаков и четен. Данные хранятся в виде JSON.
+    """
+
+    def __init__(self, path: str, size: int = REGION_SIZE):
+        self.path = path
+        self.size = size
+        self._map: Optional[mmap.mmap] = None
+        self._writable = False
+
+    def _open(self, writable: bool) -> Optional[mmap.mmap]:
+        if self._map is not None and (self._writable or not writable):
+            return self._map
+        if writable:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if os.fstat(fd).st_size < self.size:
+                    os.ftruncate(fd, self.size)
+                region = mmap.mmap(fd, self.size, access=mmap.ACCESS_WRITE)
+            finally:
+                os.close(fd)
+        else:
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except FileNotFoundError:
+                return None
+            try:
+                if os.fstat(fd).st_size < self.size:
+                    return None
+                region = mmap.mmap(fd, self.size, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+        if self._map is not None:
+            self._map.close()
+        self._map, self._writable = region, writable
+        return region
+
+    def write(self, data: Dict[str, Any]) -> bool:
+        """
+        Опубликовать данные.
+
+        Args:
+            data: Данные для читателей
+
+        Returns:
+            True, если данные записаны
+        """
+        payload = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+        if len(payload) > self.size - _HEADER.size:
+            logger.error(f"Метрики не помещаются в разделяемую память: {len(payload)} байт")
+            return False
+
+        region = self._open(writable=True)
+        magic, _, seq, _, _ = _HEADER.unpack_from(region, 0)
+        if magic != _MAGIC:
+            seq = 0
+        # Нечетный счетчик остается после сбоя прежнего писателя во время записи
+        if seq % 2:
+            seq += 1
+
+        struct.pack_into("<Q", region, _SEQ_OFFSET, seq + 1)
+        region[_HEADER.size:_HEADER.size + len(payload)] = payload
+        _HEADER.pack_into(region, 0, _MAGIC, _LAYOUT_VERSION, seq + 1, len(payload), time.time())
+        struct.pack_into("<Q", region, _SEQ_OFFSET, seq + 2)
+        return True
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """
+        Прочитать опубликованные данные.
+
+        Returns:
+            Словарь с данными и временем публикации ("published_at") или None,
+            если данных нет или согласованную копию получить не удалось
+        """
+        region = self._open(writable=False)
+        if region is None:
+            return None
+
+        for _ in range(READ_RETRIES):
+            magic, version, seq, length, published_at = _HEADER.unpack_from(region, 0)
+            if magic != _MAGIC or version != _LAYOUT_VERSION:
+                return None
+            if seq % 2:
+                time.sleep(0)
+                continue
+            payload = region[_HEADER.size:_HEADER.size + length]
+            if struct.unpack_from("<Q", region, _SEQ_OFFSET)[0] != seq:
+                continue
+            try:
+                data = json.loads(payload)
+            except ValueError:
+                continue
+            data["published_at"] = published_at
+            return data
+        return None
+
+
+class SharedMetricStore:
+    """
+    Сбор метрик одним процессом на все рабочие процессы веб-сервера.
+
+    Каждый рабочий процесс запускает поток, который пытается захватить
+    файловую блокировку. Захвативший процесс собирает метрики всеми
+    зарегистрированными функциями и публикует их в разделяемой памяти;
+    остальные только читают. При завершении сборщика блокировка
+    освобождается и сбор продолжает другой процесс. Фоновые задачи,
+    которые должны работать в одном процессе, запускаются через
+    on_collector.
+    """
+
+    def __init__(self, name: str = "armrouter-metrics", interval: float = 2.0):
+        self.interval = interval
+        self.region = SharedMetricRegion(os.path.join(_shm_dir(), f"{name}.mmap"))
+        self.lock_path = os.path.join(_shm_dir(), f"{name}.lock")
+        self.samplers: Dict[str, Callable[[], Any]] = {}
+        self.collector_callbacks: List[Callable[[], None]] = []
+        self.collector = False
+        self._lock_fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, sampler: Callable[[], Any]) -> None:
+        """
+        Зарегистрировать функцию сбора метрики.
+
+        Args:
+            name: Имя метрики
+            sampler: Функция без аргументов, возвращающая значение для JSON
+        """
+        self.samplers[name] = sampler
+
+    def on_collector(self, callback: Callable[[], None]) -> None:
+        """
+        Зарегистрировать функцию, вызываемую, когда процесс становится сборщиком.
+
+        Функция вызывается один раз из потока сбора сразу после захвата
+        блокировки.
+
+        Args:
+            callback: Функция без аргументов
+        """
+        self.collector_callbacks.append(callback)
+
+    def get(self, name: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        Получить последнее опубликованное значение метрики.
+
+        Args:
+            name: Имя метрики
+            max_age: Максимальный возраст значения в секундах (по умолчанию три интервала сбора)
+
+        Returns:
+            Значение или None, если сбор не запущен или значение устарело
+        """
+        if self._thread is None:
+            return None
+        data = self.region.read()
+        if data is None or name not in data:
+            return None
+        max_age = max_age if max_age is not None else self.interval * 3
+        if time.time() - data["published_at"] > max_age:
+            return None
+        return data[name]
+
+    def _try_acquire(self) -> bool:
+        if fcntl is None:
+            return False
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        logger.info(f"Процесс {os.getpid()} собирает метрики для всех рабочих процессов")
+        return True
+
+    def collect(self) -> None:
+        """
+        Собрать все метрики и опубликовать их.
+        """
+        data = {}
+        for name, sampler in self.samplers.items():
+            try:
+                data[name] = sampler()
+            except Exception as e:
+                logger.error(f"Ошибка сбора метрики {name}: {str(e)}")
+        self.region.write(data)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="shared-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+            self.collector = False
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self.collector:
+                self.collector = self._try_acquire()
+                if self.collector:
+                    for callback in self.collector_callbacks:
+                        try:
+                            callback()
+                        except Exception as e:
+                            logger.error(f"Ошибка запуска задачи процесса-сборщика: {str(e)}")
+            if self.collector:
+                try:
+                    self.collect()
+                except Exception as e:
+                    logger.error(f"Ошибка публикации метрик: {str(e)}")
+            self._stop.wait(self.interval)
+
+
+# Метрики, общие для всех рабочих процессов
+shared_metrics = SharedMetricStore()
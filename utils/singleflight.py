@@ -0,0 +1,70 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных запросов.
+
+    Пока вычисление по ключу выполняется, остальные запросы с тем же
+    ключом ждут его результата, а не запускают свое. Успешный результат
+    дополнительно хранится ttl секунд (микрокеш), ошибка не кешируется и
+    передается всем ожидавшим. Вычисление выполняется отдельной задачей,
+    поэтому отключение первого клиента не прерывает его для остальных.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._cache: Dict[Hashable, Tuple[float, Any]] = {}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]], ttl: float = 0.0) -> Any:
+        """
+        Выполнить вычисление или присоединиться к уже выполняющемуся.
+
+        Args:
+            key: Ключ запроса (адрес и параметры)
+            func: Функция без аргументов, возвращающая корутину вычисления
+            ttl: Время хранения результата в секундах
+
+        Returns:
+            Результат вычисления
+        """
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None:
+            if cached[0] > now:
+                self.shared += 1
+                return cached[1]
+            del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(self._execute(key, func, ttl))
+            # Ошибка считается полученной, даже если все ожидавшие отключились
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+        else:
+            self.shared += 1
+
+        # shield: отмена ожидающего запроса не отменяет общее вычисление
+        return await asyncio.shield(task)
+
+    async def _execute(self, key: Hashable, func: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        try:
+            result = await func()
+            if ttl > 0:
+                self._cache[key] = (time.monotonic() + ttl, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+
+# Объединение запросов к дорогим эндпоинтам чтения
+request_coalescer = SingleFlight()
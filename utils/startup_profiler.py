@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import time
+import subprocess
+from typing import Dict, Any, List
+
+from config import BASE_DIR
+
+# Бюджет холодного запуска веб-процесса на целевой плате, секунд:
+# от старта интерпретатора до ответа на первый запрос страницы
+STARTUP_BUDGET = 3.0
+
+# Пакеты проекта показываются по модулям, остальные - по пакету верхнего уровня
+PROJECT_PACKAGES = ("app", "config", "utils", "routers")
+
+# Код дочернего процесса: импорт приложения, запуск и остановка lifespan,
+# первые запросы
+_CHILD_CODE = """
+import json, time, asyncio
+stages = []
+started = time.perf_counter()
+import app
+stages.append(["import app", time.perf_counter() - started])
+
+async def request(path):
+    messages = []
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+             "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 5000)}
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        messages.append(message)
+    await app.app(scope, receive, send)
+    return messages[0].get("status")
+
+async def main():
+    lifespan = app.app.router.lifespan_context(app.app)
+    started = time.perf_counter()
+    await lifespan.__aenter__()
+    stages.append(["lifespan startup", time.perf_counter() - started])
+    try:
+        started = time.perf_counter()
+        status = await request("/")
+        stages.append(["first page (/)", time.perf_counter() - started, status])
+        started = time.perf_counter()
+        status = await request("/health")
+        stages.append(["first API request (/health)", time.perf_counter() - started, status])
+    finally:
+        started = time.perf_counter()
+        await lifespan.__aexit__(None, None, None)
+        stages.append(["lifespan shutdown", time.perf_counter() - started])
+
+asyncio.run(main())
+print(json.dumps(stages))
+"""
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """
+    Разобрать вывод python -X importtime.
+
+    Args:
+        output: Поток ошибок процесса
+
+    Returns:
+        Список модулей с собственным и накопленным временем импорта в секундах
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        modules.append({
+            "module": parts[2].strip(),
+            "self": int(parts[0]) / 1e6,
+            "cumulative": int(parts[1]) / 1e6,
+        })
+    return modules
+
+
+def group_imports(modules: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Сгруппировать собственное время импорта по пакетам.
+
+    Args:
+        modules: Результат parse_importtime
+
+    Returns:
+        Словарь {пакет или модуль проекта: время в секундах}
+    """
+    groups: Dict[str, float] = {}
+    for module in modules:
+        name = module["module"]
+        top = name.split(".")[0]
+        key = name if top in PROJECT_PACKAGES else top
+        groups[key] = groups.get(key, 0.0) + module["self"]
+    return groups
+
+
+def profile_startup(budget: float = STARTUP_BUDGET) -> Dict[str, Any]:
+    """
+    Измерить холодный запуск веб-процесса в отдельном интерпретаторе.
+
+    Фоновые службы (наблюдение за WiFi, подбор каналов, общий сбор
+    метрик) в дочернем процессе не запускаются.
+
+    Args:
+        budget: Бюджет запуска в секундах
+
+    Returns:
+        Словарь с общим временем, этапами инициализации, временем импорта по пакетам
+        и признаком соблюдения бюджета
+
+    Raises:
+        RuntimeError: Если дочерний процесс завершился с ошибкой
+    """
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD_CODE], cwd=str(BASE_DIR),
+                            env={**os.environ, "ARMROUTER_NO_BACKGROUND": "1"},
+                            capture_output=True, text=True, timeout=120)
+    total = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup profile failed: {result.stderr.strip().splitlines()[-1:]}")
+
+    stages = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(result.stderr)
+    groups = group_imports(modules)
+    return {
+        "total": total,
+        "interpreter": total - sum(stage[1] for stage in stages),
+        "stages": stages,
+        "imports": sorted(groups.items(), key=lambda item: item[1], reverse=True),
+        "import_total": sum(groups.values()),
+        "budget": budget,
+        "within_budget": total <= budget,
+    }
+
+
+def format_profile(profile: Dict[str, Any], top: int = 20) -> str:
+    lines = ["Запуск веб-процесса:"]
+    lines.append(f"  {'запуск и выход интерпретатора':<32} {profile['interpreter'] * 1000:8.1f} мс")
+    for stage in profile["stages"]:
+        status = f" (HTTP {stage[2]})" if len(stage) > 2 else ""
+        lines.append(f"  {stage[0]:<32} {stage[1] * 1000:8.1f} мс{status}")
+    lines.append(f"  {'всего':<32} {profile['total'] * 1000:8.1f} мс, бюджет {profile['budget'] * 1000:.0f} мс")
+
+    lines.append(f"Импорт модулей по пакетам (всего {profile['import_total'] * 1000:.1f} мс):")
+    for name, seconds in profile["imports"][:top]:
+        lines.append(f"  {name:<32} {seconds * 1000:8.1f} мс")
+
+    lines.append("Бюджет соблюден" if profile["within_budget"] else "Бюджет превышен")
+    return "\n".join(lines)
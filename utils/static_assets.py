@@ -0,0 +1,144 @@
+import os
+import json
+import stat
+import time
+import logging
+import mimetypes
+import threading
+from typing import Dict, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+logger = logging.getLogger(__name__)
+
+# Каталог собранных файлов внутри static/ (см. tools/build_static.py)
+DIST_PREFIX = "dist/"
+
+# Заранее сжатые варианты в порядке предпочтения
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Файлы с хешем содержимого в имени никогда не меняются
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+# Остальные файлы кешируются, но проверяются по ETag при каждом использовании
+REVALIDATE_CACHE = "no-cache"
+
+# Как часто проверять изменение манифеста, секунд
+MANIFEST_CHECK_INTERVAL = 1.0
+
+
+class StaticManifest:
+    """
+    Соответствие исходных имен статических файлов собранным именам с хешем.
+
+    Манифест перечитывается при изменении файла (по времени изменения);
+    при отсутствии сборки возвращаются исходные имена.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.entries: Dict[str, str] = {}
+        self.revision: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < MANIFEST_CHECK_INTERVAL:
+            return
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                revision = os.stat(self.path).st_mtime_ns
+            except OSError:
+                self.entries, self.revision = {}, None
+                return
+            if revision == self.revision:
+                return
+            try:
+                with open(self.path, "r") as file:
+                    self.entries = json.load(file)
+                self.revision = revision
+                logger.info(f"Манифест статических файлов загружен: файлов {len(self.entries)}")
+            except (OSError, ValueError) as e:
+                logger.error(f"Ошибка чтения манифеста статических файлов: {str(e)}")
+
+    def resolve(self, filename: str) -> str:
+        """
+        Получить имя собранного файла.
+
+        Args:
+            filename: Путь файла относительно static/
+
+        Returns:
+            Путь собранного файла с хешем или исходный путь, если файл не собран
+        """
+        self._reload()
+        return self.entries.get(filename, filename)
+
+    def contains(self, filename: str) -> bool:
+        """Проверить, есть ли файл в текущей сборке."""
+        self._reload()
+        return filename in self.entries
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Раздача статических файлов с заранее сжатыми вариантами.
+
+    Для собранных файлов (static/dist) отдается вариант .br или .gz,
+    если клиент его принимает, с заголовком Cache-Control: immutable.
+    Остальные файлы отдаются как есть и проверяются по ETag.
+    """
+
+    @staticmethod
+    def accepted_encodings(scope) -> set:
+        """Кодировки из Accept-Encoding, кроме явно запрещенных (q=0)."""
+        accepted = set()
+        for item in Headers(scope=scope).get("accept-encoding", "").split(","):
+            name, _, params = item.partition(";")
+            quality = params.strip()
+            try:
+                if quality.startswith("q=") and float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+            accepted.add(name.strip().lower())
+        return accepted
+
+    @staticmethod
+    def media_type(path: str) -> Optional[str]:
+        media_type, _ = mimetypes.guess_type(path)
+        if media_type and (media_type.startswith("text/") or media_type.endswith("javascript")):
+            return f"{media_type}; charset=utf-8"
+        return media_type
+
+    async def get_response(self, path: str, scope) -> Response:
+        hashed = path.replace(os.sep, "/").startswith(DIST_PREFIX)
+        response = None
+
+        if hashed and scope["method"] in ("GET", "HEAD"):
+            accepted = PrecompressedStaticFiles.accepted_encodings(scope)
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    response = self.file_response(full_path, stat_result, scope)
+                    response.headers["content-encoding"] = encoding
+                    media_type = PrecompressedStaticFiles.media_type(path)
+                    if media_type:
+                        response.headers["content-type"] = media_type
+                    break
+
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        response.headers["cache-control"] = IMMUTABLE_CACHE if hashed else REVALIDATE_CACHE
+        if hashed:
+            response.headers["vary"] = "Accept-Encoding"
+        return response
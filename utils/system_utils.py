@@ -5,12 +5,20 @@ import socket
 import platform
 import subprocess
 import logging
-import psutil
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
+from utils.nl80211 import nl80211_scanner, Nl80211Error
+
+# psutil импортируется в методах при первом вызове: его загрузка заметно замедляет запуск на одноплатных компьютерах
+
 logger = logging.getLogger(__name__)
 
+# Таймауты системных команд в секундах: по истечении процесс завершается
+COMMAND_TIMEOUT = 10
+SCAN_TIMEOUT = 25
+SERVICE_TIMEOUT = 60
+
 class SystemUtils:
     """
     Утилиты для взаимодействия с системой.
@@ -107,6 +115,8 @@ class SystemUtils:
         Returns:
             Словарь с информацией о процессоре
         """
+        import psutil
+
         try:
             cpu_count = psutil.cpu_count(logical=False)
             cpu_count_logical = psutil.cpu_count(logical=True)
@@ -160,6 +170,8 @@ class SystemUtils:
         Returns:
             Словарь с информацией о памяти
         """
+        import psutil
+
         try:
             memory = psutil.virtual_memory()
             swap = psutil.swap_memory()
@@ -189,6 +201,8 @@ class SystemUtils:
         Returns:
             Словарь с информацией о дисках
         """
+        import psutil
+
         try:
             partitions = psutil.disk_partitions()
             
@@ -226,6 +240,8 @@ class SystemUtils:
         Returns:
             Словарь с аптаймом системы
         """
+        import psutil
+
         try:
             # Получаем время запуска системы
             boot_time = datetime.fromtimestamp(psutil.boot_time())
@@ -261,6 +277,8 @@ class SystemUtils:
         Returns:
             Словарь с информацией о сетевых интерфейсах
         """
+        import psutil
+
         try:
             interfaces = {}
             
@@ -342,7 +360,7 @@ class SystemUtils:
             routes = []
             
             # Получаем таблицу маршрутизации с помощью команды route
-            output = subprocess.check_output(["route", "-n"], universal_newlines=True)
+            output = subprocess.check_output(["route", "-n"], universal_newlines=True, timeout=COMMAND_TIMEOUT)
             
             # Парсим вывод
             lines = output.strip().split('\n')
@@ -412,7 +430,14 @@ class SystemUtils:
             scan_interface = adapter_name if adapter_name and adapter_name in wifi_interfaces else wifi_interfaces[0]
             logger.info(f"Используем интерфейс {scan_interface} для сканирования WiFi сетей")
             
-            # Сканируем сети на выбранном WiFi интерфейсе
+            # Сканируем сети через nl80211; разбор вывода iw и iwlist - запасной вариант
+            try:
+                networks = nl80211_scanner.scan(scan_interface, timeout=SCAN_TIMEOUT)
+                networks.sort(key=lambda x: x.get("signal", 0), reverse=True)
+                return networks
+            except Nl80211Error as e:
+                logger.warning(f"Сканирование через nl80211 недоступно ({str(e)}), используется iw")
+            
             networks = []
             
             try:
@@ -425,7 +450,13 @@ class SystemUtils:
                         stderr=subprocess.PIPE,
                         universal_newlines=True
                     )
-                    output, error = process.communicate()
+                    try:
+                        output, error = process.communicate(timeout=SCAN_TIMEOUT)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+                        process.communicate()
+                        logger.error(f"Сканирование WiFi на {scan_interface} не завершилось за {SCAN_TIMEOUT} с")
+                        return []
                     
                     if process.returncode != 0:
                         logger.error(f"Ошибка сканирования WiFi: {error}")
@@ -497,7 +528,8 @@ class SystemUtils:
                 # Если iw не работает, пробуем iwlist
                 try:
                     # Используем iwlist для сканирования
-                    output = subprocess.check_output(["iwlist", scan_interface, "scan"], universal_newlines=True)
+                    output = subprocess.check_output(["iwlist", scan_interface, "scan"], universal_newlines=True,
+                                                     timeout=SCAN_TIMEOUT)
                     
                     # Парсим вывод
                     current_network = None
@@ -578,7 +610,7 @@ class SystemUtils:
                 return False
             
             # Устанавливаем имя хоста
-            result = subprocess.run(["hostnamectl", "set-hostname", hostname], check=True)
+            result = subprocess.run(["hostnamectl", "set-hostname", hostname], check=True, timeout=COMMAND_TIMEOUT)
             
             # Также обновляем /etc/hosts
             with open("/etc/hosts", "r") as f:
@@ -621,7 +653,7 @@ class SystemUtils:
                 return False
             
             # Устанавливаем часовой пояс
-            result = subprocess.run(["timedatectl", "set-timezone", timezone], check=True)
+            result = subprocess.run(["timedatectl", "set-timezone", timezone], check=True, timeout=COMMAND_TIMEOUT)
             
             return True
         except Exception as e:
@@ -639,17 +671,17 @@ class SystemUtils:
         try:
             # Сначала пробуем NetworkManager
             try:
-                result = subprocess.run(["systemctl", "restart", "NetworkManager"], check=True)
+                result = subprocess.run(["systemctl", "restart", "NetworkManager"], check=True, timeout=SERVICE_TIMEOUT)
                 return True
             except subprocess.CalledProcessError:
                 # Если NetworkManager не работает, пробуем networking
                 try:
-                    result = subprocess.run(["systemctl", "restart", "networking"], check=True)
+                    result = subprocess.run(["systemctl", "restart", "networking"], check=True, timeout=SERVICE_TIMEOUT)
                     return True
                 except subprocess.CalledProcessError:
                     # Если networking не работает, пробуем netplan
                     try:
-                        result = subprocess.run(["netplan", "apply"], check=True)
+                        result = subprocess.run(["netplan", "apply"], check=True, timeout=SERVICE_TIMEOUT)
                         return True
                     except subprocess.CalledProcessError:
                         # Если все не работает, возвращаем False
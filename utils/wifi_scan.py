@@ -0,0 +1,332 @@
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from utils.system_utils import SystemUtils
+from utils.bss_table import bss_table
+from utils.executor import BlockingExecutor, system_executor, BlockingCallTimeout
+
+logger = logging.getLogger(__name__)
+
+# Время, в течение которого результат сканирования адаптера считается свежим, секунд
+SCAN_CACHE_TTL = 30.0
+
+# Таймаут ожидания одного сканирования, секунд
+SCAN_JOB_TIMEOUT = 30.0
+
+# Число хранимых заданий сканирования
+MAX_SCAN_JOBS = 32
+
+# Ожидаемая длительность сканирования, пока адаптер еще не сканировался
+DEFAULT_SCAN_DURATION = 5.0
+
+# Отдельный пул сканирования: радио сканируются одновременно и не занимают пул медленных команд
+scan_executor = BlockingExecutor("wifi-scan", max_workers=4, timeout=SCAN_JOB_TIMEOUT, max_pending=8)
+
+
+def merge_networks(results: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Объединить результаты сканирования нескольких адаптеров по BSSID.
+
+    Основные поля сети берутся из записи адаптера, который принимает ее
+    сильнее всего; уровень сигнала и диапазон каждого адаптера сохраняются
+    в списке radios.
+
+    Args:
+        results: Списки сетей по именам адаптеров
+
+    Returns:
+        Список сетей, отсортированный по уровню сигнала (от сильного к слабому)
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for adapter, networks in results.items():
+        for network in networks:
+            # iwlist выводит BSSID в верхнем регистре, iw и nl80211 - в нижнем
+            bssid = str(network.get("bssid", "")).lower()
+            if not bssid:
+                continue
+            radio = {
+                "adapter": adapter,
+                "signal": network.get("signal", 0),
+                "signal_dbm": network.get("signal_dbm"),
+                "band": network.get("band"),
+                "channel": network.get("channel", 0),
+            }
+            entry = merged.get(bssid)
+            if entry is None:
+                merged[bssid] = {**network, "bssid": bssid, "radios": [radio]}
+                continue
+            entry["radios"].append(radio)
+            if radio["signal"] > entry.get("signal", 0):
+                merged[bssid] = {**network, "bssid": bssid, "radios": entry["radios"]}
+
+    for entry in merged.values():
+        entry["radios"].sort(key=lambda radio: radio["signal"], reverse=True)
+    return sorted(merged.values(), key=lambda entry: (-entry.get("signal", 0), entry.get("ssid") or ""))
+
+
+class WifiScanService:
+    """
+    Задания сканирования WiFi с кешем результатов по адаптерам.
+
+    Сканирование выполняется в фоне, запрос получает идентификатор
+    задания и опрашивает его состояние. Повторный запрос сканирования
+    адаптера, который уже сканируется, присоединяется к текущему заданию;
+    пока результат свежий (SCAN_CACHE_TTL), новое сканирование не
+    запускается. Последний результат каждого адаптера доступен сразу.
+
+    Задания и результаты хранятся в памяти процесса: с несколькими
+    рабочими процессами веб-сервера задание, запущенное одним процессом,
+    не видно другим, поэтому API заданий требует одного рабочего процесса.
+    """
+
+    def __init__(self, ttl: float = SCAN_CACHE_TTL):
+        self.ttl = ttl
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.durations: Dict[str, float] = {}
+        self._running: Dict[str, str] = {}
+        self._done: Dict[str, asyncio.Event] = {}
+
+    @staticmethod
+    async def resolve_adapter(adapter: Optional[str]) -> Optional[str]:
+        """
+        Определить адаптер для сканирования.
+
+        Args:
+            adapter: Имя адаптера из запроса
+
+        Returns:
+            Имя адаптера (запрошенного или первого доступного) или None, если адаптеров нет
+        """
+        adapters = await system_executor.run(SystemUtils.get_wifi_adapters)
+        if not adapters:
+            return None
+        return adapter if adapter in adapters else adapters[0]
+
+    @staticmethod
+    async def resolve_adapters(adapters: Optional[List[str]] = None) -> List[str]:
+        """
+        Определить адаптеры для одновременного сканирования.
+
+        Args:
+            adapters: Имена адаптеров из запроса; None или пустой список - все адаптеры
+
+        Returns:
+            Список доступных адаптеров из запрошенных
+        """
+        available = await system_executor.run(SystemUtils.get_wifi_adapters)
+        if not adapters:
+            return list(available)
+        return [adapter for adapter in dict.fromkeys(adapters) if adapter in available]
+
+    def get_results(self, adapter: str) -> Optional[Dict[str, Any]]:
+        """
+        Получить последний результат сканирования адаптера.
+
+        Args:
+            adapter: Имя адаптера
+
+        Returns:
+            Словарь с сетями, временем и возрастом результата или None, если адаптер не сканировался
+        """
+        result = self.results.get(adapter)
+        if result is None:
+            return None
+        age = time.time() - result["scanned_at"]
+        return {**result, "age": round(age, 1), "fresh": age < self.ttl, "scanning": adapter in self._running}
+
+    def get_job(self, job_id: str, include_networks: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Получить состояние задания.
+
+        Args:
+            job_id: Идентификатор задания
+            include_networks: Добавить найденные сети для завершенного задания
+
+        Returns:
+            Словарь задания или None, если задание не найдено
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job = dict(job)
+        if job["status"] == "running":
+            elapsed = time.time() - job["started_at"]
+            expected = self.durations.get(job["adapter"], DEFAULT_SCAN_DURATION)
+            job["elapsed"] = round(elapsed, 1)
+            job["progress"] = min(round(elapsed / expected, 2), 0.99)
+        if include_networks and job["status"] == "done":
+            # Хранится только последний результат адаптера; сети более старых заданий не возвращаются
+            result = self.results.get(job["adapter"])
+            if result is not None and result["job_id"] == job_id:
+                job["networks"] = result["networks"]
+            else:
+                job["networks"], job["superseded"] = [], True
+        return job
+
+    def start(self, adapter: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Запустить сканирование адаптера или вернуть уже подходящее задание.
+
+        Args:
+            adapter: Имя адаптера
+            force: Сканировать, даже если есть свежий результат
+
+        Returns:
+            Словарь задания (без списка сетей)
+        """
+        running = self._running.get(adapter)
+        if running is not None:
+            return {**self.get_job(running, include_networks=False), "merged": True}
+
+        result = self.results.get(adapter)
+        if not force and result is not None and time.time() - result["scanned_at"] < self.ttl \
+                and result["job_id"] in self.jobs:
+            return {**self.get_job(result["job_id"], include_networks=False), "cached": True}
+
+        job_id = uuid.uuid4().hex[:12]
+        self.jobs[job_id] = {
+            "id": job_id,
+            "adapter": adapter,
+            "status": "running",
+            "created_at": time.time(),
+            "started_at": time.time(),
+            "finished_at": None,
+            "count": None,
+            "error": None,
+        }
+        while len(self.jobs) > MAX_SCAN_JOBS:
+            old_id, _ = self.jobs.popitem(last=False)
+            self._done.pop(old_id, None)
+        self._running[adapter] = job_id
+        self._done[job_id] = asyncio.Event()
+        asyncio.ensure_future(self._run(job_id, adapter))
+        logger.info(f"Запущено сканирование WiFi {job_id} на адаптере {adapter}")
+        return self.get_job(job_id, include_networks=False)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Дождаться завершения задания.
+
+        Args:
+            job_id: Идентификатор задания
+            timeout: Максимальное время ожидания в секундах
+
+        Returns:
+            Словарь задания после завершения или по истечении таймаута
+        """
+        done = self._done.get(job_id)
+        if done is not None:
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.get_job(job_id)
+
+    async def scan(self, adapter: str, force: bool = False) -> List[Dict[str, Any]]:
+        """
+        Получить сети адаптера: свежий результат из кеша или результат сканирования.
+
+        Args:
+            adapter: Имя адаптера
+            force: Сканировать, даже если есть свежий результат
+
+        Returns:
+            Список сетей
+
+        Raises:
+            BlockingCallTimeout: Если сканирование не завершилось вовремя
+            RuntimeError: Если сканирование завершилось ошибкой
+        """
+        job = self.start(adapter, force=force)
+        job = await self.wait(job["id"], SCAN_JOB_TIMEOUT + 5)
+        if job is None or job["status"] == "running":
+            raise BlockingCallTimeout(f"WiFi scan on {adapter} did not finish in time")
+        if job["status"] == "failed":
+            raise RuntimeError(job["error"])
+        return job.get("networks", [])
+
+    async def survey(self, adapters: List[str], force: bool = False) -> Dict[str, Any]:
+        """
+        Отсканировать несколько адаптеров одновременно и объединить результаты.
+
+        Каждый адаптер сканируется своим заданием (с присоединением к
+        выполняющемуся и кешем свежих результатов), поэтому обзор занимает
+        время самого медленного адаптера, а не сумму.
+
+        Args:
+            adapters: Имена адаптеров
+            force: Сканировать, даже если есть свежие результаты
+
+        Returns:
+            Словарь с объединенным списком сетей, адаптерами, ошибками по адаптерам и длительностью
+        """
+        started = time.time()
+        jobs = {adapter: self.start(adapter, force=force)["id"] for adapter in adapters}
+        finished = await asyncio.gather(*(self.wait(job_id, SCAN_JOB_TIMEOUT + 5) for job_id in jobs.values()))
+
+        results, errors = {}, {}
+        for adapter, job in zip(jobs, finished):
+            if job is None or job["status"] == "running":
+                errors[adapter] = "Scan did not finish in time"
+            elif job["status"] == "failed":
+                errors[adapter] = job["error"]
+            else:
+                # Последний результат адаптера не старше результата задания
+                results[adapter] = self.results[adapter]["networks"]
+
+        return {
+            "adapters": list(jobs),
+            "networks": merge_networks(results),
+            "errors": errors,
+            "duration": round(time.time() - started, 2),
+        }
+
+    async def _run(self, job_id: str, adapter: str) -> None:
+        job = self.jobs.get(job_id, {})
+        try:
+            networks = await scan_executor.run(SystemUtils.get_wifi_networks, adapter, timeout=SCAN_JOB_TIMEOUT)
+            finished_at = time.time()
+            self.results[adapter] = {"adapter": adapter, "job_id": job_id, "scanned_at": finished_at,
+                                     "networks": networks}
+            self.durations[adapter] = finished_at - job.get("started_at", finished_at)
+            bss_table.update(adapter, networks, finished_at)
+            job.update({"status": "done", "finished_at": finished_at, "count": len(networks)})
+        except Exception as e:
+            logger.error(f"Ошибка сканирования WiFi {job_id} на адаптере {adapter}: {str(e)}")
+            job.update({"status": "failed", "finished_at": time.time(), "error": str(e) or type(e).__name__})
+        finally:
+            self._running.pop(adapter, None)
+            done = self._done.get(job_id)
+            if done is not None:
+                done.set()
+
+    async def event_stream(self, job_id: str, interval: float = 1.0):
+        """
+        Асинхронный генератор состояния задания в формате Server-Sent Events.
+
+        Args:
+            job_id: Идентификатор задания
+            interval: Интервал отправки прогресса в секундах
+
+        Yields:
+            Строки событий SSE: progress во время сканирования, затем done или failed
+        """
+        while True:
+            job = await self.wait(job_id, interval)
+            if job is None:
+                yield f"event: failed\ndata: {json.dumps({'id': job_id, 'error': 'Job not found'})}\n\n"
+                return
+            if job["status"] != "running":
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                return
+            yield f"event: progress\ndata: {json.dumps(job)}\n\n"
+
+
+# Общий экземпляр службы сканирования
+wifi_scan_service = WifiScanService()
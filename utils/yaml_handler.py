@@ -1,5 +1,4 @@
 import os
-import yaml
 import logging
 from typing import Dict, Any, Optional
 
@@ -28,6 +27,9 @@ class YAMLHandler:
             if not os.path.exists(file_path):
                 return {}
             
+            # yaml загружается при первом чтении, а не при запуске
+            import yaml
+
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = yaml.safe_load(f)
                 
@@ -55,6 +57,8 @@ class YAMLHandler:
             # Создаем директорию, если она не существует
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
             
+            import yaml
+
             with open(file_path, 'w', encoding='utf-8') as f:
                 yaml.dump(data, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
             